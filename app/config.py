@@ -1,14 +1,39 @@
 from __future__ import annotations
 
-from functools import lru_cache
+import random
+from functools import cache, lru_cache
 from pathlib import Path
-from typing import Literal
+from typing import Any, Literal
 
 from pydantic import BaseModel, Field, HttpUrl, PositiveInt, validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 Visibility = Literal["public", "unlisted", "private"]
+TracingExporter = Literal["none", "file", "otlp"]
+JobProfiler = Literal["cprofile", "pyinstrument"]
+SchedulingPolicy = Literal["fifo", "sjf"]
+AccountStrategy = Literal["round_robin", "least_loaded"]
+
+_ASYNC_DRIVERS = {
+    "sqlite://": "sqlite+aiosqlite://",
+    "postgresql+psycopg://": "postgresql+asyncpg://",
+    "postgresql+psycopg2://": "postgresql+asyncpg://",
+}
+
+
+class RutubeAccount(BaseModel):
+    name: str
+    cookies_path: Path
+    # Publishes holding the account at once, from admission to the end of the upload;
+    # None means no limit.
+    max_concurrency: PositiveInt | None = 1
+    uploads_per_hour: PositiveInt | None = None
+    channels: list[str] = Field(default_factory=list)
+
+    @validator("cookies_path", pre=True)
+    def _expand_path(cls, value: str | Path) -> Path:
+        return Path(value).expanduser().resolve()
 
 
 class AppConfig(BaseSettings):
@@ -18,14 +43,22 @@ class AppConfig(BaseSettings):
         env_prefix="",
         case_sensitive=False,
         extra="ignore",
+        populate_by_name=True,
     )
 
     youtube_channel_id: str = Field(..., alias="YOUTUBE_CHANNEL_ID")
     web_sub_callback_base: HttpUrl = Field(..., alias="WEB_SUB_CALLBACK_BASE")
     web_sub_secret: str = Field(..., alias="WEB_SUB_SECRET")
     redis_url: str = Field("redis://localhost:6379/0", alias="REDIS_URL")
+    redis_max_connections: PositiveInt = Field(32, alias="REDIS_MAX_CONNECTIONS")
+    redis_health_check_interval: int = Field(30, ge=0, alias="REDIS_HEALTH_CHECK_INTERVAL")
     work_dir: Path = Field(Path("./data"), alias="WORK_DIR")
     database_path: Path = Field(Path("./data/app.db"), alias="DATABASE_PATH")
+    database_url_override: str | None = Field(None, alias="DATABASE_URL")
+    db_pool_size: PositiveInt = Field(5, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(10, ge=0, alias="DB_MAX_OVERFLOW")
+    db_pool_recycle_seconds: PositiveInt = Field(1800, alias="DB_POOL_RECYCLE_SECONDS")
+    sqlite_busy_timeout_ms: PositiveInt = Field(5000, alias="SQLITE_BUSY_TIMEOUT_MS")
     enable_transcode: bool = Field(False, alias="ENABLE_TRANSCODE")
     rutube_visibility: Visibility = Field("public", alias="RUTUBE_VISIBILITY")
     tags_from_yt: bool = Field(True, alias="TAGS_FROM_YT")
@@ -36,20 +69,128 @@ class AppConfig(BaseSettings):
     poll_interval_seconds: PositiveInt = Field(300, alias="POLL_INTERVAL_SECONDS")
     max_concurrency: PositiveInt = Field(1, alias="MAX_CONCURRENCY")
     log_level: str = Field("INFO", alias="LOG_LEVEL")
+    log_sample_rates: dict[str, float] = Field(default_factory=dict, alias="LOG_SAMPLE_RATES")
+    log_max_field_length: PositiveInt = Field(2000, alias="LOG_MAX_FIELD_LENGTH")
+    log_queue_size: PositiveInt = Field(10_000, alias="LOG_QUEUE_SIZE")
     application_version: str = Field("0.1.0", alias="APPLICATION_VERSION")
     cookies_path: Path = Field(Path("auth/rutube_cookies.json"), alias="COOKIES_PATH")
+    rutube_accounts: list[RutubeAccount] = Field(default_factory=list, alias="RUTUBE_ACCOUNTS")
+    rutube_account_strategy: AccountStrategy = Field(
+        "least_loaded", alias="RUTUBE_ACCOUNT_STRATEGY"
+    )
+    job_scheduling_policy: SchedulingPolicy = Field("fifo", alias="JOB_SCHEDULING_POLICY")
+    sjf_short_max_seconds: PositiveInt = Field(600, alias="SJF_SHORT_MAX_SECONDS")
+    sjf_long_min_seconds: PositiveInt = Field(3600, alias="SJF_LONG_MIN_SECONDS")
+    sjf_short_max_bytes: PositiveInt = Field(200 * 1024 * 1024, alias="SJF_SHORT_MAX_BYTES")
+    sjf_long_min_bytes: PositiveInt = Field(2 * 1024 * 1024 * 1024, alias="SJF_LONG_MIN_BYTES")
+    backfill_rate_per_minute: PositiveInt = Field(10, alias="BACKFILL_RATE_PER_MINUTE")
+    backfill_tick_seconds: PositiveInt = Field(60, alias="BACKFILL_TICK_SECONDS")
+    backfill_max_pending: PositiveInt = Field(50, alias="BACKFILL_MAX_PENDING")
+    breaker_failure_threshold: PositiveInt = Field(5, alias="BREAKER_FAILURE_THRESHOLD")
+    breaker_reset_seconds: PositiveInt = Field(300, alias="BREAKER_RESET_SECONDS")
+    session_check_ttl_seconds: PositiveInt = Field(600, alias="SESSION_CHECK_TTL_SECONDS")
+    session_check_refresh_seconds: PositiveInt = Field(
+        300, alias="SESSION_CHECK_REFRESH_SECONDS"
+    )
+    notification_dedupe_ttl_seconds: PositiveInt = Field(
+        3600, alias="NOTIFICATION_DEDUPE_TTL_SECONDS"
+    )
+    notification_dedupe_max_entries: PositiveInt = Field(
+        4096, alias="NOTIFICATION_DEDUPE_MAX_ENTRIES"
+    )
+    tracing_exporter: TracingExporter = Field("none", alias="TRACING_EXPORTER")
+    tracing_file_path: Path = Field(Path("./data/traces.jsonl"), alias="TRACING_FILE_PATH")
+    tracing_otlp_endpoint: str = Field(
+        "http://localhost:4318/v1/traces", alias="TRACING_OTLP_ENDPOINT"
+    )
+    resource_sample_interval_seconds: float = Field(
+        0.5, ge=0, alias="RESOURCE_SAMPLE_INTERVAL_SECONDS"
+    )
+    job_profiler: JobProfiler = Field("cprofile", alias="JOB_PROFILER")
+    job_profile_dir: Path = Field(Path("./data/profiles"), alias="JOB_PROFILE_DIR")
+    job_profile_sample_rate: float = Field(0.0, ge=0, le=1, alias="JOB_PROFILE_SAMPLE_RATE")
+    worker_preload: bool = Field(True, alias="WORKER_PRELOAD")
+    async_worker_max_jobs: PositiveInt = Field(4, alias="ASYNC_WORKER_MAX_JOBS")
+    async_worker_downloads: PositiveInt = Field(2, alias="ASYNC_WORKER_DOWNLOADS")
+    async_worker_transcodes: PositiveInt = Field(1, alias="ASYNC_WORKER_TRANSCODES")
+    async_worker_uploads: PositiveInt = Field(2, alias="ASYNC_WORKER_UPLOADS")
+    metrics_port: int = Field(9100, ge=0, le=65535, alias="METRICS_PORT")
+    disk_admission_enabled: bool = Field(True, alias="DISK_ADMISSION_ENABLED")
+    disk_headroom_bytes: int = Field(1024**3, ge=0, alias="DISK_HEADROOM_BYTES")
+    disk_download_factor: float = Field(2.0, ge=1, alias="DISK_DOWNLOAD_FACTOR")
+    disk_transcode_factor: float = Field(1.2, ge=0, alias="DISK_TRANSCODE_FACTOR")
+    disk_default_reservation_bytes: PositiveInt = Field(
+        2 * 1024**3, alias="DISK_DEFAULT_RESERVATION_BYTES"
+    )
+    disk_assumed_bytes_per_second: PositiveInt = Field(
+        1_000_000, alias="DISK_ASSUMED_BYTES_PER_SECOND"
+    )
+    disk_admission_retry_seconds: PositiveInt = Field(60, alias="DISK_ADMISSION_RETRY_SECONDS")
+    work_dir_gc_interval_seconds: int = Field(3600, ge=0, alias="WORK_DIR_GC_INTERVAL_SECONDS")
+    work_dir_gc_min_age_seconds: PositiveInt = Field(6 * 3600, alias="WORK_DIR_GC_MIN_AGE_SECONDS")
+    work_dir_gc_max_dirs: PositiveInt = Field(500, alias="WORK_DIR_GC_MAX_DIRS")
+    work_dir_gc_io_bytes_per_second: PositiveInt = Field(
+        20 * 1024 * 1024, alias="WORK_DIR_GC_IO_BYTES_PER_SECOND"
+    )
+    work_dir_gc_archive_path: Path = Field(
+        Path("./data/metadata_archive.zip"), alias="WORK_DIR_GC_ARCHIVE_PATH"
+    )
+    published_index_enabled: bool = Field(True, alias="PUBLISHED_INDEX_ENABLED")
+    published_index_refresh_seconds: PositiveInt = Field(
+        30, alias="PUBLISHED_INDEX_REFRESH_SECONDS"
+    )
+    metadata_sync_enabled: bool = Field(True, alias="METADATA_SYNC_ENABLED")
+    metadata_sync_window_seconds: PositiveInt = Field(60, alias="METADATA_SYNC_WINDOW_SECONDS")
+    metadata_sync_batch_size: PositiveInt = Field(50, alias="METADATA_SYNC_BATCH_SIZE")
+    metadata_sync_max_attempts: PositiveInt = Field(5, alias="METADATA_SYNC_MAX_ATTEMPTS")
 
     @validator("work_dir", "cookies_path", "database_path", pre=True)
     def _expand_path(cls, value: str | Path) -> Path:
         path = Path(value).expanduser().resolve()
         return path
 
+    @property
+    def accounts(self) -> list[RutubeAccount]:
+        if self.rutube_accounts:
+            return list(self.rutube_accounts)
+        # The implicit account is unbounded, as uploads were before accounts were pooled.
+        return [
+            RutubeAccount(name="default", cookies_path=self.cookies_path, max_concurrency=None)
+        ]
+
+    @property
+    def logging_options(self) -> dict[str, Any]:
+        return {
+            "level": self.log_level,
+            "sample_rates": self.log_sample_rates,
+            "max_field_length": self.log_max_field_length,
+            "queue_size": self.log_queue_size,
+        }
+
     @property
     def database_url(self) -> str:
+        if self.database_url_override:
+            url = self.database_url_override
+            for prefix in ("postgres://", "postgresql://"):
+                if url.startswith(prefix):
+                    return "postgresql+psycopg://" + url[len(prefix) :]
+            return url
         if self.database_path.suffix != ".db":
             return f"sqlite:///{self.database_path.as_posix()}"
         return f"sqlite:///{self.database_path}"
 
+    @property
+    def is_sqlite(self) -> bool:
+        return self.database_url.startswith("sqlite")
+
+    @property
+    def async_database_url(self) -> str:
+        url = self.database_url
+        for sync_prefix, async_prefix in _ASYNC_DRIVERS.items():
+            if url.startswith(sync_prefix):
+                return async_prefix + url[len(sync_prefix) :]
+        return url
+
 
 class RetryPolicy(BaseModel):
     max_attempts: PositiveInt = 5
@@ -57,16 +198,44 @@ class RetryPolicy(BaseModel):
     max_delay_seconds: float = 300.0
     jitter_factor: float = 0.3
 
+    def delay_for(self, attempt: int) -> float:
+        delay = min(self.base_delay_seconds * 2.0 ** max(attempt - 1, 0), self.max_delay_seconds)
+        jitter = delay * self.jitter_factor * random.random()
+        return min(delay + jitter, self.max_delay_seconds)
+
+
+STAGE_DOWNLOAD = "download"
+STAGE_TRANSCODE = "transcode"
+STAGE_UPLOAD = "upload"
+# Not a pipeline stage: another worker holds the per-video lock.
+STAGE_LOCK = "lock"
+
+_STAGE_RETRY_POLICIES: dict[str, RetryPolicy] = {
+    STAGE_LOCK: RetryPolicy(max_attempts=3, base_delay_seconds=15.0),
+    STAGE_DOWNLOAD: RetryPolicy(max_attempts=5, base_delay_seconds=30.0),
+    STAGE_TRANSCODE: RetryPolicy(max_attempts=2, base_delay_seconds=10.0),
+    STAGE_UPLOAD: RetryPolicy(max_attempts=3, base_delay_seconds=60.0, max_delay_seconds=900.0),
+}
+
 
 @lru_cache(maxsize=1)
 def get_settings() -> AppConfig:
     cfg = AppConfig()
     cfg.work_dir.mkdir(parents=True, exist_ok=True)
     cfg.cookies_path.parent.mkdir(parents=True, exist_ok=True)
-    cfg.database_path.parent.mkdir(parents=True, exist_ok=True)
+    for account in cfg.rutube_accounts:
+        account.cookies_path.parent.mkdir(parents=True, exist_ok=True)
+    if cfg.is_sqlite:
+        cfg.database_path.parent.mkdir(parents=True, exist_ok=True)
     return cfg
 
 
-@lru_cache(maxsize=1)
-def get_retry_policy() -> RetryPolicy:
-    return RetryPolicy()
+@cache
+def get_retry_policy(stage: str | None = None) -> RetryPolicy:
+    if stage is None:
+        return RetryPolicy()
+    return _STAGE_RETRY_POLICIES.get(stage, RetryPolicy())
+
+
+def get_stage_retry_policies() -> dict[str, RetryPolicy]:
+    return dict(_STAGE_RETRY_POLICIES)
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import PublishedVideo, PublishJob
+
+
+async def get_recent(session: AsyncSession, limit: int = 50) -> Sequence[PublishedVideo]:
+    stmt = (
+        select(PublishedVideo)
+        .order_by(PublishedVideo.created_at.desc())
+        .limit(limit)
+    )
+    return (await session.execute(stmt)).scalars().all()
+
+
+async def get_resource_samples(
+    session: AsyncSession, limit: int = 1000, status: str | None = None
+) -> list[tuple[str | None, dict[str, Any] | None]]:
+    stmt = select(PublishJob.resolution, PublishJob.resources).where(
+        PublishJob.resources.is_not(None)
+    )
+    if status is not None:
+        stmt = stmt.where(PublishJob.status == status)
+    stmt = stmt.order_by(PublishJob.created_at.desc(), PublishJob.video_id.desc()).limit(limit)
+    return [(resolution, resources) for resolution, resources in await session.execute(stmt)]
+
+
+async def get_job_history(  # noqa: PLR0913
+    session: AsyncSession,
+    limit: int = 50,
+    after: tuple[datetime, str] | None = None,
+    status: str | None = None,
+    channel_id: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> Sequence[PublishJob]:
+    stmt = select(PublishJob)
+    if status is not None:
+        stmt = stmt.where(PublishJob.status == status)
+    if channel_id is not None:
+        stmt = stmt.where(PublishJob.channel_id == channel_id)
+    if since is not None:
+        stmt = stmt.where(PublishJob.created_at >= since)
+    if until is not None:
+        stmt = stmt.where(PublishJob.created_at < until)
+    if after is not None:
+        # Keyset pagination: the cost of a page does not grow with its depth.
+        created_at, video_id = after
+        keyset = tuple_(literal(created_at), literal(video_id))
+        stmt = stmt.where(tuple_(PublishJob.created_at, PublishJob.video_id) < keyset)
+    stmt = stmt.order_by(PublishJob.created_at.desc(), PublishJob.video_id.desc()).limit(limit)
+    return (await session.execute(stmt)).scalars().all()
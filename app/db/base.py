@@ -1,10 +1,17 @@
 from __future__ import annotations
 
-from contextlib import contextmanager
-from typing import Generator
+from collections.abc import AsyncGenerator, Generator
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
 
 from app.config import get_settings
@@ -16,14 +23,82 @@ class Base(DeclarativeBase):
 
 _engine: Engine | None = None
 _session_factory: sessionmaker[Session] | None = None
+_async_engine: AsyncEngine | None = None
+_async_session_factory: async_sessionmaker[AsyncSession] | None = None
+
+
+def _set_sqlite_pragmas(dbapi_connection: Any, busy_timeout_ms: int) -> None:
+    # WAL lets the API read while workers write; busy_timeout makes writers queue on the
+    # lock instead of failing with "database is locked"; NORMAL is durable under WAL.
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA foreign_keys=ON")
+    finally:
+        cursor.close()
+
+
+def _server_pool_options() -> dict[str, Any]:
+    settings = get_settings()
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "pool_pre_ping": True,
+    }
+
+
+def build_engine(
+    database_url: str,
+    busy_timeout_ms: int = 5000,
+    tuned: bool = True,
+    pool_options: dict[str, Any] | None = None,
+) -> Engine:
+    if not database_url.startswith("sqlite"):
+        return create_engine(database_url, **(pool_options or {"pool_pre_ping": True}))
+
+    connect_args: dict[str, Any] = {"check_same_thread": False}
+    if tuned:
+        # sqlite3's own timeout (seconds) covers the window before the pragma runs.
+        connect_args["timeout"] = busy_timeout_ms / 1000
+    engine = create_engine(database_url, connect_args=connect_args)
+    if tuned:
+        event.listen(
+            engine,
+            "connect",
+            lambda dbapi_connection, _record: _set_sqlite_pragmas(
+                dbapi_connection, busy_timeout_ms
+            ),
+        )
+    return engine
+
+
+def build_async_engine(
+    database_url: str,
+    busy_timeout_ms: int = 5000,
+    pool_options: dict[str, Any] | None = None,
+) -> AsyncEngine:
+    if not database_url.startswith("sqlite"):
+        return create_async_engine(database_url, **(pool_options or {"pool_pre_ping": True}))
+
+    engine = create_async_engine(database_url, connect_args={"timeout": busy_timeout_ms / 1000})
+    event.listen(
+        engine.sync_engine,
+        "connect",
+        lambda dbapi_connection, _record: _set_sqlite_pragmas(dbapi_connection, busy_timeout_ms),
+    )
+    return engine
 
 
 def _create_engine() -> Engine:
     settings = get_settings()
-    connect_args = {}
-    if settings.database_url.startswith("sqlite"):
-        connect_args["check_same_thread"] = False
-    return create_engine(settings.database_url, connect_args=connect_args)
+    return build_engine(
+        settings.database_url,
+        busy_timeout_ms=settings.sqlite_busy_timeout_ms,
+        pool_options=None if settings.is_sqlite else _server_pool_options(),
+    )
 
 
 def get_engine() -> Engine:
@@ -40,6 +115,41 @@ def get_session_factory() -> sessionmaker[Session]:
     return _session_factory
 
 
+def get_async_engine() -> AsyncEngine:
+    global _async_engine  # noqa: PLW0603
+    if _async_engine is None:
+        settings = get_settings()
+        _async_engine = build_async_engine(
+            settings.async_database_url,
+            busy_timeout_ms=settings.sqlite_busy_timeout_ms,
+            pool_options=None if settings.is_sqlite else _server_pool_options(),
+        )
+    return _async_engine
+
+
+def get_async_session_factory() -> async_sessionmaker[AsyncSession]:
+    global _async_session_factory  # noqa: PLW0603
+    if _async_session_factory is None:
+        _async_session_factory = async_sessionmaker(
+            bind=get_async_engine(), class_=AsyncSession, expire_on_commit=False
+        )
+    return _async_session_factory
+
+
+def init_db(engine: Engine | None = None) -> None:
+    from app.db import models  # noqa: F401  (registers the mappers)
+    from app.db.migrations import upgrade_to_head
+
+    engine = engine or get_engine()
+    # Alembic owns the schema on every backend; see app/db/migrations.
+    upgrade_to_head(engine)
+    if engine.dialect.name == "sqlite":
+        # Files from before ix_published_created_at existed are stamped past it.
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
+
+
 @contextmanager
 def session_scope() -> Generator[Session, None, None]:
     session = get_session_factory()()
@@ -56,3 +166,29 @@ def session_scope() -> Generator[Session, None, None]:
 def get_session() -> Generator[Session, None, None]:
     with session_scope() as session:
         yield session
+
+
+@asynccontextmanager
+async def async_session_scope() -> AsyncGenerator[AsyncSession, None]:
+    session = get_async_session_factory()()
+    try:
+        yield session
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    async with async_session_scope() as session:
+        yield session
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _async_session_factory  # noqa: PLW0603
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _async_session_factory = None
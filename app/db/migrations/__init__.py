@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.utils.logging import get_logger
+
+
+logger = get_logger("migrations")
+
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent
+# Arbitrary constant shared by every node so only one of them migrates at a time.
+_MIGRATION_LOCK_ID = 0x79747274
+# SQLite files created by create_all before Alembic managed them have no version table.
+# The newest revision whose marker is present is stamped, then upgraded from; a marker
+# column of None means the table alone.
+_SCHEMA_MARKERS = (
+    ("0004", "published", "rutube_account"),
+    ("0003", "publish_jobs", "resources"),
+    ("0002", "publish_jobs", None),
+    ("0001", "published", None),
+)
+
+
+def alembic_config() -> Config:
+    cfg = Config()
+    cfg.set_main_option("script_location", str(MIGRATIONS_DIR))
+    return cfg
+
+
+def unversioned_revision(connection: Connection) -> str | None:
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    if "alembic_version" in tables:
+        return None
+    for revision, table, column in _SCHEMA_MARKERS:
+        if table not in tables:
+            continue
+        if column is None or column in {col["name"] for col in inspector.get_columns(table)}:
+            return revision
+    return None
+
+
+def upgrade_to_head(engine: Engine) -> None:
+    cfg = alembic_config()
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            lock = text("SELECT pg_advisory_xact_lock(:id)")
+            connection.execute(lock, {"id": _MIGRATION_LOCK_ID})
+        elif connection.dialect.name == "sqlite":
+            # Takes the write lock up front, so processes starting together migrate in turn.
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+        cfg.attributes["connection"] = connection
+        revision = unversioned_revision(connection)
+        if revision is not None:
+            command.stamp(cfg, revision)
+            logger.info("database_stamped", revision=revision)
+        command.upgrade(cfg, "head")
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from alembic import context
+from sqlalchemy.engine import Connection
+
+from app.db import models  # noqa: F401  (registers the mappers)
+from app.db.base import Base, build_engine
+
+
+target_metadata = Base.metadata
+
+
+def _run(connection: Connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_offline() -> None:
+    from app.config import get_settings
+
+    context.configure(
+        url=get_settings().database_url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connection = context.config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+
+    from app.config import get_settings
+
+    engine = build_engine(get_settings().database_url)
+    with engine.begin() as new_connection:
+        _run(new_connection)
+    engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
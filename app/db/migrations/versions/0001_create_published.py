@@ -0,0 +1,32 @@
+"""create published table
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "published",
+        sa.Column("video_id", sa.String(length=64), primary_key=True),
+        sa.Column("rutube_url", sa.String(length=255), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_published_created_at", "published", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_published_created_at", table_name="published")
+    op.drop_table("published")
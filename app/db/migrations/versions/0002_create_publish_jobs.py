@@ -0,0 +1,62 @@
+"""create publish_jobs table
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def _timestamp(name: str, nullable: bool = True) -> sa.Column:
+    return sa.Column(name, sa.DateTime(timezone=True), nullable=nullable)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "publish_jobs",
+        sa.Column("video_id", sa.String(length=64), primary_key=True),
+        sa.Column("channel_id", sa.String(length=64), nullable=True),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("priority", sa.String(length=16), nullable=True),
+        sa.Column("stage", sa.String(length=16), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        _timestamp("created_at", nullable=False),
+        _timestamp("updated_at", nullable=False),
+        _timestamp("download_started_at"),
+        _timestamp("download_finished_at"),
+        _timestamp("transcode_started_at"),
+        _timestamp("transcode_finished_at"),
+        _timestamp("upload_started_at"),
+        _timestamp("upload_finished_at"),
+        sa.Column("bytes_downloaded", sa.BigInteger(), nullable=True),
+        sa.Column("bytes_uploaded", sa.BigInteger(), nullable=True),
+        sa.Column("error_class", sa.String(length=32), nullable=True),
+        sa.Column("error", sa.String(length=500), nullable=True),
+        sa.Column("rutube_url", sa.String(length=255), nullable=True),
+    )
+    op.create_index("ix_publish_jobs_created", "publish_jobs", ["created_at", "video_id"])
+    op.create_index(
+        "ix_publish_jobs_status_created", "publish_jobs", ["status", "created_at", "video_id"]
+    )
+    op.create_index(
+        "ix_publish_jobs_channel_created",
+        "publish_jobs",
+        ["channel_id", "created_at", "video_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_publish_jobs_channel_created", table_name="publish_jobs")
+    op.drop_index("ix_publish_jobs_status_created", table_name="publish_jobs")
+    op.drop_index("ix_publish_jobs_created", table_name="publish_jobs")
+    op.drop_table("publish_jobs")
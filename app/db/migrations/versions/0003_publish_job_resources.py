@@ -0,0 +1,29 @@
+"""add resource usage to publish_jobs
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("publish_jobs") as batch:
+        batch.add_column(sa.Column("resolution", sa.String(length=16), nullable=True))
+        batch.add_column(sa.Column("resources", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("publish_jobs") as batch:
+        batch.drop_column("resources")
+        batch.drop_column("resolution")
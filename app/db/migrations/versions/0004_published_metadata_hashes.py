@@ -0,0 +1,33 @@
+"""add pushed metadata hashes to published
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("published") as batch:
+        batch.add_column(sa.Column("rutube_account", sa.String(length=64), nullable=True))
+        batch.add_column(sa.Column("metadata_hashes", sa.JSON(), nullable=True))
+        batch.add_column(
+            sa.Column("metadata_synced_at", sa.DateTime(timezone=True), nullable=True)
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("published") as batch:
+        batch.drop_column("metadata_synced_at")
+        batch.drop_column("metadata_hashes")
+        batch.drop_column("rutube_account")
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from datetime import UTC, datetime
+from typing import Any
 
-from sqlalchemy import DateTime, String
+from sqlalchemy import JSON, BigInteger, DateTime, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
@@ -10,9 +11,58 @@ from app.db.base import Base
 
 class PublishedVideo(Base):
     __tablename__ = "published"
+    __table_args__ = (Index("ix_published_created_at", "created_at"),)
 
     video_id: Mapped[str] = mapped_column(String(64), primary_key=True)
     rutube_url: Mapped[str] = mapped_column(String(255), nullable=False)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False
+        DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False
     )
+    # What was last pushed to RuTube, for metadata re-syncs: the uploading account and
+    # {field: sha256} of the mapped title, description and tags.
+    rutube_account: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    metadata_hashes: Mapped[dict[str, str] | None] = mapped_column(JSON, nullable=True)
+    metadata_synced_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+
+def _timestamp(nullable: bool = True) -> Mapped[datetime | None]:
+    return mapped_column(DateTime(timezone=True), nullable=nullable)
+
+
+class PublishJob(Base):
+    __tablename__ = "publish_jobs"
+    # Every index ends in (created_at, video_id) so filtered history pages are keyset scans.
+    __table_args__ = (
+        Index("ix_publish_jobs_created", "created_at", "video_id"),
+        Index("ix_publish_jobs_status_created", "status", "created_at", "video_id"),
+        Index("ix_publish_jobs_channel_created", "channel_id", "created_at", "video_id"),
+    )
+
+    video_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    channel_id: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    status: Mapped[str] = mapped_column(String(16), nullable=False)
+    priority: Mapped[str | None] = mapped_column(String(16), nullable=True)
+    stage: Mapped[str | None] = mapped_column(String(16), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False
+    )
+    download_started_at: Mapped[datetime | None] = _timestamp()
+    download_finished_at: Mapped[datetime | None] = _timestamp()
+    transcode_started_at: Mapped[datetime | None] = _timestamp()
+    transcode_finished_at: Mapped[datetime | None] = _timestamp()
+    upload_started_at: Mapped[datetime | None] = _timestamp()
+    upload_finished_at: Mapped[datetime | None] = _timestamp()
+    bytes_downloaded: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    bytes_uploaded: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    error_class: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    error: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    rutube_url: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    resolution: Mapped[str | None] = mapped_column(String(16), nullable=True)
+    # {stage: {wall_seconds, cpu_seconds, peak_rss_bytes, peak_disk_bytes}}
+    resources: Mapped[dict[str, Any] | None] = mapped_column(JSON, nullable=True)
@@ -1,12 +1,21 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import Sequence
+from collections.abc import Callable, Iterable, Sequence
+from datetime import UTC, datetime
+from typing import Any
 
 from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 
-from app.db.models import PublishedVideo
+from app.db.models import PublishedVideo, PublishJob
+
+
+# Single-statement upsert, so concurrent workers never race a SELECT-then-INSERT.
+_INSERTS: dict[str, Callable[..., postgresql.Insert | sqlite.Insert]] = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
 
 
 def get_published(session: Session, video_id: str) -> PublishedVideo | None:
@@ -17,14 +26,83 @@ def is_published(session: Session, video_id: str) -> bool:
     return get_published(session, video_id) is not None
 
 
-def mark_published(session: Session, video_id: str, rutube_url: str) -> None:
-    session.merge(
-        PublishedVideo(
-            video_id=video_id,
-            rutube_url=rutube_url,
-            created_at=datetime.now(timezone.utc),
-        )
+def get_published_ids(
+    session: Session, video_ids: Iterable[str], chunk_size: int = 500
+) -> set[str]:
+    ids = list(dict.fromkeys(video_ids))
+    published: set[str] = set()
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start : start + chunk_size]
+        stmt = select(PublishedVideo.video_id).where(PublishedVideo.video_id.in_(chunk))
+        published.update(session.execute(stmt).scalars().all())
+    return published
+
+
+def get_published_since(
+    session: Session, since: datetime | None = None
+) -> list[tuple[str, datetime]]:
+    stmt = select(PublishedVideo.video_id, PublishedVideo.created_at)
+    if since is not None:
+        # Inclusive, so rows sharing the watermark timestamp are never skipped.
+        stmt = stmt.where(PublishedVideo.created_at >= since)
+    return [(video_id, created_at) for video_id, created_at in session.execute(stmt)]
+
+
+def mark_published(
+    session: Session,
+    video_id: str,
+    rutube_url: str,
+    account: str | None = None,
+    metadata_hashes: dict[str, str] | None = None,
+) -> None:
+    now = datetime.now(UTC)
+    values = {
+        "video_id": video_id,
+        "rutube_url": rutube_url,
+        "created_at": now,
+        "rutube_account": account,
+        "metadata_hashes": metadata_hashes,
+        "metadata_synced_at": now if metadata_hashes is not None else None,
+    }
+    insert = _INSERTS.get(session.get_bind().dialect.name)
+    if insert is None:
+        session.merge(PublishedVideo(**values))
+        return
+    stmt = insert(PublishedVideo).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PublishedVideo.video_id],
+        set_={key: stmt.excluded[key] for key in values if key != "video_id"},
     )
+    session.execute(stmt)
+
+
+def get_pushed_metadata(
+    session: Session, video_ids: Iterable[str], chunk_size: int = 500
+) -> dict[str, tuple[str, str | None, dict[str, str] | None]]:
+    ids = list(dict.fromkeys(video_ids))
+    pushed: dict[str, tuple[str, str | None, dict[str, str] | None]] = {}
+    for start in range(0, len(ids), chunk_size):
+        stmt = select(
+            PublishedVideo.video_id,
+            PublishedVideo.rutube_url,
+            PublishedVideo.rutube_account,
+            PublishedVideo.metadata_hashes,
+        ).where(PublishedVideo.video_id.in_(ids[start : start + chunk_size]))
+        for video_id, rutube_url, account, hashes in session.execute(stmt):
+            pushed[video_id] = (rutube_url, account, hashes)
+    return pushed
+
+
+def record_metadata_sync(
+    session: Session, video_id: str, metadata_hashes: dict[str, str], account: str | None
+) -> None:
+    record = session.get(PublishedVideo, video_id)
+    if record is None:
+        return
+    record.metadata_hashes = metadata_hashes
+    record.metadata_synced_at = datetime.now(UTC)
+    if account is not None:
+        record.rutube_account = account
 
 
 def get_recent(session: Session, limit: int = 50) -> Sequence[PublishedVideo]:
@@ -34,3 +112,35 @@ def get_recent(session: Session, limit: int = 50) -> Sequence[PublishedVideo]:
         .limit(limit)
     )
     return session.execute(stmt).scalars().all()
+
+
+def save_publish_job(
+    session: Session, video_id: str, values: dict[str, Any], new_attempt: bool = False
+) -> None:
+    now = datetime.now(UTC)
+    updates = {**values, "updated_at": now}
+    insert = _INSERTS.get(session.get_bind().dialect.name)
+    if insert is None:
+        job = session.get(PublishJob, video_id)
+        if job is None:
+            job = PublishJob(video_id=video_id, created_at=now, attempts=0, status="running")
+            session.add(job)
+        for key, value in updates.items():
+            setattr(job, key, value)
+        if new_attempt:
+            job.attempts += 1
+        return
+
+    row = {
+        "status": "running",
+        **updates,
+        "video_id": video_id,
+        "created_at": now,
+        "attempts": 1 if new_attempt else 0,
+    }
+    stmt = insert(PublishJob).values(**row)
+    set_: dict[str, Any] = {key: stmt.excluded[key] for key in updates}
+    if new_attempt:
+        set_["attempts"] = PublishJob.attempts + 1
+    stmt = stmt.on_conflict_do_update(index_elements=[PublishJob.video_id], set_=set_)
+    session.execute(stmt)
@@ -1,26 +1,85 @@
 from __future__ import annotations
 
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+
+from fastapi import FastAPI, Request, Response
+from prometheus_client import REGISTRY
+from prometheus_client.registry import Collector
 
 from app import __version__
 from app.config import get_settings
-from app.db.base import Base, get_engine
-from app.routes import admin, webhook
+from app.db.base import dispose_async_engine, init_db
+from app.routes import admin, metrics, webhook
+from app.services.published_index import get_published_index
+from app.services.scheduling import worker_queue_names
 from app.utils.logging import configure_logging, get_logger
+from app.utils.metrics import HTTP_SECONDS, PublishedIndexCollector, QueueDepthCollector
+from app.utils.redis_pool import get_redis
+from app.utils.tracing import configure_tracing, flush_spans, start_span
+
+
+_collectors: list[Collector] = []
+
+CallNext = Callable[[Request], Awaitable[Response]]
 
 
 @asynccontextmanager
-async def lifespan(app: FastAPI):
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     settings = get_settings()
-    configure_logging(settings.log_level)
-    Base.metadata.create_all(bind=get_engine())
+    configure_logging(**settings.logging_options)
+    configure_tracing("api")
+    init_db()
     logger = get_logger("startup")
+    try:
+        get_published_index().refresh(force=True)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("published_index_warmup_failed", error=str(exc))
     logger.info("application_started", version=settings.application_version)
     try:
         yield
     finally:
         logger.info("application_stopping")
+        await dispose_async_engine()
+        flush_spans()
+
+
+def _register_collectors() -> None:
+    if _collectors:
+        return
+    _collectors.append(QueueDepthCollector(get_redis, worker_queue_names))
+    # The API process owns the index that answers WebSub lookups.
+    _collectors.append(PublishedIndexCollector(lambda: get_published_index().stats()))
+    for collector in _collectors:
+        REGISTRY.register(collector)
+
+
+async def _observe_latency(request: Request, call_next: CallNext) -> Response:
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # The route template keeps label cardinality bounded; unmatched paths share one label.
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        HTTP_SECONDS.labels(request.method, route_path, str(status_code)).observe(
+            time.perf_counter() - started
+        )
+
+
+async def _trace_request(request: Request, call_next: CallNext) -> Response:
+    # Ingestion starts the trace; enqueue_publish_job copies it into the RQ job meta.
+    with start_span(f"{request.method} {request.url.path}") as span:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        if route is not None:
+            span.update_name(f"{request.method} {route.path}")
+        span.set_attribute("http.status_code", response.status_code)
+        return response
 
 
 def create_app() -> FastAPI:
@@ -35,6 +94,10 @@ def create_app() -> FastAPI:
         prefix="",
     )
     fastapi_app.include_router(admin.router, prefix="/api")
+    fastapi_app.include_router(metrics.router)
+    fastapi_app.middleware("http")(_trace_request)
+    fastapi_app.middleware("http")(_observe_latency)
+    _register_collectors()
     return fastapi_app
 
 
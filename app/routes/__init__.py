@@ -1,3 +1,4 @@
 from . import admin, webhook
 
+
 __all__ = ["admin", "webhook"]
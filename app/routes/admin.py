@@ -1,15 +1,31 @@
 from __future__ import annotations
 
+import base64
+import json
+from datetime import datetime
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
 from app import __version__
 from app.config import AppConfig, get_settings
-from app.db.base import get_session
-from app.db import repo
+from app.db import async_repo
+from app.db.base import get_async_session
+from app.services import backfill
+from app.services.accounts import get_account_pool
+from app.services.circuit_breaker import BREAKER_NAMES, get_breaker
+from app.services.disk_budget import get_disk_budget
+from app.services.job_tracking import JOB_STATUSES, TRACKED_STAGES
 from app.services.orchestrator import enqueue_publish_job
+from app.services.profiling import summarize_resources
+from app.services.published_index import get_published_index
+from app.services.scheduling import PRIORITY_RETRIGGER, PRIORITY_WEBSUB, queue_wait_summary
+from app.services.session_check import get_session_status, refresh_session_status
+from app.services.workdir_gc import get_work_dir_sweeper
 from app.utils.logging import get_logger
+from app.utils.redis_pool import get_redis
 
 
 router = APIRouter()
@@ -22,29 +38,40 @@ def version(settings: AppConfig = Depends(get_settings)) -> dict[str, str]:
 
 
 @router.get("/trigger")
-def trigger_video(
+async def trigger_video(
     video_id: str = Query(..., alias="videoId"),
     force: bool = Query(False),
-    session=Depends(get_session),
+    duration_seconds: float | None = Query(None, alias="durationSeconds", gt=0),
+    filesize_bytes: int | None = Query(None, alias="filesizeBytes", gt=0),
+    profile: bool = Query(False),
 ) -> Response:
     if not video_id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid videoId")
 
-    if not force and repo.is_published(session, video_id):
+    if not force and await run_in_threadpool(get_published_index().is_published, video_id):
         logger.info("trigger_duplicate", video_id=video_id)
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Already published")
 
-    enqueue_publish_job(video_id)
-    logger.info("trigger_enqueued", video_id=video_id)
+    priority = PRIORITY_RETRIGGER if force else PRIORITY_WEBSUB
+    await run_in_threadpool(
+        enqueue_publish_job,
+        video_id,
+        priority=priority,
+        duration_seconds=duration_seconds,
+        filesize_bytes=filesize_bytes,
+        profile=profile,
+        force=force,
+    )
+    logger.info("trigger_enqueued", video_id=video_id, priority=priority, profile=profile)
     return Response(status_code=status.HTTP_202_ACCEPTED)
 
 
 @router.get("/published")
-def list_published(
+async def list_published(
     limit: int = Query(50, ge=1, le=200),
-    session=Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ) -> list[dict[str, Any]]:
-    videos = repo.get_recent(session, limit=limit)
+    videos = await async_repo.get_recent(session, limit=limit)
     return [
         {
             "videoId": item.video_id,
@@ -53,3 +80,175 @@ def list_published(
         }
         for item in videos
     ]
+
+
+def _encode_cursor(created_at: datetime, video_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), video_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, video_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(video_id)
+    except (ValueError, TypeError) as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        ) from exc
+
+
+def _iso(value: datetime | None) -> str | None:
+    return value.isoformat() if value else None
+
+
+@router.get("/jobs")
+async def list_jobs(  # noqa: PLR0913
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = Query(None),
+    job_status: str | None = Query(None, alias="status"),
+    channel_id: str | None = Query(None, alias="channelId"),
+    since: datetime | None = Query(None),
+    until: datetime | None = Query(None),
+    session: AsyncSession = Depends(get_async_session),
+) -> dict[str, Any]:
+    if job_status is not None and job_status not in JOB_STATUSES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid status")
+
+    jobs = await async_repo.get_job_history(
+        session,
+        limit=limit + 1,
+        after=_decode_cursor(cursor) if cursor else None,
+        status=job_status,
+        channel_id=channel_id,
+        since=since,
+        until=until,
+    )
+    page = jobs[:limit]
+    next_cursor = None
+    if len(jobs) > limit:
+        last = page[-1]
+        next_cursor = _encode_cursor(last.created_at, last.video_id)
+    return {
+        "items": [
+            {
+                "videoId": job.video_id,
+                "channelId": job.channel_id,
+                "status": job.status,
+                "priority": job.priority,
+                "stage": job.stage,
+                "attempts": job.attempts,
+                "createdAt": job.created_at.isoformat(),
+                "updatedAt": job.updated_at.isoformat(),
+                "stages": {
+                    stage: {
+                        "startedAt": _iso(getattr(job, f"{stage}_started_at")),
+                        "finishedAt": _iso(getattr(job, f"{stage}_finished_at")),
+                    }
+                    for stage in TRACKED_STAGES
+                },
+                "bytesDownloaded": job.bytes_downloaded,
+                "bytesUploaded": job.bytes_uploaded,
+                "errorClass": job.error_class,
+                "error": job.error,
+                "rutubeUrl": job.rutube_url,
+            }
+            for job in page
+        ],
+        "nextCursor": next_cursor,
+    }
+
+
+@router.get("/stats/resources")
+async def resource_stats(
+    limit: int = Query(1000, ge=1, le=10000),
+    job_status: str | None = Query("succeeded", alias="status"),
+    session: AsyncSession = Depends(get_async_session),
+) -> dict[str, Any]:
+    samples = await async_repo.get_resource_samples(session, limit=limit, status=job_status)
+    return {"jobs": len(samples), "byResolution": summarize_resources(samples)}
+
+
+@router.get("/stats/queue-wait")
+def queue_wait_stats() -> dict[str, dict[str, float | int]]:
+    return queue_wait_summary(get_redis())
+
+
+@router.get("/stats/published-index")
+def published_index_stats() -> dict[str, Any]:
+    return get_published_index().stats()
+
+
+@router.get("/breakers")
+def list_breakers() -> list[dict[str, Any]]:
+    return [get_breaker(name).snapshot() for name in BREAKER_NAMES]
+
+
+@router.post("/breakers/{name}/reset")
+def reset_breaker(name: str) -> dict[str, Any]:
+    if name not in BREAKER_NAMES:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown breaker")
+    breaker = get_breaker(name)
+    breaker.reset()
+    logger.info("breaker_reset", breaker=name)
+    return breaker.snapshot()
+
+
+@router.get("/session")
+def rutube_session(
+    refresh: bool = Query(False),
+    settings: AppConfig = Depends(get_settings),
+) -> list[dict[str, str]]:
+    check = refresh_session_status if refresh else get_session_status
+    return [
+        {"account": account.name, "status": check(account.cookies_path)}
+        for account in settings.accounts
+    ]
+
+
+@router.get("/accounts")
+def list_accounts() -> list[dict[str, Any]]:
+    return get_account_pool().snapshot()
+
+
+@router.get("/disk")
+def disk_reservations() -> dict[str, Any]:
+    return get_disk_budget().snapshot()
+
+
+@router.get("/work-dir/gc")
+def work_dir_gc_report() -> dict[str, Any]:
+    report = get_work_dir_sweeper().last_report()
+    if report is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No sweep yet")
+    return report
+
+
+@router.post("/work-dir/gc")
+async def run_work_dir_gc(dry_run: bool = Query(False, alias="dryRun")) -> dict[str, Any]:
+    report = await run_in_threadpool(get_work_dir_sweeper().sweep, dry_run)
+    return report.as_dict()
+
+
+@router.post("/backfill", status_code=status.HTTP_202_ACCEPTED)
+def start_backfill(
+    channel_id: str | None = Query(None, alias="channelId"),
+    restart: bool = Query(False),
+    settings: AppConfig = Depends(get_settings),
+) -> dict[str, Any]:
+    target = channel_id or settings.youtube_channel_id
+    progress = backfill.start_backfill(target, restart=restart)
+    logger.info("backfill_requested", channel_id=target, restart=restart)
+    return progress.as_dict()
+
+
+@router.get("/backfill")
+def backfill_status(
+    channel_id: str | None = Query(None, alias="channelId"),
+    settings: AppConfig = Depends(get_settings),
+) -> dict[str, Any]:
+    target = channel_id or settings.youtube_channel_id
+    progress = backfill.get_progress(target)
+    if progress is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No backfill found")
+    return progress.as_dict()
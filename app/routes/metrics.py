@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Response
+
+from app.utils.metrics import render_latest
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    payload, content_type = render_latest()
+    return Response(content=payload, media_type=content_type)
@@ -6,17 +6,26 @@ import xml.etree.ElementTree as ET
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from starlette.concurrency import run_in_threadpool
 
 from app.config import AppConfig, get_settings
-from app.db.base import get_session
-from app.db import repo
-from app.services.orchestrator import enqueue_publish_job
+from app.services.dedupe import NotificationDeduper, get_deduper
+from app.services.metadata_sync import request_metadata_sync
+from app.services.orchestrator import cancel_publish_job, enqueue_publish_job
+from app.services.published_index import PublishedIndex, get_published_index
 from app.utils.logging import get_logger
 
 
 router = APIRouter()
 logger = get_logger("webhook")
 
+_ATOM_NS = {
+    "atom": "http://www.w3.org/2005/Atom",
+    "yt": "http://www.youtube.com/xml/schemas/2015",
+    "at": "http://purl.org/atompub/tombstones/1.0",
+}
+_DELETED_REF_PREFIX = "yt:video:"
+
 
 def _verify_signature(config: AppConfig, signature_headers: dict[str, str], body: bytes) -> bool:
     if not config.web_sub_secret:
@@ -37,23 +46,31 @@ def _verify_signature(config: AppConfig, signature_headers: dict[str, str], body
     return False
 
 
-def _extract_video_ids(xml_body: bytes) -> list[str]:
+def _extract_notification(xml_body: bytes) -> tuple[list[str], list[str]]:
     try:
         root = ET.fromstring(xml_body)
     except ET.ParseError as exc:  # noqa: BLE001
         logger.warning("websub_invalid_xml", error=str(exc))
-        return []
+        return [], []
 
-    ns = {
-        "atom": "http://www.w3.org/2005/Atom",
-        "yt": "http://www.youtube.com/xml/schemas/2015",
-    }
     video_ids: list[str] = []
-    for entry in root.findall("atom:entry", ns):
-        video_id_elem = entry.find("yt:videoId", ns)
+    for entry in root.findall("atom:entry", _ATOM_NS):
+        video_id_elem = entry.find("yt:videoId", _ATOM_NS)
         if video_id_elem is not None and video_id_elem.text:
             video_ids.append(video_id_elem.text.strip())
-    return video_ids
+
+    deleted_ids: list[str] = []
+    for tombstone in root.findall("at:deleted-entry", _ATOM_NS):
+        ref = (tombstone.get("ref") or "").strip()
+        if ref.startswith(_DELETED_REF_PREFIX):
+            ref = ref[len(_DELETED_REF_PREFIX) :]
+        if ref:
+            deleted_ids.append(ref)
+    return video_ids, deleted_ids
+
+
+def _extract_video_ids(xml_body: bytes) -> list[str]:
+    return _extract_notification(xml_body)[0]
 
 
 @router.get("/health")
@@ -78,7 +95,8 @@ async def youtube_challenge(request: Request, settings: AppConfig = Depends(get_
 async def youtube_notification(
     request: Request,
     settings: AppConfig = Depends(get_settings),
-    db_session=Depends(get_session),
+    deduper: NotificationDeduper = Depends(get_deduper),
+    index: PublishedIndex = Depends(get_published_index),
 ) -> Response:
     body = await request.body()
     headers = {k.lower(): v for k, v in request.headers.items()}
@@ -87,16 +105,38 @@ async def youtube_notification(
         logger.warning("websub_signature_invalid")
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid signature")
 
-    video_ids = _extract_video_ids(body)
-    logger.info("websub_notification", video_ids=video_ids)
+    video_ids, deleted_ids = _extract_notification(body)
+    logger.info("websub_notification", video_ids=video_ids, deleted_ids=deleted_ids)
+
+    for video_id in deleted_ids:
+        canceled = await run_in_threadpool(cancel_publish_job, video_id)
+        logger.info("websub_deleted_entry", video_id=video_id, canceled=canceled)
+
+    candidate_ids = [video_id for video_id in video_ids if video_id not in deleted_ids]
+    published: set[str] = set()
+    if candidate_ids:
+        published = await run_in_threadpool(index.published_ids, candidate_ids)
+    # Already published: YouTube notifies again when the title or description is edited.
+    # Checked before dedupe, since edits often follow the upload within the dedupe TTL.
+    resync_ids = [video_id for video_id in candidate_ids if video_id in published]
+    if resync_ids:
+        logger.info("websub_published_update", video_ids=resync_ids)
+        await run_in_threadpool(request_metadata_sync, resync_ids)
+
     accepted = []
-    for video_id in video_ids:
-        if repo.is_published(db_session, video_id):
-            logger.info("websub_duplicate", video_id=video_id)
+    for video_id in candidate_ids:
+        if video_id in published:
+            continue
+        if await run_in_threadpool(deduper.is_duplicate, video_id):
+            logger.info("websub_duplicate_notification", video_id=video_id)
             continue
-        enqueue_publish_job(video_id)
+        try:
+            await run_in_threadpool(enqueue_publish_job, video_id)
+        except Exception:
+            await run_in_threadpool(deduper.forget, video_id)
+            raise
         accepted.append(video_id)
 
-    if not accepted:
+    if not accepted and not resync_ids:
         return Response(status_code=status.HTTP_204_NO_CONTENT)
     return Response(status_code=status.HTTP_202_ACCEPTED)
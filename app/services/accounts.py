@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, cast
+
+from redis import Redis
+
+from app.config import AppConfig, RutubeAccount, get_settings
+from app.services.session_check import (
+    SESSION_INVALID,
+    get_session_status,
+    invalidate_session_cache,
+)
+from app.utils.logging import get_logger
+from app.utils.redis_pool import get_redis
+
+
+logger = get_logger("accounts")
+
+KEY_PREFIX = "account:"
+ROUND_ROBIN_KEY = "account:round_robin"
+LEASE_TTL_SECONDS = 3 * 3600
+RATE_WINDOW_SECONDS = 3600
+
+
+@dataclass(slots=True)
+class AccountLease:
+    account: RutubeAccount
+    lease_id: str
+    # release() records the time since this as the account's upload latency.
+    started_at: float = field(default_factory=time.monotonic)
+
+
+class AccountPool:
+    def __init__(self, redis_conn: Redis, cfg: AppConfig) -> None:
+        self._redis = redis_conn
+        self._accounts = cfg.accounts
+        self._strategy = cfg.rutube_account_strategy
+
+    @staticmethod
+    def _key(account: RutubeAccount, suffix: str) -> str:
+        return f"{KEY_PREFIX}{account.name}:{suffix}"
+
+    def _candidates(self, channel_id: str | None) -> list[RutubeAccount]:
+        if channel_id:
+            pinned = [account for account in self._accounts if channel_id in account.channels]
+            if pinned:
+                return pinned
+        return [account for account in self._accounts if not account.channels] or self._accounts
+
+    def _inflight(self, account: RutubeAccount, now: float) -> int:
+        # Leases are a sorted set scored by expiry, so a crashed worker cannot leak a slot.
+        key = self._key(account, "leases")
+        self._redis.zremrangebyscore(key, "-inf", now)
+        return cast(int, self._redis.zcard(key))
+
+    def _recent_uploads(self, account: RutubeAccount, now: float) -> int:
+        key = self._key(account, "uploads")
+        self._redis.zremrangebyscore(key, "-inf", now - RATE_WINDOW_SECONDS)
+        return cast(int, self._redis.zcard(key))
+
+    def _usable(self, account: RutubeAccount, now: float) -> bool:
+        if get_session_status(account.cookies_path) == SESSION_INVALID:
+            return False
+        if account.uploads_per_hour and (
+            self._recent_uploads(account, now) >= account.uploads_per_hour
+        ):
+            return False
+        limit = account.max_concurrency
+        return limit is None or self._inflight(account, now) < limit
+
+    def _load(self, account: RutubeAccount, now: float) -> float:
+        if account.max_concurrency is None:
+            return 0.0
+        return self._inflight(account, now) / account.max_concurrency
+
+    def _ordered(self, candidates: list[RutubeAccount], now: float) -> list[RutubeAccount]:
+        if self._strategy == "round_robin":
+            offset = cast(int, self._redis.incr(ROUND_ROBIN_KEY)) % len(candidates)
+            return candidates[offset:] + candidates[:offset]
+        return sorted(candidates, key=lambda account: self._load(account, now))
+
+    def acquire(self, channel_id: str | None = None) -> AccountLease | None:
+        now = time.time()
+        candidates = [a for a in self._candidates(channel_id) if self._usable(a, now)]
+        if not candidates:
+            logger.warning("account_unavailable", channel_id=channel_id)
+            return None
+        for account in self._ordered(candidates, now):
+            lease_id = uuid.uuid4().hex
+            key = self._key(account, "leases")
+            self._redis.zadd(key, {lease_id: now + LEASE_TTL_SECONDS})
+            limit = account.max_concurrency
+            if limit is None or self._inflight(account, now) <= limit:
+                logger.info("account_acquired", account=account.name, channel_id=channel_id)
+                return AccountLease(account=account, lease_id=lease_id)
+            # Lost a race with another worker for the last slot.
+            self._redis.zrem(key, lease_id)
+        logger.warning("account_unavailable", channel_id=channel_id)
+        return None
+
+    def serves(self, account: RutubeAccount, channel_id: str | None) -> bool:
+        return account in self._candidates(channel_id)
+
+    def cancel(self, lease: AccountLease) -> None:
+        # Frees a slot the job never uploaded with; no stats are recorded.
+        self._redis.zrem(self._key(lease.account, "leases"), lease.lease_id)
+
+    def release(self, lease: AccountLease, success: bool, auth_failed: bool = False) -> None:
+        account = lease.account
+        latency_ms = int((time.monotonic() - lease.started_at) * 1000)
+        stats_key = self._key(account, "stats")
+        with self._redis.pipeline() as pipe:
+            pipe.zrem(self._key(account, "leases"), lease.lease_id)
+            if success:
+                pipe.zadd(self._key(account, "uploads"), {lease.lease_id: time.time()})
+                pipe.hincrby(stats_key, "success", 1)
+                pipe.hincrby(stats_key, "latency_ms_total", latency_ms)
+            else:
+                pipe.hincrby(stats_key, "failure", 1)
+            pipe.hset(stats_key, mapping={"last_latency_ms": latency_ms})
+            pipe.execute()
+        if auth_failed:
+            invalidate_session_cache(account.cookies_path)
+            logger.warning("account_disabled", account=account.name)
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        now = time.time()
+        result = []
+        for account in self._accounts:
+            raw = cast(dict[bytes, bytes], self._redis.hgetall(self._key(account, "stats")))
+            stats = {key.decode(): int(value) for key, value in raw.items()}
+            success = stats.get("success", 0)
+            avg_latency = stats.get("latency_ms_total", 0) // success if success else None
+            result.append(
+                {
+                    "name": account.name,
+                    "session": get_session_status(account.cookies_path),
+                    "inflight": self._inflight(account, now),
+                    "maxConcurrency": account.max_concurrency,
+                    "uploadsLastHour": self._recent_uploads(account, now),
+                    "uploadsPerHour": account.uploads_per_hour,
+                    "channels": account.channels,
+                    "success": success,
+                    "failure": stats.get("failure", 0),
+                    "avgLatencyMs": avg_latency,
+                }
+            )
+        return result
+
+
+def get_account_pool() -> AccountPool:
+    return AccountPool(get_redis(), get_settings())
@@ -0,0 +1,356 @@
+from __future__ import annotations
+
+import argparse
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Any, cast
+
+from redis import Redis
+from rq import Queue
+
+from app.config import get_settings
+from app.db import repo
+from app.db.base import session_scope
+from app.services.orchestrator import enqueue_publish_jobs
+from app.services.scheduling import (
+    BACKFILL_CONTROL_QUEUE_NAME,
+    PRIORITY_BACKFILL,
+    class_queue_names,
+)
+from app.utils.logging import get_logger
+from app.utils.redis_pool import get_redis
+
+
+logger = get_logger("backfill")
+
+STATE_KEY_PREFIX = "backfill:state:"
+VIDEOS_KEY_PREFIX = "backfill:videos:"
+DURATIONS_KEY_PREFIX = "backfill:durations:"
+# Holds the id of the channel's live tick chain; only its owner schedules the next tick, so
+# repeated starts never run parallel chains against one cursor.
+CHAIN_KEY_PREFIX = "backfill:chain:"
+# Outlives a tick's delay plus a slow channel listing; a chain whose tick was lost expires.
+CHAIN_GUARD_SLACK_SECONDS = 900
+
+STATUS_LISTING = "listing"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+
+
+@dataclass(slots=True)
+class BackfillProgress:
+    channel_id: str
+    status: str
+    cursor: int
+    total: int
+    enqueued: int
+    skipped: int
+    started_at: str
+    updated_at: str
+
+    @property
+    def remaining(self) -> int:
+        return max(self.total - self.cursor, 0)
+
+    def as_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        data["remaining"] = self.remaining
+        return data
+
+
+def _state_key(channel_id: str) -> str:
+    return f"{STATE_KEY_PREFIX}{channel_id}"
+
+
+def _videos_key(channel_id: str) -> str:
+    return f"{VIDEOS_KEY_PREFIX}{channel_id}"
+
+
+def _durations_key(channel_id: str) -> str:
+    return f"{DURATIONS_KEY_PREFIX}{channel_id}"
+
+
+def _chain_key(channel_id: str) -> str:
+    return f"{CHAIN_KEY_PREFIX}{channel_id}"
+
+
+def _now_iso() -> str:
+    return datetime.now(UTC).isoformat()
+
+
+def list_channel_videos(channel_id: str) -> list[tuple[str, float | None]]:
+    from yt_dlp import YoutubeDL
+
+    channel_url = f"https://www.youtube.com/channel/{channel_id}/videos"
+    ydl_opts = {
+        "extract_flat": "in_playlist",
+        "skip_download": True,
+        "quiet": True,
+        "no_warnings": True,
+    }
+    logger.info("backfill_listing_start", channel_url=channel_url)
+    with YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(channel_url, download=False)
+
+    videos: list[tuple[str, float | None]] = []
+    for entry in (info or {}).get("entries") or []:
+        if entry and entry.get("id"):
+            duration = entry.get("duration")
+            videos.append((str(entry["id"]), float(duration) if duration else None))
+    # The channel tab is newest-first; backfill oldest-first so the cursor stays stable
+    # while new uploads are appended to the channel.
+    videos.reverse()
+    logger.info("backfill_listing_complete", channel_id=channel_id, count=len(videos))
+    return videos
+
+
+def get_progress(channel_id: str, redis_conn: Redis | None = None) -> BackfillProgress | None:
+    redis_conn = redis_conn or get_redis()
+    raw = cast(dict[bytes, bytes], redis_conn.hgetall(_state_key(channel_id)))
+    if not raw:
+        return None
+    state = {key.decode(): value.decode() for key, value in raw.items()}
+    return BackfillProgress(
+        channel_id=channel_id,
+        status=state.get("status", STATUS_RUNNING),
+        cursor=int(state.get("cursor", 0)),
+        total=int(state.get("total", 0)),
+        enqueued=int(state.get("enqueued", 0)),
+        skipped=int(state.get("skipped", 0)),
+        started_at=state.get("started_at", ""),
+        updated_at=state.get("updated_at", ""),
+    )
+
+
+def _require_progress(redis_conn: Redis, channel_id: str) -> BackfillProgress:
+    progress = get_progress(channel_id, redis_conn)
+    if progress is None:
+        # Only read right after a write, so the state key was deleted concurrently.
+        raise RuntimeError(f"Backfill state for channel {channel_id} disappeared")
+    return progress
+
+
+def _chain_ttl() -> int:
+    return get_settings().backfill_tick_seconds + CHAIN_GUARD_SLACK_SECONDS
+
+
+def _claim_chain(redis_conn: Redis, channel_id: str, chain_id: str) -> bool:
+    """Takes the channel's tick chain, or extends it when `chain_id` already owns it."""
+    key = _chain_key(channel_id)
+    if redis_conn.set(key, chain_id, nx=True, ex=_chain_ttl()):
+        return True
+    owner = cast(bytes | None, redis_conn.get(key))
+    if owner is None:
+        return bool(redis_conn.set(key, chain_id, nx=True, ex=_chain_ttl()))
+    if owner.decode() != chain_id:
+        return False
+    redis_conn.expire(key, _chain_ttl())
+    return True
+
+
+def _release_chain(redis_conn: Redis, channel_id: str, chain_id: str) -> None:
+    key = _chain_key(channel_id)
+    owner = cast(bytes | None, redis_conn.get(key))
+    if owner is not None and owner.decode() == chain_id:
+        redis_conn.delete(key)
+
+
+def _schedule_tick(channel_id: str, cursor: int, delay_seconds: int, chain_id: str) -> None:
+    queue = Queue(BACKFILL_CONTROL_QUEUE_NAME, connection=get_redis())
+    queue.enqueue_in(
+        timedelta(seconds=delay_seconds),
+        backfill_tick,
+        channel_id,
+        chain_id=chain_id,
+        # Unique per tick: a throttled tick reschedules at the same cursor, and with
+        # result_ttl=0 a shared id would be deleted by RQ once the running tick finishes.
+        job_id=f"backfill:{channel_id}:{cursor}:{uuid.uuid4().hex[:8]}",
+        result_ttl=0,
+        description=f"Backfill tick for channel {channel_id} at {cursor}",
+    )
+
+
+def _reset_state(redis_conn: Redis, channel_id: str, status: str) -> None:
+    now = _now_iso()
+    with redis_conn.pipeline() as pipe:
+        pipe.delete(_videos_key(channel_id), _durations_key(channel_id), _state_key(channel_id))
+        pipe.hset(
+            _state_key(channel_id),
+            mapping={
+                "status": status,
+                "cursor": 0,
+                "total": 0,
+                "enqueued": 0,
+                "skipped": 0,
+                "started_at": now,
+                "updated_at": now,
+            },
+        )
+        pipe.execute()
+
+
+def _store_listing(redis_conn: Redis, channel_id: str) -> BackfillProgress:
+    videos = list_channel_videos(channel_id)
+    video_ids = [video_id for video_id, _ in videos]
+    durations = {video_id: duration for video_id, duration in videos if duration}
+    with redis_conn.pipeline() as pipe:
+        if video_ids:
+            pipe.rpush(_videos_key(channel_id), *video_ids)
+        if durations:
+            pipe.hset(_durations_key(channel_id), mapping=durations)
+        pipe.hset(
+            _state_key(channel_id),
+            mapping={
+                "status": STATUS_RUNNING if video_ids else STATUS_DONE,
+                "total": len(video_ids),
+                "updated_at": _now_iso(),
+            },
+        )
+        pipe.execute()
+    progress = _require_progress(redis_conn, channel_id)
+    logger.info("backfill_listed", **progress.as_dict())
+    return progress
+
+
+def start_backfill(
+    channel_id: str, restart: bool = False, schedule: bool = True
+) -> BackfillProgress:
+    redis_conn = get_redis()
+    progress = get_progress(channel_id, redis_conn)
+    if progress is not None and not restart:
+        logger.info("backfill_resume", **progress.as_dict())
+    else:
+        _reset_state(redis_conn, channel_id, STATUS_LISTING)
+        # The channel listing can take minutes: with a worker, the first tick does it.
+        progress = (
+            _require_progress(redis_conn, channel_id)
+            if schedule
+            else _store_listing(redis_conn, channel_id)
+        )
+        logger.info("backfill_started", **progress.as_dict())
+
+    if schedule and progress.status in (STATUS_LISTING, STATUS_RUNNING):
+        chain_id = uuid.uuid4().hex
+        if _claim_chain(redis_conn, channel_id, chain_id):
+            _schedule_tick(channel_id, progress.cursor, delay_seconds=1, chain_id=chain_id)
+        else:
+            # The live chain reads the cursor from Redis, so it also picks up a restart.
+            logger.info("backfill_chain_live", channel_id=channel_id)
+    return progress
+
+
+def _batch_size(redis_conn: Redis) -> int:
+    settings = get_settings()
+    per_tick = max(1, settings.backfill_rate_per_minute * settings.backfill_tick_seconds // 60)
+    pending = sum(
+        Queue(name, connection=redis_conn).count for name in class_queue_names(PRIORITY_BACKFILL)
+    )
+    return max(0, min(per_tick, settings.backfill_max_pending - pending))
+
+
+def _load_durations(
+    redis_conn: Redis, channel_id: str, video_ids: list[str]
+) -> dict[str, float | None]:
+    if not video_ids:
+        return {}
+    raw = cast(list[bytes | None], redis_conn.hmget(_durations_key(channel_id), video_ids))
+    return {
+        video_id: float(value) if value is not None else None
+        for video_id, value in zip(video_ids, raw, strict=True)
+    }
+
+
+def backfill_tick(
+    channel_id: str, schedule: bool = True, chain_id: str | None = None
+) -> BackfillProgress | None:
+    settings = get_settings()
+    redis_conn = get_redis()
+    if schedule:
+        # Ticks enqueued without a chain id adopt a new one if no other chain is live.
+        chain_id = chain_id or uuid.uuid4().hex
+        if not _claim_chain(redis_conn, channel_id, chain_id):
+            logger.info("backfill_tick_superseded", channel_id=channel_id, chain_id=chain_id)
+            return get_progress(channel_id, redis_conn)
+    progress = get_progress(channel_id, redis_conn)
+    if progress is not None and progress.status == STATUS_LISTING:
+        progress = _store_listing(redis_conn, channel_id)
+    if progress is None or progress.status != STATUS_RUNNING:
+        if chain_id:
+            _release_chain(redis_conn, channel_id, chain_id)
+        return progress
+
+    batch: list[str] = []
+    batch_size = _batch_size(redis_conn)
+    if batch_size:
+        end = progress.cursor + batch_size - 1
+        raw_ids = redis_conn.lrange(_videos_key(channel_id), progress.cursor, end)
+        batch = [raw.decode() for raw in cast(list[bytes], raw_ids)]
+
+    if batch:
+        with session_scope() as session:
+            published = repo.get_published_ids(session, batch)
+        candidates = [video_id for video_id in batch if video_id not in published]
+        durations = _load_durations(redis_conn, channel_id, candidates)
+        jobs = enqueue_publish_jobs(
+            candidates, priority=PRIORITY_BACKFILL, durations=durations, channel_id=channel_id
+        )
+
+        cursor = progress.cursor + len(batch)
+        status = STATUS_DONE if cursor >= progress.total else STATUS_RUNNING
+        with redis_conn.pipeline() as pipe:
+            pipe.hset(
+                _state_key(channel_id),
+                mapping={"cursor": cursor, "status": status, "updated_at": _now_iso()},
+            )
+            pipe.hincrby(_state_key(channel_id), "enqueued", len(jobs))
+            pipe.hincrby(_state_key(channel_id), "skipped", len(batch) - len(jobs))
+            pipe.execute()
+        progress = _require_progress(redis_conn, channel_id)
+        logger.info("backfill_tick", **progress.as_dict())
+    else:
+        logger.info("backfill_throttled", channel_id=channel_id, cursor=progress.cursor)
+
+    if chain_id:
+        if progress.status == STATUS_RUNNING:
+            _schedule_tick(channel_id, progress.cursor, settings.backfill_tick_seconds, chain_id)
+        else:
+            _release_chain(redis_conn, channel_id, chain_id)
+    return progress
+
+
+def run_foreground(channel_id: str, restart: bool = False) -> BackfillProgress | None:
+    settings = get_settings()
+    progress: BackfillProgress | None = start_backfill(channel_id, restart=restart, schedule=False)
+    while progress is not None and progress.status in (STATUS_LISTING, STATUS_RUNNING):
+        progress = backfill_tick(channel_id, schedule=False)
+        if progress is not None and progress.status == STATUS_RUNNING:
+            time.sleep(settings.backfill_tick_seconds)
+    return progress
+
+
+def main() -> None:
+    from app.utils.logging import configure_logging
+
+    settings = get_settings()
+    configure_logging(**settings.logging_options)
+
+    parser = argparse.ArgumentParser(description="Mirror a channel's back catalog to RuTube")
+    parser.add_argument("channel_id", nargs="?", default=settings.youtube_channel_id)
+    parser.add_argument("--restart", action="store_true", help="discard the saved cursor")
+    parser.add_argument(
+        "--foreground",
+        action="store_true",
+        help="enqueue from this process instead of scheduling ticks on the RQ worker",
+    )
+    args = parser.parse_args()
+
+    if args.foreground:
+        run_foreground(args.channel_id, restart=args.restart)
+    else:
+        start_backfill(args.channel_id, restart=args.restart)
+
+
+if __name__ == "__main__":
+    main()
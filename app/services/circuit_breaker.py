@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Sequence
+from typing import Any, cast
+
+from redis import Redis
+
+from app.config import get_settings
+from app.utils.logging import get_logger
+from app.utils.redis_pool import get_redis
+
+
+logger = get_logger("circuit_breaker")
+
+BREAKER_YOUTUBE = "youtube"
+BREAKER_RUTUBE = "rutube"
+BREAKER_NAMES = (BREAKER_YOUTUBE, BREAKER_RUTUBE)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+KEY_PREFIX = "breaker:"
+
+
+class CircuitBreaker:
+    def __init__(
+        self, redis_conn: Redis, name: str, failure_threshold: int, reset_timeout_seconds: int
+    ) -> None:
+        self._redis = redis_conn
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self._key = f"{KEY_PREFIX}{name}"
+        self._probe_key = f"{KEY_PREFIX}{name}:probe"
+
+    def _load(self) -> dict[str, str]:
+        raw = cast(dict[bytes, bytes], self._redis.hgetall(self._key))
+        return {key.decode(): value.decode() for key, value in raw.items()}
+
+    def _state_from(self, data: dict[str, str], now: float) -> str:
+        if data.get("state") != STATE_OPEN:
+            return STATE_CLOSED
+        if now >= float(data.get("opened_at", 0)) + self.reset_timeout_seconds:
+            return STATE_HALF_OPEN
+        return STATE_OPEN
+
+    def state(self) -> str:
+        return self._state_from(self._load(), time.time())
+
+    def retry_after(self) -> float:
+        data = self._load()
+        if data.get("state") != STATE_OPEN:
+            return 0.0
+        reopen_at = float(data.get("opened_at", 0)) + self.reset_timeout_seconds
+        return max(reopen_at - time.time(), 0.0)
+
+    def allow_request(self, holder: str = "1") -> bool:
+        state = self.state()
+        if state == STATE_CLOSED:
+            return True
+        if state == STATE_OPEN:
+            return False
+        # Half-open: exactly one worker gets to probe the dependency per reset window.
+        return bool(
+            self._redis.set(self._probe_key, holder, nx=True, ex=self.reset_timeout_seconds)
+        )
+
+    def release_probe(self, holder: str = "1") -> None:
+        """Gives back a probe slot that ended without a recorded outcome. A no-op once the
+        probe was resolved, or when the slot now belongs to another holder."""
+        owner = cast(bytes | None, self._redis.get(self._probe_key))
+        if owner is not None and owner.decode() == holder:
+            self._redis.delete(self._probe_key)
+
+    def record_success(self) -> None:
+        data = self._load()
+        if data.get("state") == STATE_OPEN:
+            logger.info("circuit_closed", breaker=self.name)
+        if data:
+            with self._redis.pipeline() as pipe:
+                pipe.delete(self._key, self._probe_key)
+                pipe.execute()
+
+    def record_failure(self) -> None:
+        now = time.time()
+        data = self._load()
+        previous = self._state_from(data, now)
+        failures = cast(int, self._redis.hincrby(self._key, "failures", 1))
+        if previous == STATE_HALF_OPEN or (
+            previous == STATE_CLOSED and failures >= self.failure_threshold
+        ):
+            with self._redis.pipeline() as pipe:
+                pipe.hset(self._key, mapping={"state": STATE_OPEN, "opened_at": now})
+                pipe.delete(self._probe_key)
+                pipe.execute()
+            logger.warning("circuit_opened", breaker=self.name, failures=failures)
+
+    def reset(self) -> None:
+        self._redis.delete(self._key, self._probe_key)
+        logger.info("circuit_reset", breaker=self.name)
+
+    def snapshot(self) -> dict[str, Any]:
+        data = self._load()
+        return {
+            "name": self.name,
+            "state": self._state_from(data, time.time()),
+            "failures": int(data.get("failures", 0)),
+            "openedAt": float(data["opened_at"]) if "opened_at" in data else None,
+            "retryAfterSeconds": round(self.retry_after(), 1),
+            "failureThreshold": self.failure_threshold,
+        }
+
+
+def first_refusing(
+    breakers: Sequence[CircuitBreaker], holder: str = "1"
+) -> CircuitBreaker | None:
+    """Admits a request that needs every breaker, or returns the first one refusing it.
+    Half-open probe slots are only taken once none is open, and given back if a later
+    breaker's probe is already taken, so no probe is spent on a request that never runs.
+    An admitted request that ends without recording an outcome calls release_probes()."""
+    for breaker in breakers:
+        if breaker.state() == STATE_OPEN:
+            return breaker
+    probing: list[CircuitBreaker] = []
+    for breaker in breakers:
+        half_open = breaker.state() == STATE_HALF_OPEN
+        if not breaker.allow_request(holder):
+            for taken in probing:
+                taken.release_probe(holder)
+            return breaker
+        if half_open:
+            probing.append(breaker)
+    return None
+
+
+def release_probes(breakers: Sequence[CircuitBreaker], holder: str) -> None:
+    for breaker in breakers:
+        breaker.release_probe(holder)
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    settings = get_settings()
+    return CircuitBreaker(
+        get_redis(),
+        name,
+        failure_threshold=settings.breaker_failure_threshold,
+        reset_timeout_seconds=settings.breaker_reset_seconds,
+    )
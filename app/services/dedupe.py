@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from app.config import get_settings
+from app.utils.logging import get_logger
+from app.utils.redis_pool import get_redis
+
+
+logger = get_logger("dedupe")
+
+DEDUPE_KEY_PREFIX = "dedupe:notification:"
+
+
+class NotificationDeduper:
+    def __init__(self, redis_conn: Redis | None, ttl_seconds: int, max_entries: int) -> None:
+        self._redis = redis_conn
+        self._ttl = ttl_seconds
+        self._max_entries = max_entries
+        self._seen: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _seen_locally(self, video_id: str, now: float) -> bool:
+        with self._lock:
+            expires_at = self._seen.get(video_id)
+            if expires_at is None:
+                return False
+            if expires_at <= now:
+                del self._seen[video_id]
+                return False
+            self._seen.move_to_end(video_id)
+            return True
+
+    def _remember_locally(self, video_id: str, expires_at: float) -> None:
+        with self._lock:
+            self._seen[video_id] = expires_at
+            self._seen.move_to_end(video_id)
+            while len(self._seen) > self._max_entries:
+                self._seen.popitem(last=False)
+
+    def is_duplicate(self, video_id: str) -> bool:
+        """Returns True when the video was already seen within the TTL, remembering it otherwise."""
+        now = time.monotonic()
+        if self._seen_locally(video_id, now):
+            return True
+
+        first_seen = True
+        if self._redis is not None:
+            try:
+                first_seen = bool(
+                    self._redis.set(f"{DEDUPE_KEY_PREFIX}{video_id}", 1, nx=True, ex=self._ttl)
+                )
+            except RedisError as exc:
+                logger.warning("dedupe_redis_unavailable", error=str(exc))
+
+        self._remember_locally(video_id, now + self._ttl)
+        return not first_seen
+
+    def forget(self, video_id: str) -> None:
+        with self._lock:
+            self._seen.pop(video_id, None)
+        if self._redis is not None:
+            try:
+                self._redis.delete(f"{DEDUPE_KEY_PREFIX}{video_id}")
+            except RedisError as exc:
+                logger.warning("dedupe_redis_unavailable", error=str(exc))
+
+
+_deduper: NotificationDeduper | None = None
+
+
+def get_deduper() -> NotificationDeduper:
+    global _deduper  # noqa: PLW0603
+    if _deduper is None:
+        settings = get_settings()
+        _deduper = NotificationDeduper(
+            get_redis(),
+            ttl_seconds=settings.notification_dedupe_ttl_seconds,
+            max_entries=settings.notification_dedupe_max_entries,
+        )
+    return _deduper
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import json
+import shutil
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, cast
+
+from redis import Redis
+
+from app.config import AppConfig, get_settings
+from app.utils.logging import get_logger
+from app.utils.paths import dir_size, safe_name
+from app.utils.redis_pool import get_redis
+from app.utils.retry import PermanentError
+
+
+logger = get_logger("disk_budget")
+
+RESERVATIONS_KEY = "disk:reservations"
+RESERVATION_TTL_SECONDS = 6 * 3600
+
+
+class DiskCapacityError(PermanentError):
+    """The job's estimated peak footprint does not fit in WORK_DIR even when it is empty."""
+
+
+@dataclass(slots=True)
+class Reservation:
+    video_id: str
+    bytes: int
+    stage: str
+    expires_at: float
+
+
+class DiskBudget:
+    """Admission control for WORK_DIR: a job may start only if its estimated peak footprint
+    fits in the free space left after every other job's outstanding reservation.
+
+    A reservation counts only what its job has not written yet (reserved minus the size of
+    its work dir), so bytes already on disk are not subtracted twice."""
+
+    def __init__(self, redis_conn: Redis, cfg: AppConfig) -> None:
+        self._redis = redis_conn
+        self._work_dir = cfg.work_dir
+        self._enabled = cfg.disk_admission_enabled
+        self._headroom = cfg.disk_headroom_bytes
+        self._download_factor = cfg.disk_download_factor
+        self._transcode_factor = cfg.disk_transcode_factor if cfg.enable_transcode else 0.0
+        self._default_bytes = cfg.disk_default_reservation_bytes
+        self._bytes_per_second = cfg.disk_assumed_bytes_per_second
+
+    def estimate(self, job_meta: Mapping[str, Any] | None) -> int:
+        meta = job_meta or {}
+        if meta.get("filesize_bytes"):
+            source = int(meta["filesize_bytes"])
+        elif meta.get("duration_seconds"):
+            source = int(float(meta["duration_seconds"]) * self._bytes_per_second)
+        else:
+            return self._default_bytes
+        # yt-dlp keeps both streams until the merge; ffmpeg writes next to the original.
+        peak = max(source * self._download_factor, source * (1 + self._transcode_factor))
+        return int(peak)
+
+    def after_download(self, downloaded_bytes: int) -> int:
+        return int(downloaded_bytes * (1 + self._transcode_factor))
+
+    def _job_dir(self, video_id: str) -> Path:
+        return self._work_dir / safe_name(video_id)
+
+    def _reservations(self, now: float) -> list[Reservation]:
+        reservations = []
+        expired = []
+        stored = cast(dict[bytes, bytes], self._redis.hgetall(RESERVATIONS_KEY))
+        for raw_id, raw in stored.items():
+            video_id = raw_id.decode()
+            data = json.loads(raw)
+            if data["expires_at"] <= now:
+                # A worker that died mid-job must not hold its share forever.
+                expired.append(video_id)
+                continue
+            reservations.append(Reservation(video_id=video_id, **data))
+        if expired:
+            self._redis.hdel(RESERVATIONS_KEY, *expired)
+            logger.warning("disk_reservations_expired", video_ids=expired)
+        return reservations
+
+    def _outstanding(self, reservation: Reservation) -> int:
+        return max(reservation.bytes - dir_size(self._job_dir(reservation.video_id)), 0)
+
+    def _free_bytes(self) -> int:
+        self._work_dir.mkdir(parents=True, exist_ok=True)
+        return shutil.disk_usage(self._work_dir).free
+
+    def _total_bytes(self) -> int:
+        self._work_dir.mkdir(parents=True, exist_ok=True)
+        return shutil.disk_usage(self._work_dir).total
+
+    def _store(self, video_id: str, size: int, stage: str) -> None:
+        expires_at = time.time() + RESERVATION_TTL_SECONDS
+        payload = {"bytes": size, "stage": stage, "expires_at": expires_at}
+        self._redis.hset(RESERVATIONS_KEY, video_id, json.dumps(payload))
+
+    def reserve(self, video_id: str, size: int) -> bool:
+        if not self._enabled:
+            return True
+        capacity = self._total_bytes() - self._headroom
+        if size > capacity:
+            # Deferring would refund the retry every time and park the job forever.
+            raise DiskCapacityError(
+                f"Estimated {size} bytes exceed the {capacity} bytes WORK_DIR can ever hold"
+            )
+        # Claim first, then check with every claim visible: two workers racing for the last
+        # gigabytes both see each other and at worst both back off, never both proceed.
+        self._store(video_id, size, "admitted")
+        reservations = self._reservations(time.time())
+        committed = sum(self._outstanding(r) for r in reservations if r.video_id != video_id)
+        available = self._free_bytes() - self._headroom - committed
+        needed = max(size - dir_size(self._job_dir(video_id)), 0)
+        if needed > available:
+            self._redis.hdel(RESERVATIONS_KEY, video_id)
+            logger.info(
+                "disk_admission_denied",
+                video_id=video_id,
+                needed_bytes=needed,
+                available_bytes=available,
+                reservations=len(reservations) - 1,
+            )
+            return False
+        logger.info("disk_reserved", video_id=video_id, reserved_bytes=size)
+        return True
+
+    def resize(self, video_id: str, size: int, stage: str) -> None:
+        if not self._enabled or not self._redis.hexists(RESERVATIONS_KEY, video_id):
+            return
+        self._store(video_id, size, stage)
+        logger.info(
+            "disk_reservation_resized", video_id=video_id, reserved_bytes=size, stage=stage
+        )
+
+    def release(self, video_id: str) -> None:
+        if self._enabled and self._redis.hdel(RESERVATIONS_KEY, video_id):
+            logger.info("disk_released", video_id=video_id)
+
+    def snapshot(self) -> dict[str, Any]:
+        reservations = self._reservations(time.time())
+        usage = shutil.disk_usage(self._work_dir) if self._work_dir.exists() else None
+        items = []
+        for reservation in sorted(reservations, key=lambda r: r.video_id):
+            used = dir_size(self._job_dir(reservation.video_id))
+            items.append(
+                {
+                    "videoId": reservation.video_id,
+                    "stage": reservation.stage,
+                    "reservedBytes": reservation.bytes,
+                    "usedBytes": used,
+                    "outstandingBytes": max(reservation.bytes - used, 0),
+                    "expiresAt": reservation.expires_at,
+                }
+            )
+        return {
+            "enabled": self._enabled,
+            "workDir": str(self._work_dir),
+            "totalBytes": usage.total if usage else None,
+            "freeBytes": usage.free if usage else None,
+            "headroomBytes": self._headroom,
+            "reservedBytes": sum(item["reservedBytes"] for item in items),
+            "outstandingBytes": sum(item["outstandingBytes"] for item in items),
+            "reservations": items,
+        }
+
+
+def get_disk_budget() -> DiskBudget:
+    return DiskBudget(get_redis(), get_settings())
@@ -1,18 +1,26 @@
 from __future__ import annotations
 
 import json
+import threading
+from collections.abc import Mapping
+from contextvars import ContextVar
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
-
-from yt_dlp import YoutubeDL
+from typing import TYPE_CHECKING, Any
 
 from app.utils.logging import get_logger
-from app.utils.retry import retry_on_exception
+from app.utils.retry import ERROR_UNAVAILABLE, VideoUnavailableError, classify_error
+
+if TYPE_CHECKING:
+    from yt_dlp import YoutubeDL
 
 
 logger = get_logger("downloader")
 
+# Set by callers that run yt-dlp in a thread they cannot interrupt (app.workers.async_worker):
+# once the event is set the download stops at its next progress callback.
+download_cancel: ContextVar[threading.Event | None] = ContextVar("download_cancel", default=None)
+
 
 @dataclass(slots=True)
 class DownloadResult:
@@ -23,7 +31,29 @@ class DownloadResult:
     subtitles_paths: list[Path]
 
 
+def _log_progress(status: dict[str, Any]) -> None:
+    # yt-dlp calls this for every received chunk; the event is sampled in app.utils.logging.
+    cancel = download_cancel.get()
+    if cancel is not None and cancel.is_set():
+        from yt_dlp.utils import DownloadCancelled
+
+        raise DownloadCancelled("publish job cancelled")
+    if status.get("status") != "downloading":
+        return
+    logger.info(
+        "download_progress",
+        downloaded_bytes=status.get("downloaded_bytes"),
+        total_bytes=status.get("total_bytes") or status.get("total_bytes_estimate"),
+        speed=status.get("speed"),
+        eta=status.get("eta"),
+    )
+
+
 def _build_yt_dlp(video_url: str, work_dir: Path) -> YoutubeDL:
+    # Imported on first use: the API and the poller reach this module through the
+    # orchestrator only to enqueue; the worker preloads it (app.workers.preload).
+    from yt_dlp import YoutubeDL
+
     output_template = str(work_dir / "%(id)s.%(ext)s")
     ydl_opts = {
         "outtmpl": output_template,
@@ -35,23 +65,32 @@ def _build_yt_dlp(video_url: str, work_dir: Path) -> YoutubeDL:
         "quiet": True,
         "no_warnings": True,
         "format": "bestvideo+bestaudio/best",
+        "progress_hooks": [_log_progress],
     }
     logger.info("yt_dlp_configured", output_template=output_template)
     return YoutubeDL(ydl_opts)
 
 
 def download_youtube(video_url: str, work_dir: Path) -> DownloadResult:
+    from yt_dlp.utils import DownloadError
+
     work_dir.mkdir(parents=True, exist_ok=True)
     logger.info("yt_dlp_start", video_url=video_url, work_dir=str(work_dir))
 
-    def _download() -> dict[str, Any]:
+    # Failures are not retried in-process: the orchestrator classifies them and lets the
+    # queue reschedule transient ones instead of sleeping while holding a worker slot.
+    try:
         with _build_yt_dlp(video_url, work_dir) as ydl:
-            return ydl.extract_info(video_url, download=True)
-
-    info = retry_on_exception(_download, operation="yt_dlp")
-
-    video_path = Path(info.get("_filename") or "")
-    if not video_path.exists():
+            info = ydl.extract_info(video_url, download=True)
+    except DownloadError as exc:
+        if classify_error(exc) == ERROR_UNAVAILABLE:
+            raise VideoUnavailableError(str(exc)) from exc
+        raise
+
+    requested = info.get("requested_downloads") or [{}]
+    # Path("") is "." and always exists, so an empty name must not short-circuit the fallback.
+    video_path = Path(requested[0].get("filepath") or info.get("_filename") or "")
+    if not video_path.is_file():
         # fallback to manual compose if _filename absent
         video_ext = info.get("ext", "mp4")
         video_path = work_dir / f"{info['id']}.{video_ext}"
@@ -91,3 +130,31 @@ def download_youtube(video_url: str, work_dir: Path) -> DownloadResult:
         thumbnails=[thumb.name for thumb in possible_thumbs],
     )
     return result
+
+
+def fetch_video_infos(
+    video_urls: Mapping[str, str],
+) -> tuple[dict[str, dict[str, Any]], list[str]]:
+    # Metadata only, through one YoutubeDL for the whole batch. process=False skips format
+    # resolution, so nothing but the watch page is fetched per video.
+    from yt_dlp import YoutubeDL
+    from yt_dlp.utils import DownloadError
+
+    ydl_opts = {"skip_download": True, "quiet": True, "no_warnings": True}
+    infos: dict[str, dict[str, Any]] = {}
+    retry: list[str] = []
+    with YoutubeDL(ydl_opts) as ydl:
+        for video_id, video_url in video_urls.items():
+            try:
+                info = ydl.extract_info(video_url, download=False, process=False)
+            except DownloadError as exc:
+                error_class = classify_error(exc)
+                logger.warning(
+                    "yt_dlp_info_failed", video_id=video_id, error_class=error_class, error=str(exc)
+                )
+                if error_class != ERROR_UNAVAILABLE:
+                    retry.append(video_id)
+                continue
+            infos[video_id] = {**info, "id": video_id}
+    logger.info("yt_dlp_infos_fetched", count=len(infos), retry=len(retry))
+    return infos, retry
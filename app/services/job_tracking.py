@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+from datetime import UTC, datetime
+from typing import Any
+
+from rq.job import Job
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.config import STAGE_DOWNLOAD, STAGE_TRANSCODE, STAGE_UPLOAD
+from app.db import repo
+from app.db.base import session_scope
+from app.utils.logging import get_logger
+from app.utils.retry import CircuitOpenError
+
+
+logger = get_logger("job_tracking")
+
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_RETRYING = "retrying"
+JOB_DEFERRED = "deferred"
+JOB_FAILED = "failed"
+JOB_STATUSES = (JOB_RUNNING, JOB_SUCCEEDED, JOB_RETRYING, JOB_DEFERRED, JOB_FAILED)
+
+TRACKED_STAGES = (STAGE_DOWNLOAD, STAGE_TRANSCODE, STAGE_UPLOAD)
+
+
+def status_after_failure(job: Job | None, exc: BaseException) -> str:
+    if isinstance(exc, CircuitOpenError):
+        return JOB_DEFERRED
+    if job is None or not job.retries_left:
+        return JOB_FAILED
+    return JOB_RETRYING
+
+
+class JobTracker:
+    def __init__(
+        self,
+        video_id: str,
+        session_factory: Callable[[], AbstractContextManager[Session]] = session_scope,
+    ) -> None:
+        self.video_id = video_id
+        self._session_factory = session_factory
+
+    def _save(self, values: dict[str, Any], new_attempt: bool = False) -> None:
+        # Bookkeeping must never fail a publish that is otherwise going fine.
+        try:
+            with self._session_factory() as session:
+                repo.save_publish_job(session, self.video_id, values, new_attempt=new_attempt)
+        except SQLAlchemyError as exc:
+            logger.warning("job_tracking_failed", video_id=self.video_id, error=str(exc))
+
+    def start(self, priority: str | None = None) -> None:
+        values: dict[str, Any] = {
+            "status": JOB_RUNNING,
+            "priority": priority,
+            "stage": None,
+            "error_class": None,
+            "error": None,
+            "bytes_downloaded": None,
+            "bytes_uploaded": None,
+        }
+        for stage in TRACKED_STAGES:
+            values[f"{stage}_started_at"] = None
+            values[f"{stage}_finished_at"] = None
+        self._save(values, new_attempt=True)
+
+    def stage_started(self, stage: str) -> None:
+        self._save({"stage": stage, f"{stage}_started_at": datetime.now(UTC)})
+
+    def stage_finished(self, stage: str, **values: Any) -> None:
+        self._save({f"{stage}_finished_at": datetime.now(UTC), **values})
+
+    def succeeded(self, rutube_url: str) -> None:
+        self._save({"status": JOB_SUCCEEDED, "stage": None, "rutube_url": rutube_url})
+
+    def record_resources(self, resources: dict[str, Any]) -> None:
+        if resources:
+            self._save({"resources": resources})
+
+    def failed(self, job: Job | None, error_class: str, exc: BaseException) -> str:
+        status = status_after_failure(job, exc)
+        self._save({"status": status, "error_class": error_class, "error": str(exc)[:500]})
+        return status
@@ -1,6 +1,10 @@
 from __future__ import annotations
 
+import hashlib
 import re
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable, Mapping
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
@@ -11,10 +15,19 @@ from app.utils.logging import get_logger
 
 logger = get_logger("mapper")
 
-_CONTROL_CHARS = re.compile(r"[\u0000-\u001F\u007F]")
-_INVISIBLE_CHARS = re.compile(
-    "[\u200B\u200C\u200D\u200E\u200F\u202A-\u202E\u2060\uFE0F\uFEFF\U000E0000-\U000E0FFF]"
+# Line breaks are normalised to "\n" first and kept; every other C0 control goes, as do
+# zero-width/bidi marks, tag characters and emoji (U+1F000..U+1FAFF).
+_STRIP_CHARS = re.compile(
+    r"[\x00-\x09\x0B-\x1F\x7F\u200B-\u200F\u202A-\u202E\u2060\uFE0F\uFEFF"
+    r"\U000E0000-\U000E0FFF\U0001F000-\U0001FAFF]"
 )
+# str.translate has a C fast path for ASCII text with an ASCII-only table (~6x the regex);
+# with non-ASCII text it costs a Python-level lookup per character, so the regex wins there.
+_ASCII_STRIP_TABLE = dict.fromkeys([*range(0x0A), *range(0x0B, 0x20), 0x7F])
+METADATA_CACHE_MAX_ENTRIES = 50_000
+# The fields RuTube Studio lets us edit after upload; visibility and the thumbnail stay as
+# they were published.
+SYNCED_FIELDS = ("title", "description", "tags")
 
 
 @dataclass(slots=True)
@@ -27,29 +40,39 @@ class MappedMeta:
 
 
 def _sanitize_text(value: str) -> str:
-    cleaned = _CONTROL_CHARS.sub("", value)
-    cleaned = _INVISIBLE_CHARS.sub("", cleaned)
-    cleaned = cleaned.replace("\r\n", "\n").replace("\r", "\n")
+    cleaned = value.replace("\r\n", "\n").replace("\r", "\n")
+    if cleaned.isascii():
+        cleaned = cleaned.translate(_ASCII_STRIP_TABLE)
+    else:
+        cleaned = _STRIP_CHARS.sub("", cleaned)
     return cleaned.strip()
 
 
+def _single_line(value: str) -> str:
+    return _sanitize_text(value).replace("\n", " ")
+
+
 def _compose_title(original_title: str, cfg: AppConfig) -> str:
-    composed = f"{cfg.title_prefix or ''}{original_title}{cfg.title_suffix or ''}"
-    composed = composed.replace("\n", " ")
-    composed = _sanitize_text(composed)
+    composed = _single_line(f"{cfg.title_prefix or ''}{original_title}{cfg.title_suffix or ''}")
     if len(composed) > cfg.max_title_len:
         composed = composed[: cfg.max_title_len].rstrip()
     return composed
 
 
+def _compose_description(text: str, cfg: AppConfig) -> str:
+    description = _sanitize_text(text)
+    if cfg.max_desc_len and len(description) > cfg.max_desc_len:
+        description = description[: cfg.max_desc_len].rstrip()
+    return description
+
+
 def _read_description(desc_path: Path | None) -> str:
     if not desc_path or not desc_path.exists():
         return ""
-    text = desc_path.read_text(encoding="utf-8", errors="ignore")
-    return _sanitize_text(text)
+    return desc_path.read_text(encoding="utf-8", errors="ignore")
 
 
-def _map_tags(info_json: dict[str, Any], cfg: AppConfig) -> list[str]:
+def _map_tags(info_json: Mapping[str, Any], cfg: AppConfig) -> list[str]:
     if not cfg.tags_from_yt:
         return []
     tags = info_json.get("tags") or []
@@ -59,32 +82,31 @@ def _map_tags(info_json: dict[str, Any], cfg: AppConfig) -> list[str]:
     for raw_tag in tags:
         if not isinstance(raw_tag, str):
             continue
-        tag = _sanitize_text(raw_tag)
+        tag = _single_line(raw_tag)
         if tag:
             cleaned_tags.append(tag[:100])
     return cleaned_tags[:30]
 
 
+def _map_fields(
+    info_json: Mapping[str, Any], description: str, thumb: Path | None, cfg: AppConfig
+) -> MappedMeta:
+    return MappedMeta(
+        title=_compose_title(info_json.get("title", "Untitled video"), cfg),
+        description=_compose_description(description, cfg),
+        tags=_map_tags(info_json, cfg),
+        visibility=cfg.rutube_visibility,
+        thumbnail_path=thumb if thumb and thumb.exists() else None,
+    )
+
+
 def map_metadata(
     info_json: dict[str, Any],
     desc_path: Path | None,
     thumb: Path | None,
     cfg: AppConfig,
 ) -> MappedMeta:
-    original_title = info_json.get("title", "Untitled video")
-    title = _compose_title(original_title, cfg)
-    description = _read_description(desc_path)
-    if cfg.max_desc_len and len(description) > cfg.max_desc_len:
-        description = description[: cfg.max_desc_len].rstrip()
-
-    tags = _map_tags(info_json, cfg)
-    meta = MappedMeta(
-        title=title,
-        description=description,
-        tags=tags,
-        visibility=cfg.rutube_visibility,
-        thumbnail_path=thumb if thumb and thumb.exists() else None,
-    )
+    meta = _map_fields(info_json, _read_description(desc_path), thumb, cfg)
     logger.info(
         "metadata_mapped",
         title=meta.title,
@@ -93,3 +115,103 @@ def map_metadata(
         visibility=meta.visibility,
     )
     return meta
+
+
+def field_hashes(meta: MappedMeta) -> dict[str, str]:
+    values = {"title": meta.title, "description": meta.description, "tags": "\n".join(meta.tags)}
+    return {
+        field: hashlib.sha256(values[field].encode("utf-8")).hexdigest()
+        for field in SYNCED_FIELDS
+    }
+
+
+def config_fingerprint(cfg: AppConfig) -> tuple[Any, ...]:
+    # Everything map_metadata reads from the config; a change invalidates cached results.
+    return (
+        cfg.title_prefix,
+        cfg.title_suffix,
+        cfg.max_title_len,
+        cfg.max_desc_len,
+        cfg.tags_from_yt,
+        cfg.rutube_visibility,
+    )
+
+
+def _source_fingerprint(info_json: Mapping[str, Any]) -> int:
+    tags = info_json.get("tags")
+    return hash(
+        (
+            info_json.get("title"),
+            info_json.get("description"),
+            tuple(tags) if isinstance(tags, list) else None,
+        )
+    )
+
+
+class MetadataCache:
+    """LRU of mapped metadata keyed by (video id, config fingerprint). The source fields'
+    hash is stored with each entry, so an edited video is mapped again, not served stale."""
+
+    def __init__(self, max_entries: int = METADATA_CACHE_MAX_ENTRIES) -> None:
+        self._max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, tuple[Any, ...]], tuple[int, MappedMeta]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[str, tuple[Any, ...]], source: int) -> MappedMeta | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != source:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: tuple[str, tuple[Any, ...]], source: int, meta: MappedMeta) -> None:
+        with self._lock:
+            self._entries[key] = (source, meta)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_cache: MetadataCache | None = None
+
+
+def get_metadata_cache() -> MetadataCache:
+    global _cache  # noqa: PLW0603
+    if _cache is None:
+        _cache = MetadataCache()
+    return _cache
+
+
+def map_metadata_many(
+    infos: Iterable[Mapping[str, Any]],
+    cfg: AppConfig,
+    cache: MetadataCache | None = None,
+) -> dict[str, MappedMeta]:
+    """Maps yt-dlp info dicts keyed by their "id", for backfills and re-syncs. Descriptions
+    come from the info dict, there are no thumbnails, and one summary line is logged."""
+    cache = cache if cache is not None else get_metadata_cache()
+    cfg_key = config_fingerprint(cfg)
+    result: dict[str, MappedMeta] = {}
+    hits = 0
+    for info_json in infos:
+        video_id = info_json["id"]
+        source = _source_fingerprint(info_json)
+        meta = cache.get((video_id, cfg_key), source)
+        if meta is None:
+            meta = _map_fields(info_json, info_json.get("description") or "", None, cfg)
+            cache.put((video_id, cfg_key), source, meta)
+        else:
+            hits += 1
+        result[video_id] = meta
+    logger.info("metadata_mapped_batch", count=len(result), cache_hits=hits)
+    return result
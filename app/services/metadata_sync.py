@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import time
+import uuid
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import timedelta
+from typing import Any, cast
+
+from redis import Redis
+from rq import Queue
+
+from app.config import AppConfig, RutubeAccount, get_settings
+from app.db import repo
+from app.db.base import session_scope
+from app.services.circuit_breaker import (
+    BREAKER_RUTUBE,
+    BREAKER_YOUTUBE,
+    first_refusing,
+    get_breaker,
+    release_probes,
+)
+from app.services.downloader import fetch_video_infos
+from app.services.mapper import SYNCED_FIELDS, field_hashes, map_metadata_many
+from app.services.orchestrator import (
+    BREAKER_MIN_DEFER_SECONDS,
+    SESSION_GATE_NAME,
+    YOUTUBE_WATCH_URL,
+)
+from app.services.scheduling import METADATA_SYNC_QUEUE_NAME
+from app.services.session_check import (
+    SESSION_INVALID,
+    any_session_usable,
+    get_session_status,
+    invalidate_session_cache,
+)
+from app.services.uploader import MetadataEdit, update_rutube_metadata
+from app.utils.logging import get_logger
+from app.utils.redis_pool import get_redis
+from app.utils.retry import AuthExpiredError, CircuitOpenError
+
+
+logger = get_logger("metadata_sync")
+
+PENDING_KEY = "metadata_sync:pending"
+# Set while a batch is scheduled; requests in the meantime only join the pending set, so a
+# channel editing many videos at once costs one batch per window.
+SCHEDULED_KEY = "metadata_sync:scheduled"
+# Outlives the batch's delay, so a worker busy with long uploads does not get duplicates.
+SCHEDULED_GUARD_SLACK_SECONDS = 600
+# Failed batches per video id; at METADATA_SYNC_MAX_ATTEMPTS the id moves to PARKED_KEY
+# until a new request for it arrives.
+ATTEMPTS_KEY = "metadata_sync:attempts"
+PARKED_KEY = "metadata_sync:parked"
+
+
+def changed_fields(current: dict[str, str], pushed: dict[str, str] | None) -> list[str]:
+    # Rows published before hashes were recorded push every field once.
+    if not pushed:
+        return list(SYNCED_FIELDS)
+    return [field for field in SYNCED_FIELDS if current[field] != pushed.get(field)]
+
+
+def _schedule_batch(redis_conn: Redis, delay_seconds: int) -> bool:
+    guard_ttl = delay_seconds + SCHEDULED_GUARD_SLACK_SECONDS
+    if not redis_conn.set(SCHEDULED_KEY, 1, nx=True, ex=guard_ttl):
+        return False
+    queue = Queue(METADATA_SYNC_QUEUE_NAME, connection=redis_conn)
+    queue.enqueue_in(
+        timedelta(seconds=delay_seconds),
+        sync_metadata_batch,
+        job_id=f"metadata_sync:{time.time_ns()}",
+        result_ttl=0,
+        description="Metadata re-sync batch",
+    )
+    return True
+
+
+def request_metadata_sync(video_ids: Iterable[str], redis_conn: Redis | None = None) -> int:
+    settings = get_settings()
+    ids = list(dict.fromkeys(video_ids))
+    if not ids or not settings.metadata_sync_enabled:
+        return 0
+    redis_conn = redis_conn or get_redis()
+    redis_conn.srem(PARKED_KEY, *ids)
+    redis_conn.sadd(PENDING_KEY, *ids)
+    scheduled = _schedule_batch(redis_conn, settings.metadata_sync_window_seconds)
+    logger.info("metadata_sync_requested", video_ids=ids, scheduled=scheduled)
+    return len(ids)
+
+
+def _account_for(
+    cfg: AppConfig, name: str | None, channel_id: str | None
+) -> RutubeAccount | None:
+    accounts = cfg.accounts
+    if name:
+        return next((account for account in accounts if account.name == name), None)
+    # Published before the account was recorded: only an unambiguous owner is edited.
+    pinned = [account for account in accounts if channel_id and channel_id in account.channels]
+    candidates = pinned or [account for account in accounts if not account.channels] or accounts
+    return candidates[0] if len(candidates) == 1 else None
+
+
+_BREAKERS = (BREAKER_YOUTUBE, BREAKER_RUTUBE)
+
+
+def _check_breakers(probe_holder: str) -> None:
+    refusing = first_refusing([get_breaker(name) for name in _BREAKERS], probe_holder)
+    if refusing is not None:
+        retry_after = max(refusing.retry_after(), BREAKER_MIN_DEFER_SECONDS)
+        raise CircuitOpenError(refusing.name, retry_after)
+
+
+def _push_edits(
+    account: RutubeAccount,
+    edits: list[MetadataEdit],
+    hashes: dict[str, dict[str, str]],
+    summary: dict[str, int],
+) -> list[str]:
+    retry = [edit.video_id for edit in edits]
+    if get_session_status(account.cookies_path) == SESSION_INVALID:
+        logger.warning("metadata_sync_session_invalid", account=account.name, videos=len(edits))
+        return retry
+    breaker = get_breaker(BREAKER_RUTUBE)
+    try:
+        updated = update_rutube_metadata(edits, account.cookies_path)
+    except AuthExpiredError as exc:
+        invalidate_session_cache(account.cookies_path)
+        breaker.record_failure()
+        logger.warning("metadata_sync_auth_expired", account=account.name, error=str(exc))
+        return retry
+    if updated:
+        breaker.record_success()
+    else:
+        breaker.record_failure()
+    with session_scope() as session:
+        for video_id in updated:
+            repo.record_metadata_sync(session, video_id, hashes[video_id], account.name)
+    summary["updated"] += len(updated)
+    summary["failed"] += len(edits) - len(updated)
+    return []
+
+
+def _sessions_invalid(cfg: AppConfig) -> set[str]:
+    return {
+        account.name
+        for account in cfg.accounts
+        if get_session_status(account.cookies_path) == SESSION_INVALID
+    }
+
+
+def _sync(
+    video_ids: list[str], cfg: AppConfig, summary: dict[str, int]
+) -> tuple[list[str], list[str]]:
+    """Returns the ids to retry after a failure and the ids waiting for a RuTube session;
+    only the former spend an attempt."""
+    probe_holder = uuid.uuid4().hex
+    _check_breakers(probe_holder)
+    try:
+        if not any_session_usable():
+            raise CircuitOpenError(SESSION_GATE_NAME, cfg.session_check_ttl_seconds)
+        return _sync_admitted(video_ids, cfg, summary)
+    finally:
+        # The batch never resolves a YouTube probe, and a RuTube one only when it pushes
+        # edits; a probe left taken would keep the breaker refusing until its TTL.
+        release_probes([get_breaker(name) for name in _BREAKERS], probe_holder)
+
+
+def _sync_admitted(
+    video_ids: list[str], cfg: AppConfig, summary: dict[str, int]
+) -> tuple[list[str], list[str]]:
+    with session_scope() as session:
+        pushed = repo.get_pushed_metadata(session, video_ids)
+    # Checked before fetching: YouTube is not asked about videos that cannot be edited.
+    invalid = _sessions_invalid(cfg)
+    waiting = [video_id for video_id, row in pushed.items() if row[1] in invalid]
+    if waiting:
+        logger.warning(
+            "metadata_sync_session_invalid", accounts=sorted(invalid), videos=len(waiting)
+        )
+    infos, retry = fetch_video_infos(
+        {
+            video_id: YOUTUBE_WATCH_URL.format(video_id=video_id)
+            for video_id, row in pushed.items()
+            if row[1] not in invalid
+        }
+    )
+    summary["skipped"] += len(video_ids) - len(waiting) - len(infos) - len(retry)
+
+    accounts: dict[str, RutubeAccount] = {}
+    edits: defaultdict[str, list[MetadataEdit]] = defaultdict(list)
+    hashes: dict[str, dict[str, str]] = {}
+    for video_id, meta in map_metadata_many(infos.values(), cfg).items():
+        rutube_url, account_name, pushed_hashes = pushed[video_id]
+        current = field_hashes(meta)
+        fields = changed_fields(current, pushed_hashes)
+        if not fields:
+            summary["unchanged"] += 1
+            continue
+        account = _account_for(cfg, account_name, infos[video_id].get("channel_id"))
+        if account is None:
+            logger.warning("metadata_sync_account_unknown", video_id=video_id, account=account_name)
+            summary["skipped"] += 1
+            continue
+        accounts[account.name] = account
+        edits[account.name].append(MetadataEdit(video_id, rutube_url, meta, fields))
+        hashes[video_id] = current
+
+    for name, account_edits in edits.items():
+        if name in invalid:
+            waiting.extend(edit.video_id for edit in account_edits)
+            continue
+        retry.extend(_push_edits(accounts[name], account_edits, hashes, summary))
+    return retry, waiting
+
+
+def _requeue_failed(redis_conn: Redis, video_ids: list[str], max_attempts: int) -> list[str]:
+    """Counts a failed attempt for each id and returns the ones parked for good."""
+    pipe = redis_conn.pipeline()
+    for video_id in video_ids:
+        pipe.hincrby(ATTEMPTS_KEY, video_id, 1)
+    attempts = cast(list[int], pipe.execute())
+    counts = dict(zip(video_ids, attempts, strict=True))
+    parked = [video_id for video_id in video_ids if counts[video_id] >= max_attempts]
+    retry = [video_id for video_id in video_ids if counts[video_id] < max_attempts]
+    pipe = redis_conn.pipeline()
+    if retry:
+        pipe.sadd(PENDING_KEY, *retry)
+    if parked:
+        pipe.hdel(ATTEMPTS_KEY, *parked)
+        pipe.sadd(PARKED_KEY, *parked)
+    pipe.execute()
+    if parked:
+        logger.warning("metadata_sync_parked", video_ids=parked, attempts=max_attempts)
+    return parked
+
+
+def sync_metadata_batch(schedule: bool = True) -> dict[str, Any]:
+    settings = get_settings()
+    redis_conn = get_redis()
+    # Released first: ids requested while this batch runs are picked up by the next one.
+    redis_conn.delete(SCHEDULED_KEY)
+    raw_ids = cast(list[bytes], redis_conn.spop(PENDING_KEY, settings.metadata_sync_batch_size))
+    video_ids = [raw.decode() for raw in raw_ids or []]
+    summary = {"videos": len(video_ids), "updated": 0, "unchanged": 0, "skipped": 0, "failed": 0}
+
+    if video_ids:
+        try:
+            retry, waiting = _sync(video_ids, settings, summary)
+        except CircuitOpenError as exc:
+            redis_conn.sadd(PENDING_KEY, *video_ids)
+            logger.warning(
+                "metadata_sync_deferred",
+                breaker=exc.breaker,
+                retry_in=exc.retry_after,
+                videos=len(video_ids),
+            )
+            if schedule:
+                _schedule_batch(redis_conn, int(exc.retry_after))
+            return {**summary, "deferred": len(video_ids)}
+        except Exception:
+            # The batch job has no RQ retry; the ids wait for the next batch instead, and an
+            # id that keeps breaking the batch is parked like any other failing one.
+            _requeue_failed(redis_conn, video_ids, settings.metadata_sync_max_attempts)
+            if schedule:
+                _schedule_batch(redis_conn, settings.metadata_sync_window_seconds)
+            raise
+        parked = _requeue_failed(redis_conn, retry, settings.metadata_sync_max_attempts)
+        if waiting:
+            redis_conn.sadd(PENDING_KEY, *waiting)
+        done = [video_id for video_id in video_ids if video_id not in {*retry, *waiting}]
+        if done:
+            redis_conn.hdel(ATTEMPTS_KEY, *done)
+        summary["retry"] = len(retry) - len(parked)
+        summary["parked"] = len(parked)
+        summary["waiting"] = len(waiting)
+        logger.info("metadata_sync_batch", **summary)
+
+    if schedule and redis_conn.scard(PENDING_KEY):
+        _schedule_batch(redis_conn, settings.metadata_sync_window_seconds)
+    return summary
@@ -1,67 +1,301 @@
 from __future__ import annotations
 
-import random
+import time
+import uuid
+from collections.abc import Iterable, Mapping
+from contextvars import ContextVar
+from datetime import UTC, datetime
 from pathlib import Path
 from typing import Any
 
 from redis import Redis
 from rq import Queue, Retry
-from rq.job import Job
+from rq.exceptions import NoSuchJobError
+from rq.job import Job, JobStatus, get_current_job
+from rq.registry import FailedJobRegistry
 
-from app.config import get_retry_policy, get_settings
+from app.config import (
+    STAGE_DOWNLOAD,
+    STAGE_LOCK,
+    STAGE_TRANSCODE,
+    STAGE_UPLOAD,
+    get_retry_policy,
+    get_settings,
+)
 from app.db import repo
 from app.db.base import session_scope
+from app.services.accounts import AccountLease, AccountPool, get_account_pool
+from app.services.circuit_breaker import (
+    BREAKER_NAMES,
+    BREAKER_RUTUBE,
+    BREAKER_YOUTUBE,
+    first_refusing,
+    get_breaker,
+    release_probes,
+)
+from app.services.disk_budget import get_disk_budget
 from app.services.downloader import DownloadResult, download_youtube
-from app.services.mapper import MappedMeta, map_metadata
+from app.services.job_tracking import JobTracker
+from app.services.mapper import MappedMeta, field_hashes, map_metadata
+from app.services.profiling import (
+    PROFILE_META_KEY,
+    ResourceMonitor,
+    job_profiler,
+    should_profile,
+)
+from app.services.published_index import get_published_index
+from app.services.scheduling import (
+    CHANNEL_META_KEY,
+    PRIORITY_WEBSUB,
+    PUBLISH_QUEUE_NAME,
+    PriorityClass,
+    job_meta,
+    queue_name_for,
+    record_queue_wait,
+    size_bucket,
+)
+from app.services.session_check import any_session_usable
 from app.services.transcoder import maybe_transcode
 from app.services.uploader import upload_to_rutube
 from app.utils.logging import get_logger
-from app.utils.paths import cleanup_dir, get_video_work_dir
+from app.utils.metrics import (
+    BYTES_TRANSFERRED,
+    PUBLISH_E2E_SECONDS,
+    PUBLISH_OUTCOMES,
+    observe_stage,
+)
+from app.utils.paths import PRESERVED_SUFFIXES, cleanup_dir, dir_size, get_video_work_dir
+from app.utils.redis_pool import get_redis
+from app.utils.retry import (
+    ERROR_AUTH,
+    ERROR_TRANSIENT,
+    CircuitOpenError,
+    apply_retry_decision,
+    classify_error,
+    total_retry_budget,
+)
+from app.utils.tracing import (
+    TRACE_META_KEY,
+    SpanSteps,
+    current_carrier,
+    flush_spans,
+    start_span,
+)
 
 
 logger = get_logger("orchestrator")
 
-PUBLISH_QUEUE_NAME = "publish"
-FAILED_QUEUE_NAME = "failed"
+BREAKER_MIN_DEFER_SECONDS = 30
+SESSION_GATE_NAME = "rutube_session"
+ACCOUNTS_GATE_NAME = "rutube_accounts"
+DISK_GATE_NAME = "work_dir_disk"
+YOUTUBE_WATCH_URL = "https://www.youtube.com/watch?v={video_id}"
+# Set by `/api/trigger?force=true`: publish again even if the video is already on RuTube.
+FORCE_META_KEY = "force"
+_STAGE_BREAKERS = {STAGE_DOWNLOAD: BREAKER_YOUTUBE, STAGE_UPLOAD: BREAKER_RUTUBE}
+
+
+class StageRunner:
+    """Runs the heavy stages of a publish in the calling thread. The asyncio worker swaps in
+    one that hands them to its event loop (app.workers.async_worker)."""
+
+    def download(self, video_url: str, work_dir: Path) -> DownloadResult:
+        return download_youtube(video_url, work_dir)
+
+    def transcode(self, path_in: Path, work_dir: Path, enabled: bool) -> Path:
+        return maybe_transcode(path_in, work_dir, enabled)
+
+    def upload(self, video_path: Path, meta: MappedMeta, cookies_path: Path) -> str:
+        return upload_to_rutube(video_path, meta, cookies_path)
+
+
+# A context variable rather than an argument: RQ calls publish_video(video_id) by name, and
+# asyncio.to_thread() carries the context into the thread that runs the job.
+stage_runner: ContextVar[StageRunner] = ContextVar("stage_runner", default=StageRunner())
 
 
 def _redis_connection() -> Redis:
-    settings = get_settings()
-    return Redis.from_url(settings.redis_url)
+    return get_redis()
 
 
-def _publish_queue() -> Queue:
-    return Queue(PUBLISH_QUEUE_NAME, connection=_redis_connection())
+def _publish_queue(name: str = PUBLISH_QUEUE_NAME) -> Queue:
+    return Queue(name, connection=_redis_connection())
 
 
 def _retry_strategy() -> Retry:
+    # A single job-level budget; the interval is replaced per failure by
+    # apply_retry_decision() with the backoff of the stage that failed.
     policy = get_retry_policy()
-    intervals: list[int] = []
-    delay = policy.base_delay_seconds
-    for _ in range(policy.max_attempts):
-        jitter = delay * policy.jitter_factor * random.random()
-        intervals.append(int(delay + jitter))
-        delay = min(delay * 2, policy.max_delay_seconds)
-    return Retry(max=policy.max_attempts, interval=intervals)
-
-
-def enqueue_publish_job(video_id: str) -> Job:
-    queue = _publish_queue()
-    job_id = f"publish:{video_id}"
-    retry = _retry_strategy()
+    return Retry(max=total_retry_budget(), interval=[int(policy.base_delay_seconds)])
+
+
+def _publish_job_id(video_id: str) -> str:
+    return f"publish:{video_id}"
+
+
+def _publish_job_options(  # noqa: PLR0913
+    video_id: str,
+    priority: PriorityClass,
+    duration_seconds: float | None = None,
+    filesize_bytes: int | None = None,
+    profile: bool = False,
+    force: bool = False,
+    channel_id: str | None = None,
+) -> dict[str, Any]:
+    meta = job_meta(priority, duration_seconds, filesize_bytes, channel_id)
+    if profile:
+        meta[PROFILE_META_KEY] = True
+    if force:
+        meta[FORCE_META_KEY] = True
+    meta["retry_budget"] = {
+        "total": total_retry_budget(),
+        "remaining": total_retry_budget(),
+        "attempts": {},
+    }
+    carrier = current_carrier()
+    if carrier:
+        meta[TRACE_META_KEY] = carrier
+    return {
+        "job_id": _publish_job_id(video_id),
+        "retry": _retry_strategy(),
+        "result_ttl": 0,
+        "failure_ttl": 7 * 24 * 3600,
+        "description": f"Publish video {video_id} to RuTube",
+        "meta": meta,
+    }
+
+
+def enqueue_publish_job(  # noqa: PLR0913
+    video_id: str,
+    priority: PriorityClass = PRIORITY_WEBSUB,
+    duration_seconds: float | None = None,
+    filesize_bytes: int | None = None,
+    profile: bool = False,
+    force: bool = False,
+    channel_id: str | None = None,
+) -> Job:
+    bucket = size_bucket(get_settings(), duration_seconds, filesize_bytes)
+    queue = _publish_queue(queue_name_for(priority, bucket))
     job = queue.enqueue(
         publish_video,
         video_id,
-        job_id=job_id,
-        retry=retry,
-        result_ttl=0,
-        failure_ttl=7 * 24 * 3600,
-        description=f"Publish video {video_id} to RuTube",
+        **_publish_job_options(
+            video_id, priority, duration_seconds, filesize_bytes, profile, force, channel_id
+        ),
+    )
+    logger.info(
+        "job_enqueued",
+        video_id=video_id,
+        job_id=job.id,
+        priority=priority,
+        queue=queue.name,
+        force=force,
     )
-    logger.info("job_enqueued", video_id=video_id, job_id=job.id)
     return job
 
 
+def enqueue_publish_jobs(
+    video_ids: Iterable[str],
+    priority: PriorityClass = PRIORITY_WEBSUB,
+    durations: Mapping[str, float | None] | None = None,
+    channel_id: str | None = None,
+) -> list[Job]:
+    unique_ids = list(dict.fromkeys(video_ids))
+    if not unique_ids:
+        return []
+
+    settings = get_settings()
+    durations = durations or {}
+    redis_conn = _redis_connection()
+    with redis_conn.pipeline(transaction=False) as pipe:
+        for video_id in unique_ids:
+            pipe.hmget(Job.key_for(_publish_job_id(video_id)).decode(), ["status", "origin"])
+        states = pipe.execute()
+
+    # A failed job is kept for its failure_ttl; it must not block publishing the video again.
+    failed_origins: dict[str, str] = {}
+    pending_ids: list[str] = []
+    for video_id, (status, origin) in zip(unique_ids, states, strict=True):
+        if status == JobStatus.FAILED.value.encode() and origin:
+            failed_origins[video_id] = origin.decode()
+        elif status is not None:
+            continue
+        pending_ids.append(video_id)
+    skipped = len(unique_ids) - len(pending_ids)
+    if not pending_ids:
+        logger.info("jobs_enqueued_bulk", priority=priority, count=0, skipped=skipped)
+        return []
+
+    by_queue: dict[str, list[str]] = {}
+    for video_id in pending_ids:
+        bucket = size_bucket(settings, durations.get(video_id), None)
+        by_queue.setdefault(queue_name_for(priority, bucket), []).append(video_id)
+
+    jobs: list[Job] = []
+    with redis_conn.pipeline() as pipe:
+        for video_id, origin in failed_origins.items():
+            job_id = _publish_job_id(video_id)
+            pipe.zrem(FailedJobRegistry(origin, connection=redis_conn).key, job_id)
+            pipe.delete(Job.key_for(job_id))
+        for queue_name, queue_video_ids in by_queue.items():
+            queue = Queue(queue_name, connection=redis_conn)
+            job_datas = [
+                Queue.prepare_data(
+                    publish_video,
+                    (video_id,),
+                    **_publish_job_options(
+                        video_id, priority, durations.get(video_id), channel_id=channel_id
+                    ),
+                )
+                for video_id in queue_video_ids
+            ]
+            jobs.extend(queue.enqueue_many(job_datas, pipeline=pipe))
+        pipe.execute()
+    logger.info(
+        "jobs_enqueued_bulk",
+        priority=priority,
+        queues=sorted(by_queue),
+        count=len(jobs),
+        skipped=skipped,
+        replaced_failed=len(failed_origins),
+        video_ids=pending_ids,
+    )
+    return jobs
+
+
+def cancel_publish_job(video_id: str) -> bool:
+    job_id = _publish_job_id(video_id)
+    try:
+        job = Job.fetch(job_id, connection=_redis_connection())
+    except NoSuchJobError:
+        return False
+
+    status = job.get_status(refresh=False)
+    if status not in (JobStatus.QUEUED, JobStatus.SCHEDULED, JobStatus.DEFERRED):
+        logger.info("job_cancel_skipped", video_id=video_id, job_id=job_id, status=str(status))
+        return False
+    job.cancel()
+    logger.info("job_canceled", video_id=video_id, job_id=job_id)
+    return True
+
+
+def _file_size(path: Path) -> int | None:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return None
+
+
+def _observe_end_to_end(job: Job | None) -> None:
+    # created_at survives RQ retries, so this includes queueing, deferrals and backoff.
+    if job is None or job.created_at is None:
+        return
+    created_at = job.created_at
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=UTC)
+    PUBLISH_E2E_SECONDS.observe((datetime.now(UTC) - created_at).total_seconds())
+
+
 def _should_skip(video_id: str) -> tuple[bool, str | None]:
     with session_scope() as session:
         record = repo.get_published(session, video_id)
@@ -70,31 +304,162 @@ def _should_skip(video_id: str) -> tuple[bool, str | None]:
         return True, record.rutube_url
 
 
+def _check_breakers(probe_holder: str) -> None:
+    # Every publish needs both ends; do not spend download bandwidth while RuTube is down.
+    refusing = first_refusing([get_breaker(name) for name in BREAKER_NAMES], probe_holder)
+    if refusing is not None:
+        retry_after = max(refusing.retry_after(), BREAKER_MIN_DEFER_SECONDS)
+        raise CircuitOpenError(refusing.name, retry_after)
+    if not any_session_usable():
+        _release_probes(probe_holder)
+        # Parked rather than failed: the jobs resume once someone re-runs `make auth`.
+        settings = get_settings()
+        raise CircuitOpenError(SESSION_GATE_NAME, settings.session_check_ttl_seconds)
+
+
+def _release_probes(probe_holder: str) -> None:
+    # Probes resolved by record_success/record_failure are already gone; this frees the
+    # ones a job took and then gave up on (a gate deferral, a non-transient error).
+    release_probes([get_breaker(name) for name in BREAKER_NAMES], probe_holder)
+
+
+def _record_stage_failure(stage: str, error_class: str) -> None:
+    breaker_name = _STAGE_BREAKERS.get(stage)
+    if breaker_name is None:
+        return
+    counts = error_class == ERROR_TRANSIENT or (
+        breaker_name == BREAKER_RUTUBE and error_class == ERROR_AUTH
+    )
+    if counts:
+        get_breaker(breaker_name).record_failure()
+
+
+def _acquire_account(pool: AccountPool, channel_id: str | None) -> AccountLease:
+    lease = pool.acquire(channel_id)
+    if lease is None:
+        raise CircuitOpenError(ACCOUNTS_GATE_NAME, BREAKER_MIN_DEFER_SECONDS)
+    return lease
+
+
 def publish_video(video_id: str) -> str:
+    job = get_current_job()
+    meta = job.meta if job is not None else None
+    parent = meta.get(TRACE_META_KEY) if meta else None
+    try:
+        with start_span("publish_video", parent=parent, attributes={"video.id": video_id}):
+            with job_profiler(video_id, should_profile(meta)):
+                return _publish_video(video_id)
+    finally:
+        flush_spans()
+
+
+class _Stages:
+    """Moves one pipeline stage at a time through the job record, trace, metrics and
+    resource monitor."""
+
+    def __init__(self, tracker: JobTracker, monitor: ResourceMonitor) -> None:
+        self._tracker = tracker
+        self._monitor = monitor
+        self._steps = SpanSteps()
+        self._started = 0.0
+        self._resources: dict[str, Any] | None = None
+        self.current = STAGE_DOWNLOAD
+
+    def begin(self, stage: str) -> None:
+        self.current = stage
+        self._steps.step(stage)
+        self._tracker.stage_started(stage)
+        self._monitor.stage(stage)
+        self._started = time.monotonic()
+
+    def end(self, **values: Any) -> None:
+        observe_stage(self.current, self._started)
+        self._tracker.stage_finished(self.current, **values)
+
+    def close(self, exc: BaseException | None = None) -> dict[str, Any]:
+        self._steps.close(exc)
+        if self._resources is None:
+            self._resources = self._monitor.stop()
+        return self._resources
+
+
+def _resolution(info_json: Mapping[str, Any]) -> str | None:
+    height = info_json.get("height")
+    return f"{height}p" if height else None
+
+
+def _publish_video(video_id: str) -> str:  # noqa: PLR0912, PLR0915
     settings = get_settings()
     logger_local = logger.bind(video_id=video_id)
 
+    current_job = get_current_job()
+    current_job_meta = current_job.meta if current_job is not None else {}
     skip, existing_url = _should_skip(video_id)
-    if skip:
+    if skip and not current_job_meta.get(FORCE_META_KEY):
         logger_local.info("publish_skip_duplicate")
         if existing_url:
             return existing_url
         raise RuntimeError(f"Video {video_id} already published")
 
-    youtube_url = f"https://www.youtube.com/watch?v={video_id}"
+    youtube_url = YOUTUBE_WATCH_URL.format(video_id=video_id)
     work_dir = get_video_work_dir(settings.work_dir, video_id)
-    logger_local.info("publish_start", youtube_url=youtube_url, work_dir=str(work_dir))
+    logger_local.info(
+        "publish_start", youtube_url=youtube_url, work_dir=str(work_dir), republish=skip
+    )
 
     redis_conn = _redis_connection()
+    if current_job is not None:
+        record_queue_wait(redis_conn, current_job)
+    # Started only once every gate has admitted the job: a deferral is recorded by
+    # tracker.failed() without counting an attempt or clearing the last one's stages.
+    tracker = JobTracker(video_id)
+
+    probe_holder = uuid.uuid4().hex
+    try:
+        _check_breakers(probe_holder)
+    except CircuitOpenError as exc:
+        error_class = apply_retry_decision(current_job, "breaker", exc)
+        PUBLISH_OUTCOMES.labels(tracker.failed(current_job, error_class, exc)).inc()
+        logger_local.warning("publish_deferred", breaker=exc.breaker, retry_in=exc.retry_after)
+        raise
+
     lock = redis_conn.lock(f"lock:publish:{video_id}", timeout=3600, blocking_timeout=5)
     if not lock.acquire(blocking=True):
-        raise RuntimeError("Unable to acquire lock for video processing")
+        _release_probes(probe_holder)
+        lock_error = RuntimeError("Unable to acquire lock for video processing")
+        error_class = apply_retry_decision(current_job, STAGE_LOCK, lock_error)
+        PUBLISH_OUTCOMES.labels(tracker.failed(current_job, error_class, lock_error)).inc()
+        raise lock_error
 
+    stages = _Stages(tracker, ResourceMonitor(work_dir, settings.resource_sample_interval_seconds))
+    runner = stage_runner.get()
+    disk_budget = get_disk_budget()
+    pool = get_account_pool()
+    lease: AccountLease | None = None
     try:
         try:
-            download_result = download_youtube(youtube_url, work_dir)
+            if not disk_budget.reserve(video_id, disk_budget.estimate(current_job_meta)):
+                raise CircuitOpenError(DISK_GATE_NAME, settings.disk_admission_retry_seconds)
+            # Held from before the download: a full pool defers the job while it has
+            # nothing on disk, instead of after every download.
+            lease = _acquire_account(pool, current_job_meta.get(CHANNEL_META_KEY))
+            tracker.start(priority=current_job_meta.get("priority"))
+            stages.begin(STAGE_DOWNLOAD)
+            download_result = runner.download(youtube_url, work_dir)
+            get_breaker(BREAKER_YOUTUBE).record_success()
+            bytes_downloaded = _file_size(download_result.video_path)
+            BYTES_TRANSFERRED.labels("download").inc(bytes_downloaded or 0)
+            stages.end(
+                channel_id=download_result.info_json.get("channel_id"),
+                bytes_downloaded=bytes_downloaded,
+                resolution=_resolution(download_result.info_json),
+            )
+            disk_budget.resize(
+                video_id, disk_budget.after_download(bytes_downloaded or 0), STAGE_DOWNLOAD
+            )
 
-            final_video_path = maybe_transcode(
+            stages.begin(STAGE_TRANSCODE)
+            final_video_path = runner.transcode(
                 download_result.video_path, work_dir, settings.enable_transcode
             )
             mapped_meta = map_metadata(
@@ -103,18 +468,67 @@ def publish_video(video_id: str) -> str:
                 download_result.thumbnail_path,
                 settings,
             )
-            rutube_url = upload_to_rutube(final_video_path, mapped_meta, settings.cookies_path)
+            stages.end()
+            disk_budget.resize(video_id, dir_size(work_dir), STAGE_TRANSCODE)
+
+            stages.begin(STAGE_UPLOAD)
+            channel_id = download_result.info_json.get("channel_id")
+            if not pool.serves(lease.account, channel_id):
+                # Enqueued without its channel, which is pinned to another account. The
+                # retry reserves that account before downloading again.
+                if current_job is not None:
+                    current_job.meta[CHANNEL_META_KEY] = channel_id
+                pool.cancel(lease)
+                lease = None
+                lease = _acquire_account(pool, channel_id)
+            # The lease is held since admission; the per-account latency covers the upload.
+            lease.started_at = time.monotonic()
+            rutube_url = runner.upload(final_video_path, mapped_meta, lease.account.cookies_path)
+            account_name = lease.account.name
+            pool.release(lease, success=True)
+            lease = None
+            get_breaker(BREAKER_RUTUBE).record_success()
+            bytes_uploaded = _file_size(final_video_path)
+            BYTES_TRANSFERRED.labels("upload").inc(bytes_uploaded or 0)
+            stages.end(bytes_uploaded=bytes_uploaded)
+            stages.close()
 
             with session_scope() as session:
-                repo.mark_published(session, video_id, rutube_url)
+                repo.mark_published(
+                    session,
+                    video_id,
+                    rutube_url,
+                    account=account_name,
+                    metadata_hashes=field_hashes(mapped_meta),
+                )
+            get_published_index().add(video_id)
+            tracker.succeeded(rutube_url)
+            PUBLISH_OUTCOMES.labels("succeeded").inc()
+            _observe_end_to_end(current_job)
             logger_local.info("publish_success", rutube_url=rutube_url)
             return rutube_url
         except Exception as exc:  # noqa: BLE001
-            logger_local.error("publish_failed", error=str(exc))
+            stages.close(exc)
+            stage = stages.current
+            if lease is not None and stage == STAGE_UPLOAD:
+                auth_failed = classify_error(exc) == ERROR_AUTH
+                pool.release(lease, success=False, auth_failed=auth_failed)
+                lease = None
+            error_class = apply_retry_decision(current_job, stage, exc)
+            PUBLISH_OUTCOMES.labels(tracker.failed(current_job, error_class, exc)).inc()
+            if not isinstance(exc, CircuitOpenError):
+                _record_stage_failure(stage, error_class)
+            logger_local.error(
+                "publish_failed", stage=stage, error_class=error_class, error=str(exc)
+            )
             raise
         finally:
-            preserve = {".info.json", ".json", ".log"}
-            cleanup_dir(work_dir, preserve_suffixes=preserve)
+            if lease is not None:
+                pool.cancel(lease)
+            tracker.record_resources(stages.close())
+            cleanup_dir(work_dir, preserve_suffixes=PRESERVED_SUFFIXES)
+            disk_budget.release(video_id)
     finally:
+        _release_probes(probe_holder)
         if lock.locked():
             lock.release()
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import cProfile
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import psutil
+
+from app.config import get_settings
+from app.utils.logging import get_logger
+from app.utils.paths import dir_size, safe_name
+
+
+logger = get_logger("profiling")
+
+PROFILE_META_KEY = "profile"
+RESOURCE_FIELDS = ("wall_seconds", "cpu_seconds", "peak_rss_bytes", "peak_disk_bytes")
+
+
+@dataclass(slots=True)
+class StageUsage:
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    peak_rss_bytes: int = 0
+    peak_disk_bytes: int = 0
+
+    def as_dict(self) -> dict[str, float | int]:
+        return asdict(self)
+
+
+def _cpu_seconds() -> float:
+    # children_* covers ffmpeg and the Playwright driver (with its Chromium) once reaped.
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class ResourceMonitor:
+    def __init__(self, work_dir: Path, interval_seconds: float = 0.5) -> None:
+        self._work_dir = work_dir
+        self._interval = interval_seconds
+        self._process = psutil.Process()
+        self._stages: dict[str, StageUsage] = {}
+        self._current: StageUsage | None = None
+        self._wall_started = 0.0
+        self._cpu_started = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _rss_bytes(self) -> int:
+        total = 0
+        try:
+            processes = [self._process, *self._process.children(recursive=True)]
+        except psutil.Error:
+            return 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                continue
+        return total
+
+    def sample(self) -> None:
+        rss = self._rss_bytes()
+        disk = dir_size(self._work_dir)
+        with self._lock:
+            if self._current is None:
+                return
+            self._current.peak_rss_bytes = max(self._current.peak_rss_bytes, rss)
+            self._current.peak_disk_bytes = max(self._current.peak_disk_bytes, disk)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            self.sample()
+
+    def _finish_stage(self) -> None:
+        if self._current is None:
+            return
+        self.sample()
+        with self._lock:
+            self._current.wall_seconds = round(time.monotonic() - self._wall_started, 3)
+            self._current.cpu_seconds = round(_cpu_seconds() - self._cpu_started, 3)
+            self._current = None
+
+    def stage(self, name: str) -> None:
+        self._finish_stage()
+        if self._thread is None and self._interval > 0:
+            self._thread = threading.Thread(target=self._run, name="resource-monitor", daemon=True)
+            self._thread.start()
+        with self._lock:
+            self._current = self._stages.setdefault(name, StageUsage())
+            self._wall_started = time.monotonic()
+            self._cpu_started = _cpu_seconds()
+        self.sample()
+
+    def stop(self) -> dict[str, dict[str, float | int]]:
+        self._finish_stage()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self._interval * 2)
+            self._thread = None
+        return {name: usage.as_dict() for name, usage in self._stages.items()}
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize_resources(
+    samples: Iterable[tuple[str | None, dict[str, dict[str, float]] | None]],
+) -> dict[str, dict[str, Any]]:
+    """p50/p95 of every resource field, per stage, grouped by resolution and overall."""
+    values: dict[str, dict[str, dict[str, list[float]]]] = defaultdict(
+        lambda: defaultdict(lambda: defaultdict(list))
+    )
+    for resolution, stages in samples:
+        for stage, usage in (stages or {}).items():
+            for group in ("all", resolution or "unknown"):
+                for field in RESOURCE_FIELDS:
+                    if usage.get(field) is not None:
+                        values[group][stage][field].append(float(usage[field]))
+
+    summary: dict[str, dict[str, Any]] = {}
+    for group, grouped in values.items():
+        summary[group] = {}
+        for stage, fields in grouped.items():
+            stage_summary: dict[str, Any] = {}
+            for field, raw in fields.items():
+                ordered = sorted(raw)
+                stage_summary[field] = {
+                    "count": len(ordered),
+                    "p50": _percentile(ordered, 0.5),
+                    "p95": _percentile(ordered, 0.95),
+                }
+            summary[group][stage] = stage_summary
+    return summary
+
+
+def should_profile(job_meta: dict[str, Any] | None) -> bool:
+    if job_meta and job_meta.get(PROFILE_META_KEY):
+        return True
+    rate = get_settings().job_profile_sample_rate
+    return rate > 0 and random.random() < rate
+
+
+@contextmanager
+def job_profiler(video_id: str, enabled: bool) -> Iterator[None]:
+    if not enabled:
+        yield
+        return
+    settings = get_settings()
+    profile_dir = settings.job_profile_dir
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S")
+    base = profile_dir / f"{safe_name(video_id)}-{stamp}"
+
+    if settings.job_profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("job_profiler_unavailable", profiler="pyinstrument")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                path = Path(f"{base}.html")
+                path.write_text(profiler.output_html(), encoding="utf-8")
+                logger.info("job_profile_written", video_id=video_id, path=str(path))
+            return
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        path = Path(f"{base}.prof")
+        profile.dump_stats(path)
+        logger.info("job_profile_written", video_id=video_id, path=str(path))
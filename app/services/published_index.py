@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterable
+from contextlib import AbstractContextManager
+from datetime import datetime
+from typing import Any
+
+from redis import Redis
+from redis.exceptions import RedisError
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.db import repo
+from app.db.base import session_scope
+from app.utils.logging import get_logger
+from app.utils.metrics import PUBLISHED_INDEX_LOOKUPS
+from app.utils.redis_pool import get_redis
+
+
+logger = get_logger("published_index")
+
+SHARED_KEY = "published:ids"
+# Set once the shared set holds every published id; until then a Redis miss proves nothing.
+SHARED_READY_KEY = "published:ids:ready"
+_SHARED_CHUNK = 1000
+_COUNTER_TIERS = {
+    "local_hits": "local",
+    "shared_hits": "shared",
+    "negative_hits": "negative",
+    "db_lookups": "db",
+}
+
+SessionScope = Callable[[], AbstractContextManager[Session]]
+
+
+class PublishedIndex:
+    def __init__(
+        self,
+        redis_conn: Redis | None,
+        refresh_seconds: int,
+        enabled: bool = True,
+        session_factory: SessionScope = session_scope,
+    ) -> None:
+        self._redis = redis_conn
+        self._refresh_seconds = refresh_seconds
+        self._enabled = enabled
+        self._session_factory = session_factory
+        self._ids: set[str] = set()
+        self._watermark: datetime | None = None
+        self._loaded = False
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self._counters = {"local_hits": 0, "shared_hits": 0, "negative_hits": 0, "db_lookups": 0}
+
+    def _count(self, name: str, amount: int) -> None:
+        if amount:
+            with self._lock:
+                self._counters[name] += amount
+            PUBLISHED_INDEX_LOOKUPS.labels(_COUNTER_TIERS[name]).inc(amount)
+
+    def _sync_shared(self, new_ids: list[str]) -> None:
+        if self._redis is None:
+            return
+        if self._redis.exists(SHARED_READY_KEY):
+            if new_ids:
+                self._redis.sadd(SHARED_KEY, *new_ids)
+            return
+        # First process up (or Redis was flushed): seed the shared tier from the full local set.
+        snapshot = list(self._ids)
+        with self._redis.pipeline(transaction=False) as pipe:
+            for start in range(0, len(snapshot), _SHARED_CHUNK):
+                pipe.sadd(SHARED_KEY, *snapshot[start : start + _SHARED_CHUNK])
+            pipe.set(SHARED_READY_KEY, 1)
+            pipe.execute()
+        logger.info("published_index_shared_seeded", size=len(snapshot))
+
+    def _stale(self) -> bool:
+        return not self._loaded or time.monotonic() - self._refreshed_at >= self._refresh_seconds
+
+    def refresh(self, force: bool = False) -> None:
+        if not force and not self._stale():
+            return
+        with self._lock:
+            if not force and not self._stale():
+                return
+            with self._session_factory() as session:
+                rows = repo.get_published_since(session, self._watermark)
+            new_ids = [video_id for video_id, _ in rows]
+            self._ids.update(new_ids)
+            if rows:
+                self._watermark = max(created_at for _, created_at in rows)
+            self._loaded = True
+            self._refreshed_at = time.monotonic()
+        try:
+            self._sync_shared(new_ids)
+        except RedisError as exc:
+            logger.warning("published_index_redis_unavailable", error=str(exc))
+        logger.debug("published_index_refreshed", added=len(new_ids), size=len(self._ids))
+
+    def _from_shared(self, video_ids: list[str]) -> set[str] | None:
+        if self._redis is None:
+            return None
+        try:
+            with self._redis.pipeline(transaction=False) as pipe:
+                pipe.exists(SHARED_READY_KEY)
+                pipe.smismember(SHARED_KEY, video_ids)
+                ready, flags = pipe.execute()
+        except RedisError as exc:
+            logger.warning("published_index_redis_unavailable", error=str(exc))
+            return None
+        if not ready:
+            return None
+        return {video_id for video_id, flag in zip(video_ids, flags, strict=True) if flag}
+
+    def _from_db(self, video_ids: list[str]) -> set[str]:
+        self._count("db_lookups", len(video_ids))
+        with self._session_factory() as session:
+            return repo.get_published_ids(session, video_ids)
+
+    def published_ids(self, video_ids: Iterable[str]) -> set[str]:
+        ids = list(dict.fromkeys(video_ids))
+        if not ids:
+            return set()
+        if not self._enabled:
+            return self._from_db(ids)
+
+        self.refresh()
+        found = {video_id for video_id in ids if video_id in self._ids}
+        self._count("local_hits", len(found))
+        missing = [video_id for video_id in ids if video_id not in found]
+        if not missing:
+            return found
+
+        shared = self._from_shared(missing)
+        if shared is None:
+            shared = self._from_db(missing)
+        else:
+            self._count("shared_hits", len(shared))
+            self._count("negative_hits", len(missing) - len(shared))
+        self._ids.update(shared)
+        return found | shared
+
+    def is_published(self, video_id: str) -> bool:
+        return video_id in self.published_ids([video_id])
+
+    def add(self, video_id: str) -> None:
+        if not self._enabled:
+            return
+        self._ids.add(video_id)
+        if self._redis is None:
+            return
+        try:
+            self._redis.sadd(SHARED_KEY, video_id)
+        except RedisError as exc:
+            logger.warning("published_index_redis_unavailable", error=str(exc))
+
+    def memory_bytes(self) -> int:
+        ids = list(self._ids)
+        return sys.getsizeof(self._ids) + sum(sys.getsizeof(video_id) for video_id in ids)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = sum(counters.values())
+        hit_rate = (lookups - counters["db_lookups"]) / lookups if lookups else None
+        return {
+            "enabled": self._enabled,
+            "loaded": self._loaded,
+            "size": len(self._ids),
+            "memoryBytes": self.memory_bytes(),
+            "localHits": counters["local_hits"],
+            "sharedHits": counters["shared_hits"],
+            "negativeHits": counters["negative_hits"],
+            "dbLookups": counters["db_lookups"],
+            "hitRate": round(hit_rate, 4) if hit_rate is not None else None,
+            "watermark": self._watermark.isoformat() if self._watermark else None,
+        }
+
+
+_index: PublishedIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_published_index() -> PublishedIndex:
+    global _index  # noqa: PLW0603
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                settings = get_settings()
+                _index = PublishedIndex(
+                    get_redis(),
+                    refresh_seconds=settings.published_index_refresh_seconds,
+                    enabled=settings.published_index_enabled,
+                )
+    return _index
@@ -6,10 +6,12 @@ from typing import Iterable
 import feedparser
 
 from app.config import get_settings
-from app.db import repo
-from app.db.base import session_scope
-from app.services.orchestrator import enqueue_publish_job
+from app.services.orchestrator import enqueue_publish_jobs
+from app.services.published_index import get_published_index
+from app.services.scheduling import PRIORITY_RSS
 from app.utils.logging import get_logger
+from app.utils.metrics import RSS_POLL_SECONDS, start_exporter
+from app.utils.tracing import configure_tracing, start_span
 
 
 logger = get_logger("rss")
@@ -24,6 +26,8 @@ def _extract_video_ids(entries: Iterable[feedparser.FeedParserDict]) -> list[str
     return video_ids
 
 
+@RSS_POLL_SECONDS.time()
+@start_span("rss.poll")
 def poll_once() -> list[str]:
     settings = get_settings()
     feed_url = f"https://www.youtube.com/feeds/videos.xml?channel_id={settings.youtube_channel_id}"
@@ -37,13 +41,12 @@ def poll_once() -> list[str]:
     video_ids = _extract_video_ids(parsed.entries)
     logger.info("rss_entries", count=len(video_ids))
 
-    enqueued: list[str] = []
-    with session_scope() as session:
-        for video_id in video_ids:
-            if repo.is_published(session, video_id):
-                continue
-            enqueue_publish_job(video_id)
-            enqueued.append(video_id)
+    published = get_published_index().published_ids(video_ids)
+    candidates = [video_id for video_id in video_ids if video_id not in published]
+    jobs = enqueue_publish_jobs(
+        candidates, priority=PRIORITY_RSS, channel_id=settings.youtube_channel_id
+    )
+    enqueued = [str(job.args[0]) for job in jobs]
     logger.info("rss_enqueued", count=len(enqueued), video_ids=enqueued)
     return enqueued
 
@@ -61,10 +64,16 @@ def poll_loop() -> None:
 
 
 def main() -> None:
+    from app.services.session_check import start_session_refresher
+    from app.services.workdir_gc import start_work_dir_sweeper
     from app.utils.logging import configure_logging
 
     settings = get_settings()
-    configure_logging(settings.log_level)
+    configure_logging(**settings.logging_options)
+    start_exporter(settings.metrics_port)
+    configure_tracing("scheduler")
+    start_session_refresher()
+    start_work_dir_sweeper()
     poll_loop()
 
 
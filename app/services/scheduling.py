@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime
+from typing import Any, Literal
+
+from redis import Redis
+from redis.exceptions import RedisError
+from rq.job import Job
+
+from app.config import AppConfig
+from app.utils.logging import get_logger
+
+
+logger = get_logger("scheduling")
+
+PriorityClass = Literal["websub", "rss", "backfill", "retrigger"]
+
+PRIORITY_WEBSUB: PriorityClass = "websub"
+PRIORITY_RSS: PriorityClass = "rss"
+PRIORITY_BACKFILL: PriorityClass = "backfill"
+PRIORITY_RETRIGGER: PriorityClass = "retrigger"
+
+# Highest priority first: RQ workers drain queues strictly in the order they are listed.
+PRIORITY_ORDER: tuple[PriorityClass, ...] = (
+    PRIORITY_WEBSUB,
+    PRIORITY_RSS,
+    PRIORITY_BACKFILL,
+    PRIORITY_RETRIGGER,
+)
+
+PUBLISH_QUEUE_NAME = "publish"
+BACKFILL_CONTROL_QUEUE_NAME = "backfill"
+BACKFILL_QUEUE_NAME = "publish_backfill"
+METADATA_SYNC_QUEUE_NAME = "metadata_sync"
+FAILED_QUEUE_NAME = "failed"
+
+PRIORITY_QUEUES: dict[PriorityClass, str] = {
+    PRIORITY_WEBSUB: PUBLISH_QUEUE_NAME,
+    PRIORITY_RSS: "publish_rss",
+    PRIORITY_BACKFILL: BACKFILL_QUEUE_NAME,
+    PRIORITY_RETRIGGER: "publish_retrigger",
+}
+
+SIZE_SHORT = "short"
+SIZE_LONG = "long"
+
+# Lets the job reserve an account pinned to the channel before it downloads anything.
+CHANNEL_META_KEY = "channel_id"
+
+QUEUE_WAIT_KEY_PREFIX = "stats:queue_wait:"
+QUEUE_WAIT_SAMPLES = 1000
+
+
+def _bucket(value: float, short_max: float, long_min: float) -> str | None:
+    if value <= short_max:
+        return SIZE_SHORT
+    if value >= long_min:
+        return SIZE_LONG
+    return None
+
+
+def size_bucket(
+    cfg: AppConfig, duration_seconds: float | None, filesize_bytes: int | None
+) -> str | None:
+    if cfg.job_scheduling_policy != "sjf":
+        return None
+    if duration_seconds is not None:
+        return _bucket(duration_seconds, cfg.sjf_short_max_seconds, cfg.sjf_long_min_seconds)
+    if filesize_bytes is not None:
+        return _bucket(filesize_bytes, cfg.sjf_short_max_bytes, cfg.sjf_long_min_bytes)
+    return None
+
+
+def queue_name_for(priority: PriorityClass, bucket: str | None = None) -> str:
+    base = PRIORITY_QUEUES[priority]
+    return f"{base}:{bucket}" if bucket else base
+
+
+def class_queue_names(priority: PriorityClass) -> list[str]:
+    # Short jobs of a class run before unsized ones, long jobs after them.
+    return [
+        queue_name_for(priority, SIZE_SHORT),
+        queue_name_for(priority),
+        queue_name_for(priority, SIZE_LONG),
+    ]
+
+
+def publish_queue_names() -> list[str]:
+    # All size buckets are listened to regardless of the policy, so switching it never
+    # strands queued jobs.
+    names: list[str] = []
+    for priority in PRIORITY_ORDER:
+        names.extend(class_queue_names(priority))
+    return names
+
+
+def worker_queue_names() -> list[str]:
+    names = publish_queue_names()
+    # Backfill ticks are cheap bookkeeping; run them ahead of the backfill publishes.
+    first_backfill = names.index(class_queue_names(PRIORITY_BACKFILL)[0])
+    names.insert(first_backfill, BACKFILL_CONTROL_QUEUE_NAME)
+    # Metadata edits never download; they go ahead of the catalog too.
+    names.insert(first_backfill, METADATA_SYNC_QUEUE_NAME)
+    names.append(FAILED_QUEUE_NAME)
+    return names
+
+
+def job_meta(
+    priority: PriorityClass,
+    duration_seconds: float | None,
+    filesize_bytes: int | None,
+    channel_id: str | None = None,
+) -> dict[str, Any]:
+    meta: dict[str, Any] = {"priority": priority}
+    if channel_id:
+        meta[CHANNEL_META_KEY] = channel_id
+    if duration_seconds is not None:
+        meta["duration_seconds"] = duration_seconds
+    if filesize_bytes is not None:
+        meta["filesize_bytes"] = filesize_bytes
+    return meta
+
+
+def record_queue_wait(redis_conn: Redis, job: Job) -> float | None:
+    if job.enqueued_at is None:
+        return None
+    enqueued_at = job.enqueued_at
+    if enqueued_at.tzinfo is None:
+        enqueued_at = enqueued_at.replace(tzinfo=UTC)
+    wait_seconds = max((datetime.now(UTC) - enqueued_at).total_seconds(), 0.0)
+    priority = job.meta.get("priority", PRIORITY_WEBSUB)
+
+    key = f"{QUEUE_WAIT_KEY_PREFIX}{priority}"
+    try:
+        with redis_conn.pipeline(transaction=False) as pipe:
+            pipe.lpush(key, round(wait_seconds, 3))
+            pipe.ltrim(key, 0, QUEUE_WAIT_SAMPLES - 1)
+            pipe.execute()
+    except RedisError as exc:
+        logger.warning("queue_wait_record_failed", error=str(exc))
+    logger.info(
+        "job_queue_wait",
+        job_id=job.id,
+        priority=priority,
+        queue=job.origin,
+        wait_seconds=round(wait_seconds, 3),
+    )
+    return wait_seconds
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def queue_wait_summary(redis_conn: Redis) -> dict[str, dict[str, float | int]]:
+    with redis_conn.pipeline(transaction=False) as pipe:
+        for priority in PRIORITY_ORDER:
+            pipe.lrange(f"{QUEUE_WAIT_KEY_PREFIX}{priority}", 0, -1)
+        samples = pipe.execute()
+
+    summary: dict[str, dict[str, float | int]] = {}
+    for priority, raw_values in zip(PRIORITY_ORDER, samples, strict=True):
+        values = sorted(float(value) for value in raw_values)
+        if not values:
+            summary[priority] = {"count": 0}
+            continue
+        summary[priority] = {
+            "count": len(values),
+            "p50": _percentile(values, 0.5),
+            "p95": _percentile(values, 0.95),
+            "max": values[-1],
+        }
+    return summary
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, cast
+
+import httpx
+from redis.exceptions import RedisError
+
+from app.config import get_settings
+from app.utils.logging import get_logger
+from app.utils.redis_pool import get_redis
+
+
+logger = get_logger("session_check")
+
+PROBE_URL = "https://studio.rutube.ru/video/upload"
+STUDIO_HOST = "studio.rutube.ru"
+CACHE_KEY_PREFIX = "session:rutube:"
+
+SESSION_VALID = "valid"
+SESSION_INVALID = "invalid"
+SESSION_UNKNOWN = "unknown"
+
+
+def _cache_key(cookies_path: Path) -> str:
+    # mtime is part of the key, so re-running `make auth` invalidates the cached verdict.
+    try:
+        mtime = cookies_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        mtime = 0
+    digest = hashlib.sha1(f"{cookies_path}:{mtime}".encode()).hexdigest()[:16]
+    return f"{CACHE_KEY_PREFIX}{digest}"
+
+
+def _load_cookies(cookies_path: Path) -> list[dict[str, Any]]:
+    state = json.loads(cookies_path.read_text(encoding="utf-8"))
+    cookies = state.get("cookies", [])
+    return [cookie for cookie in cookies if "rutube.ru" in cookie.get("domain", "")]
+
+
+def _live_cookies(cookies_path: Path) -> list[dict[str, Any]]:
+    # Empty when the state file is missing, unreadable or holds only expired cookies.
+    if not cookies_path.exists():
+        return []
+    try:
+        cookies = _load_cookies(cookies_path)
+    except (OSError, ValueError) as exc:
+        logger.warning("session_state_unreadable", error=str(exc))
+        return []
+    now = time.time()
+    return [c for c in cookies if c.get("expires", -1) in (-1, None) or c["expires"] > now]
+
+
+def probe_session(cookies_path: Path, timeout: float = 10.0) -> str:
+    live = _live_cookies(cookies_path)
+    if not live:
+        return SESSION_INVALID
+
+    jar = httpx.Cookies()
+    for cookie in live:
+        jar.set(
+            cookie["name"], cookie["value"], domain=cookie["domain"], path=cookie.get("path", "/")
+        )
+    try:
+        with httpx.Client(cookies=jar, timeout=timeout, follow_redirects=True) as client:
+            response = client.get(PROBE_URL)
+    except httpx.HTTPError as exc:
+        logger.warning("session_probe_failed", error=str(exc))
+        return SESSION_UNKNOWN
+
+    if response.status_code >= httpx.codes.INTERNAL_SERVER_ERROR:
+        return SESSION_UNKNOWN
+    rejected = response.status_code in (httpx.codes.UNAUTHORIZED, httpx.codes.FORBIDDEN)
+    if rejected or response.url.host != STUDIO_HOST:
+        return SESSION_INVALID
+    return SESSION_VALID
+
+
+def refresh_session_status(cookies_path: Path | None = None) -> str:
+    settings = get_settings()
+    cookies_path = cookies_path or settings.cookies_path
+    status = probe_session(cookies_path)
+    if status != SESSION_UNKNOWN:
+        ttl = settings.session_check_ttl_seconds
+        try:
+            get_redis().set(_cache_key(cookies_path), status, ex=ttl)
+        except RedisError as exc:
+            logger.warning("session_cache_unavailable", error=str(exc))
+    logger.info("session_checked", cookies_path=str(cookies_path), status=status)
+    return status
+
+
+def get_session_status(cookies_path: Path | None = None) -> str:
+    cookies_path = cookies_path or get_settings().cookies_path
+    try:
+        cached = cast(bytes | None, get_redis().get(_cache_key(cookies_path)))
+    except RedisError as exc:
+        logger.warning("session_cache_unavailable", error=str(exc))
+        cached = None
+    if cached is not None:
+        return cached.decode()
+    return refresh_session_status(cookies_path)
+
+
+def any_session_usable() -> bool:
+    return any(
+        get_session_status(account.cookies_path) != SESSION_INVALID
+        for account in get_settings().accounts
+    )
+
+
+def invalidate_session_cache(cookies_path: Path | None = None) -> None:
+    settings = get_settings()
+    cookies_path = cookies_path or settings.cookies_path
+    try:
+        get_redis().set(
+            _cache_key(cookies_path),
+            SESSION_INVALID,
+            ex=settings.session_check_ttl_seconds,
+        )
+    except RedisError as exc:
+        logger.warning("session_cache_unavailable", error=str(exc))
+    logger.warning("session_invalidated", cookies_path=str(cookies_path))
+
+
+def _refresh_forever(interval: int, stop: threading.Event) -> None:
+    while not stop.wait(interval):
+        try:
+            for account in get_settings().accounts:
+                refresh_session_status(account.cookies_path)
+        except Exception as exc:  # noqa: BLE001
+            logger.error("session_refresh_failed", error=str(exc))
+
+
+def start_session_refresher(stop: threading.Event | None = None) -> threading.Event:
+    settings = get_settings()
+    stop = stop or threading.Event()
+    thread = threading.Thread(
+        target=_refresh_forever,
+        args=(settings.session_check_refresh_seconds, stop),
+        name="rutube-session-refresher",
+        daemon=True,
+    )
+    thread.start()
+    logger.info("session_refresher_started", interval=settings.session_check_refresh_seconds)
+    return stop
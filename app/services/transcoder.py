@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import shutil
 import subprocess
 from pathlib import Path
@@ -37,28 +38,65 @@ def _ffmpeg_exists() -> bool:
     return shutil.which("ffmpeg") is not None
 
 
-def maybe_transcode(path_in: Path, work_dir: Path, enabled: bool) -> Path:
+def _command(path_in: Path, work_dir: Path, enabled: bool) -> tuple[list[str], Path] | None:
     if not enabled:
         logger.info("transcode_skipped", reason="disabled")
-        return path_in
+        return None
 
     if not _ffmpeg_exists():
         logger.warning("transcode_skipped", reason="ffmpeg_missing")
-        return path_in
+        return None
 
     output_path = work_dir / f"{path_in.stem}_transcoded.mp4"
     cmd = [arg.format(input=str(path_in), output=str(output_path)) for arg in FFMPEG_COMMAND]
-    logger.info("transcode_start", command=cmd)
+    logger.info("transcode_start", command=" ".join(cmd))
+    return cmd, output_path
+
+
+def _log_failure(exc: subprocess.CalledProcessError) -> None:
+    logger.error(
+        "transcode_failed",
+        returncode=exc.returncode,
+        stderr=exc.stderr.decode("utf-8", errors="ignore"),
+    )
+
+
+def maybe_transcode(path_in: Path, work_dir: Path, enabled: bool) -> Path:
+    command = _command(path_in, work_dir, enabled)
+    if command is None:
+        return path_in
+    cmd, output_path = command
 
     try:
         subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
     except subprocess.CalledProcessError as exc:
-        logger.error(
-            "transcode_failed",
-            returncode=exc.returncode,
-            stderr=exc.stderr.decode("utf-8", errors="ignore"),
-        )
+        _log_failure(exc)
+        raise
+
+    logger.info("transcode_success", output=str(output_path))
+    return output_path
+
+
+async def maybe_transcode_async(path_in: Path, work_dir: Path, enabled: bool) -> Path:
+    command = _command(path_in, work_dir, enabled)
+    if command is None:
+        return path_in
+    cmd, output_path = command
+
+    process = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await process.communicate()
+    except asyncio.CancelledError:
+        # The job timed out or the worker is stopping: do not leave ffmpeg running.
+        process.kill()
+        await process.wait()
         raise
+    if process.returncode:
+        exc = subprocess.CalledProcessError(process.returncode, cmd, stdout, stderr)
+        _log_failure(exc)
+        raise exc
 
     logger.info("transcode_success", output=str(output_path))
     return output_path
@@ -1,18 +1,29 @@
 from __future__ import annotations
 
+import asyncio
 import time
+from collections.abc import Sequence
+from dataclasses import dataclass
 from pathlib import Path
-
-from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
-from playwright.sync_api import sync_playwright
+from typing import TYPE_CHECKING
+from urllib.parse import urlparse
 
 from app.services.mapper import MappedMeta
 from app.utils.logging import get_logger
+from app.utils.retry import AuthExpiredError
+from app.utils.tracing import SpanSteps
+
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, Page as AsyncPage
+    from playwright.sync_api import Page, Response
 
 
 logger = get_logger("uploader")
 
 UPLOAD_URL = "https://studio.rutube.ru/video/upload"
+STUDIO_ORIGIN = "https://studio.rutube.ru"
+EDIT_URL = STUDIO_ORIGIN + "/video/{rutube_id}/edit"
 TITLE_SELECTORS = [
     'textarea[name="title"]',
     'input[name="title"]',
@@ -39,13 +50,36 @@ PREVIEW_SELECTORS = [
     'input[type="file"][data-testid="thumbnail-upload"]',
     'input[name="poster"]',
 ]
+SAVE_SELECTORS = [
+    '[data-testid="save-button"]',
+    'button[type="submit"]',
+    'button:has-text("Сохранить")',
+]
+FIELD_SELECTORS = {
+    "title": TITLE_SELECTORS,
+    "description": DESCRIPTION_SELECTORS,
+    "tags": TAGS_SELECTORS,
+}
+# Read back after a save. The tags input is a chip editor that reloads empty, so tags
+# rely on the save response alone.
+VERIFIED_FIELDS = ("title", "description")
 
 
 class UploadError(RuntimeError):
     pass
 
 
+@dataclass(slots=True)
+class MetadataEdit:
+    video_id: str
+    rutube_url: str
+    meta: MappedMeta
+    fields: list[str]
+
+
 def _fill_first(page, selectors: list[str], value: str) -> None:
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
     for selector in selectors:
         locator = page.locator(selector)
         if locator.count():
@@ -61,6 +95,8 @@ def _fill_first(page, selectors: list[str], value: str) -> None:
 
 
 def _set_visibility(page, visibility: str) -> None:
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
     options = VISIBILITY_LABELS.get(visibility, [])
     for label in options:
         locator = page.locator(f"label:has-text('{label}')")
@@ -78,10 +114,17 @@ def _set_visibility(page, visibility: str) -> None:
 
 
 def _wait_for_video_url(page, timeout_ms: int = 180_000) -> str:
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
     end_time = time.time() + timeout_ms / 1000
     checked_selector = 'a[href*="rutube.ru/video/"]'
+    attempt = 0
     while time.time() < end_time:
+        attempt += 1
         anchors = page.locator(checked_selector)
+        logger.info(
+            "uploader_poll", attempt=attempt, remaining_seconds=round(end_time - time.time())
+        )
         if anchors.count():
             href = anchors.first.get_attribute("href")
             if href:
@@ -93,28 +136,46 @@ def _wait_for_video_url(page, timeout_ms: int = 180_000) -> str:
     raise UploadError("Timed out waiting for RuTube URL after upload")
 
 
-def upload_to_rutube(video_path: Path, meta: MappedMeta, cookies_path: Path) -> str:
+def _check_inputs(video_path: Path, cookies_path: Path) -> None:
     if not video_path.exists():
         raise FileNotFoundError(video_path)
     if not cookies_path.exists():
-        raise FileNotFoundError(cookies_path)
+        raise AuthExpiredError(f"RuTube storage state not found: {cookies_path}")
+
+
+def upload_to_rutube(  # noqa: PLR0915
+    video_path: Path, meta: MappedMeta, cookies_path: Path
+) -> str:
+    _check_inputs(video_path, cookies_path)
+    # Playwright is imported on first use, like yt_dlp in the downloader.
+    from playwright.sync_api import sync_playwright
 
     logger.info("uploader_start", video_path=str(video_path), visibility=meta.visibility)
 
-    with sync_playwright() as playwright:
+    with sync_playwright() as playwright, SpanSteps() as steps:
+        steps.step("browser_launch")
         browser = playwright.chromium.launch(headless=True)
         context = browser.new_context(storage_state=str(cookies_path))
         page = context.new_page()
         page.set_default_timeout(60_000)
 
+        steps.step("page_load")
         page.goto(UPLOAD_URL, wait_until="domcontentloaded")
         page.wait_for_load_state("networkidle")
+        landed_url = page.url
+        if not landed_url.startswith(STUDIO_ORIGIN):
+            # Studio redirects anonymous sessions to the public login page
+            context.close()
+            browser.close()
+            raise AuthExpiredError(f"RuTube session expired, redirected to {landed_url}")
         logger.info("uploader_page_loaded")
 
+        steps.step("file_select")
         file_input = page.locator('input[type="file"]')
         file_input.set_input_files(str(video_path))
         logger.info("uploader_file_selected")
 
+        steps.step("form_fill")
         _fill_first(page, TITLE_SELECTORS, meta.title)
         _fill_first(page, DESCRIPTION_SELECTORS, meta.description)
 
@@ -143,6 +204,7 @@ def upload_to_rutube(video_path: Path, meta: MappedMeta, cookies_path: Path) ->
             logger.info("uploader_thumbnail_skipped")
 
         # wait for upload to process
+        steps.step("wait_for_url")
         try:
             published_url = _wait_for_video_url(page)
         finally:
@@ -151,3 +213,218 @@ def upload_to_rutube(video_path: Path, meta: MappedMeta, cookies_path: Path) ->
 
     logger.info("uploader_complete", rutube_url=published_url)
     return published_url
+
+
+def _rutube_video_id(rutube_url: str) -> str:
+    # https://rutube.ru/video/<id>/ and https://rutube.ru/video/private/<id>/?p=...
+    match [part for part in urlparse(rutube_url).path.split("/") if part]:
+        case ["video", *_, rutube_id]:
+            return rutube_id
+    raise UploadError(f"Not a RuTube video URL: {rutube_url}")
+
+
+def _click_first(page: Page, selectors: list[str]) -> None:
+    for selector in selectors:
+        locator = page.locator(selector)
+        if locator.count():
+            locator.first.click()
+            return
+    raise UploadError(f"Unable to find selector from list {selectors}")
+
+
+def _read_first(page: Page, selectors: list[str]) -> str:
+    for selector in selectors:
+        locator = page.locator(selector)
+        if locator.count():
+            return locator.first.input_value()
+    raise UploadError(f"Unable to find selector from list {selectors}")
+
+
+def _is_save_response(response: Response, rutube_id: str) -> bool:
+    return response.request.method != "GET" and rutube_id in response.url
+
+
+def _apply_edit(page: Page, edit: MetadataEdit) -> None:
+    rutube_id = _rutube_video_id(edit.rutube_url)
+    page.goto(EDIT_URL.format(rutube_id=rutube_id), wait_until="domcontentloaded")
+    page.wait_for_load_state("networkidle")
+    if not page.url.startswith(STUDIO_ORIGIN):
+        raise AuthExpiredError(f"RuTube session expired, redirected to {page.url}")
+    values = {
+        field: ", ".join(edit.meta.tags) if field == "tags" else getattr(edit.meta, field)
+        for field in edit.fields
+    }
+    for field, value in values.items():
+        _fill_first(page, FIELD_SELECTORS[field], value)
+    # A click is not a save: the edit counts only once Studio accepted the request and the
+    # reloaded form shows the new values.
+    with page.expect_response(lambda response: _is_save_response(response, rutube_id)) as saved:
+        _click_first(page, SAVE_SELECTORS)
+    if not saved.value.ok:
+        raise UploadError(f"RuTube rejected the edit of {rutube_id}: HTTP {saved.value.status}")
+    page.reload(wait_until="domcontentloaded")
+    page.wait_for_load_state("networkidle")
+    for field in VERIFIED_FIELDS:
+        if field not in values:
+            continue
+        if _read_first(page, FIELD_SELECTORS[field]).strip() != values[field].strip():
+            raise UploadError(f"RuTube did not keep the new {field} of {rutube_id}")
+
+
+def update_rutube_metadata(edits: Sequence[MetadataEdit], cookies_path: Path) -> list[str]:
+    """Edits already published videos of one account in a single browser session, touching
+    only each edit's fields; the media, visibility and thumbnail are left alone. Returns
+    the ids whose save RuTube confirmed; other failures are logged and skipped."""
+    if not cookies_path.exists():
+        raise AuthExpiredError(f"RuTube storage state not found: {cookies_path}")
+    from playwright.sync_api import sync_playwright
+
+    logger.info("uploader_metadata_start", videos=len(edits))
+    updated: list[str] = []
+    with sync_playwright() as playwright:
+        browser = playwright.chromium.launch(headless=True)
+        context = browser.new_context(storage_state=str(cookies_path))
+        page = context.new_page()
+        page.set_default_timeout(60_000)
+        try:
+            for edit in edits:
+                try:
+                    _apply_edit(page, edit)
+                except AuthExpiredError:
+                    raise
+                except Exception as exc:  # noqa: BLE001
+                    logger.warning(
+                        "uploader_metadata_failed", video_id=edit.video_id, error=str(exc)
+                    )
+                    continue
+                updated.append(edit.video_id)
+                logger.info(
+                    "uploader_metadata_updated", video_id=edit.video_id, fields=edit.fields
+                )
+        finally:
+            context.close()
+            browser.close()
+    return updated
+
+
+# Async twins of the helpers above for the asyncio worker, which keeps one browser per
+# process and gives each upload its own context (cookies, storage, pages).
+
+
+async def _fill_first_async(page: AsyncPage, selectors: list[str], value: str) -> None:
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+    for selector in selectors:
+        locator = page.locator(selector)
+        if await locator.count():
+            await locator.first.fill(value)
+            return
+        try:
+            await locator.first.wait_for(timeout=2000)
+            await locator.first.fill(value)
+            return
+        except PlaywrightTimeoutError:
+            continue
+    raise UploadError(f"Unable to find selector from list {selectors}")
+
+
+async def _set_visibility_async(page: AsyncPage, visibility: str) -> None:
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+    options = VISIBILITY_LABELS.get(visibility, [])
+    for label in options:
+        locator = page.locator(f"label:has-text('{label}')")
+        if await locator.count():
+            await locator.first.click()
+            return
+    for label in options:
+        try:
+            await page.get_by_text(label, exact=False).click(timeout=3000)
+            return
+        except PlaywrightTimeoutError:
+            continue
+    raise UploadError(f"Unable to set visibility {visibility}")
+
+
+async def _wait_for_video_url_async(page: AsyncPage, timeout_ms: int = 180_000) -> str:
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+    end_time = time.time() + timeout_ms / 1000
+    checked_selector = 'a[href*="rutube.ru/video/"]'
+    attempt = 0
+    while time.time() < end_time:
+        attempt += 1
+        anchors = page.locator(checked_selector)
+        logger.info(
+            "uploader_poll", attempt=attempt, remaining_seconds=round(end_time - time.time())
+        )
+        if await anchors.count():
+            href = await anchors.first.get_attribute("href")
+            if href:
+                return href
+        try:
+            await anchors.first.wait_for(state="attached", timeout=5000)
+        except PlaywrightTimeoutError:
+            await asyncio.sleep(2)
+    raise UploadError("Timed out waiting for RuTube URL after upload")
+
+
+async def upload_to_rutube_async(
+    browser: Browser, video_path: Path, meta: MappedMeta, cookies_path: Path
+) -> str:
+    _check_inputs(video_path, cookies_path)
+    logger.info("uploader_start", video_path=str(video_path), visibility=meta.visibility)
+
+    with SpanSteps() as steps:
+        steps.step("context_open")
+        context = await browser.new_context(storage_state=str(cookies_path))
+        try:
+            page = await context.new_page()
+            page.set_default_timeout(60_000)
+
+            steps.step("page_load")
+            await page.goto(UPLOAD_URL, wait_until="domcontentloaded")
+            await page.wait_for_load_state("networkidle")
+            landed_url = page.url
+            if not landed_url.startswith(STUDIO_ORIGIN):
+                raise AuthExpiredError(f"RuTube session expired, redirected to {landed_url}")
+            logger.info("uploader_page_loaded")
+
+            steps.step("file_select")
+            await page.locator('input[type="file"]').set_input_files(str(video_path))
+            logger.info("uploader_file_selected")
+
+            steps.step("form_fill")
+            await _fill_first_async(page, TITLE_SELECTORS, meta.title)
+            await _fill_first_async(page, DESCRIPTION_SELECTORS, meta.description)
+
+            if meta.tags:
+                try:
+                    await _fill_first_async(page, TAGS_SELECTORS, ", ".join(meta.tags))
+                except UploadError:
+                    logger.warning("uploader_tags_not_found")
+
+            try:
+                await _set_visibility_async(page, meta.visibility)
+            except UploadError as exc:
+                logger.warning("uploader_visibility_warning", error=str(exc))
+
+            if meta.thumbnail_path and meta.thumbnail_path.exists():
+                for selector in PREVIEW_SELECTORS:
+                    preview_input = page.locator(selector)
+                    if await preview_input.count():
+                        await preview_input.set_input_files(str(meta.thumbnail_path))
+                        logger.info("uploader_thumbnail_set")
+                        break
+                else:
+                    logger.info("uploader_thumbnail_ui_unavailable")
+            else:
+                logger.info("uploader_thumbnail_skipped")
+
+            steps.step("wait_for_url")
+            published_url = await _wait_for_video_url_async(page)
+        finally:
+            await context.close()
+
+    logger.info("uploader_complete", rutube_url=published_url)
+    return published_url
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+import zipfile
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, cast
+
+import psutil
+from redis import Redis
+from redis.exceptions import RedisError
+from rq.exceptions import NoSuchJobError
+from rq.job import Job, JobStatus
+
+from app.config import AppConfig, get_settings
+from app.services.disk_budget import RESERVATIONS_KEY
+from app.utils.logging import get_logger
+from app.utils.metrics import WORK_DIR_RECLAIMED_BYTES
+from app.utils.paths import PRESERVED_SUFFIXES
+from app.utils.redis_pool import get_redis
+
+
+logger = get_logger("workdir_gc")
+
+LAST_REPORT_KEY = "workdir_gc:last"
+# WORK_DIR is shared with the database, traces and profiles; only per-video dirs are ours.
+_VIDEO_DIR_PATTERN = re.compile(r"^[A-Za-z0-9_-]{11}$")
+_PENDING_STATUSES = (JobStatus.QUEUED, JobStatus.SCHEDULED, JobStatus.DEFERRED)
+
+
+@dataclass(slots=True)
+class SweepReport:
+    started_at: float = field(default_factory=time.time)
+    duration_seconds: float = 0.0
+    dry_run: bool = False
+    scanned_dirs: int = 0
+    active_dirs: int = 0
+    young_dirs: int = 0
+    deleted_files: int = 0
+    reclaimed_bytes: int = 0
+    archived_files: int = 0
+    removed_dirs: int = 0
+    truncated: bool = False
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class _IoThrottle:
+    def __init__(self, bytes_per_second: int) -> None:
+        self._rate = bytes_per_second
+        self._started = time.monotonic()
+        self._spent = 0
+
+    def spend(self, size: int) -> None:
+        self._spent += size
+        ahead = self._spent / self._rate - (time.monotonic() - self._started)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+def _lower_io_priority() -> None:
+    # Idle I/O class for this thread only: the sweeper gets the disk when downloads do not.
+    try:
+        psutil.Process(threading.get_native_id()).ionice(psutil.IOPRIO_CLASS_IDLE)
+    except (AttributeError, psutil.Error, OSError):
+        pass
+
+
+def _is_video_dir(path: Path) -> bool:
+    if not path.is_dir() or not _VIDEO_DIR_PATTERN.match(path.name):
+        return False
+    # yt-dlp names every artifact after the video id (outtmpl "%(id)s.%(ext)s").
+    return all(item.name.startswith(path.name) for item in path.iterdir())
+
+
+def _files(path: Path) -> list[tuple[Path, os.stat_result]]:
+    result = []
+    for item in path.rglob("*"):
+        try:
+            stat = item.stat()
+        except OSError:
+            continue
+        if item.is_file():
+            result.append((item, stat))
+    return result
+
+
+def _is_preserved(path: Path) -> bool:
+    return any(path.name.endswith(suffix) for suffix in PRESERVED_SUFFIXES)
+
+
+def _remove_tree(path: Path) -> None:
+    for sub in sorted(path.rglob("*"), reverse=True):
+        if sub.is_dir():
+            sub.rmdir()
+    path.rmdir()
+
+
+class WorkDirSweeper:
+    def __init__(self, redis_conn: Redis, cfg: AppConfig) -> None:
+        self._redis = redis_conn
+        self._work_dir = cfg.work_dir
+        self._min_age = cfg.work_dir_gc_min_age_seconds
+        self._max_dirs = cfg.work_dir_gc_max_dirs
+        self._io_rate = cfg.work_dir_gc_io_bytes_per_second
+        self._archive_path = cfg.work_dir_gc_archive_path
+
+    def _job_state(self, video_id: str) -> str | None:
+        if self._redis.exists(f"lock:publish:{video_id}") or self._redis.hexists(
+            RESERVATIONS_KEY, video_id
+        ):
+            return "active"
+        try:
+            status = Job.fetch(f"publish:{video_id}", connection=self._redis).get_status()
+        except NoSuchJobError:
+            return None
+        if status == JobStatus.STARTED:
+            return "active"
+        if status in _PENDING_STATUSES:
+            return "pending"
+        return None
+
+    def _archive(  # noqa: PLR0913
+        self,
+        archive: zipfile.ZipFile,
+        names: set[str],
+        video_id: str,
+        files: list[tuple[Path, os.stat_result]],
+        throttle: _IoThrottle,
+        report: SweepReport,
+    ) -> None:
+        for path, stat in files:
+            # Keyed by mtime so a later attempt's log does not collide with an earlier one.
+            name = f"{video_id}/{int(stat.st_mtime)}/{path.name}"
+            if name not in names:
+                archive.write(path, arcname=name)
+                names.add(name)
+                report.archived_files += 1
+            throttle.spend(stat.st_size)
+            path.unlink(missing_ok=True)
+            report.deleted_files += 1
+            report.reclaimed_bytes += stat.st_size
+
+    def _delete_media(
+        self,
+        media: list[tuple[Path, os.stat_result]],
+        throttle: _IoThrottle,
+        report: SweepReport,
+    ) -> None:
+        for path, stat in media:
+            if not report.dry_run:
+                path.unlink(missing_ok=True)
+                throttle.spend(4096)
+            report.deleted_files += 1
+            report.reclaimed_bytes += stat.st_size
+
+    def sweep(self, dry_run: bool = False) -> SweepReport:
+        report = SweepReport(dry_run=dry_run)
+        throttle = _IoThrottle(self._io_rate)
+        now = time.time()
+        if not self._work_dir.is_dir():
+            return report
+        candidates = sorted(path for path in self._work_dir.iterdir() if _is_video_dir(path))
+        if len(candidates) > self._max_dirs:
+            candidates = candidates[: self._max_dirs]
+            report.truncated = True
+
+        archive: zipfile.ZipFile | None = None
+        names: set[str] = set()
+        try:
+            for path in candidates:
+                report.scanned_dirs += 1
+                video_id = path.name
+                state = self._job_state(video_id)
+                if state == "active":
+                    report.active_dirs += 1
+                    continue
+                files = _files(path)
+                newest = max((stat.st_mtime for _, stat in files), default=path.stat().st_mtime)
+                if now - newest < self._min_age:
+                    report.young_dirs += 1
+                    continue
+
+                media = [(p, stat) for p, stat in files if not _is_preserved(p)]
+                metadata = [(p, stat) for p, stat in files if _is_preserved(p)]
+                self._delete_media(media, throttle, report)
+                if dry_run or state == "pending":
+                    # A pending retry re-downloads, but may want the old log.
+                    continue
+                if metadata:
+                    if archive is None:
+                        archive = self._open_archive()
+                        names = set(archive.namelist())
+                    self._archive(archive, names, video_id, metadata, throttle, report)
+                _remove_tree(path)
+                report.removed_dirs += 1
+        finally:
+            if archive is not None:
+                archive.close()
+
+        report.duration_seconds = round(time.time() - report.started_at, 3)
+        if not dry_run:
+            WORK_DIR_RECLAIMED_BYTES.inc(report.reclaimed_bytes)
+        try:
+            self._redis.set(LAST_REPORT_KEY, json.dumps(report.as_dict()))
+        except RedisError as exc:
+            logger.warning("work_dir_gc_report_unsaved", error=str(exc))
+        logger.info("work_dir_gc_finished", **report.as_dict())
+        return report
+
+    def _open_archive(self) -> zipfile.ZipFile:
+        self._archive_path.parent.mkdir(parents=True, exist_ok=True)
+        return zipfile.ZipFile(self._archive_path, mode="a", compression=zipfile.ZIP_DEFLATED)
+
+    def last_report(self) -> dict[str, Any] | None:
+        raw = cast(bytes | None, self._redis.get(LAST_REPORT_KEY))
+        return json.loads(raw) if raw else None
+
+
+def get_work_dir_sweeper() -> WorkDirSweeper:
+    return WorkDirSweeper(get_redis(), get_settings())
+
+
+def _sweep_forever(interval: int, stop: threading.Event) -> None:
+    _lower_io_priority()
+    while not stop.wait(interval):
+        try:
+            get_work_dir_sweeper().sweep()
+        except Exception as exc:  # noqa: BLE001
+            logger.error("work_dir_gc_failed", error=str(exc))
+
+
+def start_work_dir_sweeper(stop: threading.Event | None = None) -> threading.Event:
+    settings = get_settings()
+    stop = stop or threading.Event()
+    if not settings.work_dir_gc_interval_seconds:
+        return stop
+    thread = threading.Thread(
+        target=_sweep_forever,
+        args=(settings.work_dir_gc_interval_seconds, stop),
+        name="work-dir-sweeper",
+        daemon=True,
+    )
+    thread.start()
+    logger.info("work_dir_sweeper_started", interval=settings.work_dir_gc_interval_seconds)
+    return stop
@@ -1 +1 @@
-__all__ = ["logging", "paths", "retry"]
+__all__ = ["logging", "paths", "redis_pool", "retry"]
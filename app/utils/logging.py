@@ -1,12 +1,203 @@
 from __future__ import annotations
 
+import atexit
+import itertools
 import logging
+import os
+import queue
 import sys
-from typing import Any
+import threading
+from collections.abc import Mapping
+from datetime import UTC, datetime
+from typing import Any, BinaryIO
 
+import orjson
 import structlog
 
 
+DEFAULT_MAX_FIELD_LENGTH = 2000
+DEFAULT_QUEUE_SIZE = 10_000
+# Chatty progress events; warnings and errors are never sampled.
+DEFAULT_SAMPLE_RATES: dict[str, float] = {
+    "download_progress": 0.02,
+    "uploader_poll": 0.1,
+}
+_SAMPLED_METHODS = frozenset({"debug", "info"})
+_BATCH_SIZE = 256
+# Short sequences are cheap to render; only longer ones are joined and measured.
+_SHORT_SEQUENCE_ITEMS = 8
+
+
+class LogPipeline:
+    """Bounded in-memory queue drained by one writer thread, so emitting a log line never
+    waits on stdout. Lines are dropped (and counted) rather than blocking when it is full."""
+
+    def __init__(self, stream: BinaryIO, max_size: int = DEFAULT_QUEUE_SIZE) -> None:
+        self._stream = stream
+        self._max_size = max_size
+        self._queue: queue.Queue[bytes | threading.Event | None] = queue.Queue(max_size)
+        self._thread: threading.Thread | None = None
+        self.dropped = 0
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def restart_in_child(self) -> None:
+        # A forked child inherits neither the writer thread nor a safe copy of its locks.
+        self._queue = queue.Queue(self._max_size)
+        self.dropped = 0
+        self.start()
+
+    def put(self, line: bytes) -> None:
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write(self, lines: list[bytes]) -> None:
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            lines.append(orjson.dumps({"message": "log_dropped", "count": dropped}) + b"\n")
+        try:
+            self._stream.write(b"".join(lines))
+            self._stream.flush()
+        except (OSError, ValueError):
+            pass
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            lines: list[bytes] = []
+            markers: list[threading.Event] = []
+            stop = False
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    lines.append(item)
+                if len(lines) >= _BATCH_SIZE:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if lines or self.dropped:
+                self._write(lines)
+            for marker in markers:
+                marker.set()
+            if stop:
+                return
+
+    def flush(self, timeout: float = 2.0) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            return
+        marker = threading.Event()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return
+        marker.wait(timeout)
+
+    def close(self, timeout: float = 2.0) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self.flush(timeout)
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+class QueueLogger:
+    def __init__(self, pipeline: LogPipeline) -> None:
+        self._pipeline = pipeline
+
+    def msg(self, message: bytes) -> None:
+        self._pipeline.put(message + b"\n")
+
+    log = debug = info = warn = warning = error = critical = exception = fatal = msg
+
+
+class QueueLoggerFactory:
+    def __init__(self, pipeline: LogPipeline) -> None:
+        self._logger = QueueLogger(pipeline)
+
+    def __call__(self, *args: Any) -> QueueLogger:
+        return self._logger
+
+
+class QueueHandler(logging.Handler):
+    """Routes stdlib records (uvicorn, rq, alembic, httpx) into the same writer."""
+
+    def __init__(self, pipeline: LogPipeline) -> None:
+        super().__init__()
+        self._pipeline = pipeline
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            payload: dict[str, Any] = {
+                "message": record.getMessage(),
+                "logger": record.name,
+                "timestamp": datetime.fromtimestamp(record.created, UTC)
+                .isoformat()
+                .replace("+00:00", "Z"),
+                "level": record.levelname.lower(),
+            }
+            if record.exc_info:
+                payload["exception"] = logging.Formatter().formatException(record.exc_info)
+            self._pipeline.put(orjson.dumps(payload, default=str) + b"\n")
+        except Exception:  # noqa: BLE001
+            self.handleError(record)
+
+
+class EventSampler:
+    """Keeps one in every 1/rate occurrences of the configured events (deterministic, so a
+    burst is thinned evenly); kept events carry `sample_every` for re-scaling counts."""
+
+    def __init__(self, rates: Mapping[str, float]) -> None:
+        self._every = {event: (round(1 / rate) if rate > 0 else 0) for event, rate in rates.items()}
+        self._counters = {event: itertools.count() for event in rates}
+
+    def __call__(
+        self, logger: Any, method_name: str, event_dict: structlog.typing.EventDict
+    ) -> structlog.typing.EventDict:
+        event = event_dict.get("event")
+        every = self._every.get(event)  # type: ignore[arg-type]
+        if every is None or method_name not in _SAMPLED_METHODS:
+            return event_dict
+        if every == 0 or next(self._counters[event]) % every:  # type: ignore[index]
+            raise structlog.DropEvent
+        if every > 1:
+            event_dict["sample_every"] = every
+        return event_dict
+
+
+def _cap(value: str, max_length: int) -> str:
+    # Keep both ends: the head says what ran, the tail of stderr says why it failed.
+    half = max_length // 2
+    return f"{value[:half]}...[{len(value) - 2 * half} chars truncated]...{value[-half:]}"
+
+
+class FieldSizeCapper:
+    def __init__(self, max_length: int) -> None:
+        self._max_length = max_length
+
+    def __call__(
+        self, logger: Any, method_name: str, event_dict: structlog.typing.EventDict
+    ) -> structlog.typing.EventDict:
+        max_length = self._max_length
+        for key, value in event_dict.items():
+            if isinstance(value, str):
+                if len(value) > max_length:
+                    event_dict[key] = _cap(value, max_length)
+            elif isinstance(value, list | tuple) and len(value) > _SHORT_SEQUENCE_ITEMS:
+                joined = " ".join(map(str, value))
+                if len(joined) > max_length:
+                    event_dict[key] = _cap(joined, max_length)
+        return event_dict
+
+
 def _shared_processors() -> list[structlog.typing.Processor]:
     return [
         structlog.processors.TimeStamper(fmt="iso"),
@@ -16,26 +207,61 @@ def _shared_processors() -> list[structlog.typing.Processor]:
     ]
 
 
-def configure_logging(level: str = "INFO") -> None:
-    logging.basicConfig(
-        format="%(message)s",
-        stream=sys.stdout,
-        level=getattr(logging, level.upper(), logging.INFO),
-    )
+def build_processors(
+    sample_rates: Mapping[str, float] | None = None,
+    max_field_length: int = DEFAULT_MAX_FIELD_LENGTH,
+) -> list[structlog.typing.Processor]:
+    # Sampling goes first so a dropped event costs a dict lookup and a counter tick.
+    return [
+        EventSampler({**DEFAULT_SAMPLE_RATES, **(sample_rates or {})}),
+        structlog.contextvars.merge_contextvars,
+        FieldSizeCapper(max_field_length),
+        structlog.processors.EventRenamer("message"),
+        *_shared_processors(),
+        structlog.processors.dict_tracebacks,
+        structlog.processors.JSONRenderer(serializer=orjson.dumps),
+    ]
+
+
+_pipeline: LogPipeline | None = None
+
+
+def _restart_pipeline_in_child() -> None:
+    if _pipeline is not None:
+        _pipeline.restart_in_child()
+
+
+def flush_logs() -> None:
+    if _pipeline is not None:
+        _pipeline.flush()
+
+
+def configure_logging(
+    level: str = "INFO",
+    sample_rates: Mapping[str, float] | None = None,
+    max_field_length: int = DEFAULT_MAX_FIELD_LENGTH,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    stream: BinaryIO | None = None,
+) -> None:
+    global _pipeline  # noqa: PLW0603
+    log_level = getattr(logging, level.upper(), logging.INFO)
+    if _pipeline is None:
+        _pipeline = LogPipeline(stream or sys.stdout.buffer, max_size=queue_size)
+        _pipeline.start()
+        atexit.register(_pipeline.close)
+        os.register_at_fork(after_in_child=_restart_pipeline_in_child)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(_pipeline))
+    root.setLevel(log_level)
 
     structlog.configure(
-        processors=[
-            structlog.contextvars.merge_contextvars,
-            structlog.processors.EventRenamer("message"),
-            *_shared_processors(),
-            structlog.processors.dict_tracebacks,
-            structlog.processors.JSONRenderer(),
-        ],
-        wrapper_class=structlog.make_filtering_bound_logger(
-            getattr(logging, level.upper(), logging.INFO)
-        ),
+        processors=build_processors(sample_rates, max_field_length),
+        wrapper_class=structlog.make_filtering_bound_logger(log_level),
         context_class=dict,
-        logger_factory=structlog.stdlib.LoggerFactory(),
+        logger_factory=QueueLoggerFactory(_pipeline),
         cache_logger_on_first_use=True,
     )
 
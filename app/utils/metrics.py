@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import os
+import time
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from redis import Redis
+from redis.exceptions import RedisError
+
+from app.utils.logging import get_logger
+
+
+logger = get_logger("metrics")
+
+# RQ runs every job in a forked work-horse; without a shared directory the child's samples
+# die with it. See `worker_registry`.
+MULTIPROC_ENV = "PROMETHEUS_MULTIPROC_DIR"
+if os.environ.get(MULTIPROC_ENV):
+    # Multiprocess values open their files as soon as a metric is defined below.
+    os.makedirs(os.environ[MULTIPROC_ENV], exist_ok=True)
+
+_STAGE_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+_E2E_BUCKETS = (30, 60, 120, 300, 600, 1200, 1800, 3600, 7200, 14400, 43200, 86400)
+_HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+STAGE_SECONDS = Histogram(
+    "publish_stage_duration_seconds",
+    "Wall time of one pipeline stage.",
+    ["stage"],
+    buckets=_STAGE_BUCKETS,
+)
+PUBLISH_E2E_SECONDS = Histogram(
+    "publish_end_to_end_seconds",
+    "Time from the first enqueue of a publish job to the finished upload.",
+    buckets=_E2E_BUCKETS,
+)
+BYTES_TRANSFERRED = Counter(
+    "publish_bytes_total",
+    "Video bytes moved by the pipeline.",
+    ["direction"],
+)
+PUBLISH_OUTCOMES = Counter(
+    "publish_jobs_total",
+    "Publish attempts by outcome.",
+    ["outcome"],
+)
+STAGE_RETRIES = Counter(
+    "publish_retries_total",
+    "Failed attempts that were rescheduled.",
+    ["stage", "error_class"],
+)
+STAGE_FAILURES = Counter(
+    "publish_failures_total",
+    "Jobs that failed for good.",
+    ["stage", "error_class"],
+)
+DEFERRALS = Counter(
+    "publish_deferrals_total",
+    "Jobs parked because a breaker or gate was closed.",
+    ["gate"],
+)
+HTTP_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "API request latency.",
+    ["method", "route", "status"],
+    buckets=_HTTP_BUCKETS,
+)
+WORK_DIR_RECLAIMED_BYTES = Counter(
+    "work_dir_gc_reclaimed_bytes",
+    "Bytes deleted from WORK_DIR by the background sweeper.",
+)
+PUBLISHED_INDEX_LOOKUPS = Counter(
+    "published_index_lookups_total",
+    "Published-id lookups by the tier that answered them.",
+    ["tier"],
+)
+RSS_POLL_SECONDS = Histogram(
+    "rss_poll_duration_seconds",
+    "Duration of one RSS poll, including enqueueing.",
+    buckets=_HTTP_BUCKETS + (10, 30, 60),
+)
+
+
+class QueueDepthCollector(Collector):
+    """Reads RQ queue and registry sizes from Redis at scrape time."""
+
+    def __init__(
+        self,
+        redis_factory: Callable[[], Redis],
+        queue_names_factory: Callable[[], Iterable[str]],
+    ) -> None:
+        self._redis_factory = redis_factory
+        self._queue_names_factory = queue_names_factory
+
+    def describe(self) -> Iterator[GaugeMetricFamily]:
+        # Without describe() REGISTRY.register() calls collect(), i.e. Redis, at startup.
+        yield GaugeMetricFamily("rq_queue_depth", "Jobs waiting in an RQ queue.", labels=["queue"])
+        yield GaugeMetricFamily(
+            "rq_registry_jobs", "Jobs in an RQ registry.", labels=["queue", "registry"]
+        )
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        depth = GaugeMetricFamily(
+            "rq_queue_depth", "Jobs waiting in an RQ queue.", labels=["queue"]
+        )
+        registries = GaugeMetricFamily(
+            "rq_registry_jobs", "Jobs in an RQ registry.", labels=["queue", "registry"]
+        )
+        names = list(self._queue_names_factory())
+        try:
+            with self._redis_factory().pipeline(transaction=False) as pipe:
+                for name in names:
+                    pipe.llen(f"rq:queue:{name}")
+                    pipe.zcard(f"rq:wip:{name}")
+                    pipe.zcard(f"rq:scheduled:{name}")
+                    pipe.zcard(f"rq:failed:{name}")
+                results = pipe.execute()
+        except RedisError as exc:
+            logger.warning("metrics_queue_depth_unavailable", error=str(exc))
+            return
+        for offset, name in enumerate(names):
+            queued, started, scheduled, failed = results[offset * 4 : offset * 4 + 4]
+            depth.add_metric([name], queued)
+            registries.add_metric([name, "started"], started)
+            registries.add_metric([name, "scheduled"], scheduled)
+            registries.add_metric([name, "failed"], failed)
+        yield depth
+        yield registries
+
+
+class PublishedIndexCollector(Collector):
+    """Reports the in-process published index at scrape time."""
+
+    def __init__(self, stats_factory: Callable[[], dict[str, Any]]) -> None:
+        self._stats_factory = stats_factory
+
+    def describe(self) -> Iterator[GaugeMetricFamily]:
+        yield GaugeMetricFamily("published_index_size", "Video ids held by the published index.")
+        yield GaugeMetricFamily(
+            "published_index_memory_bytes", "Approximate memory held by the published index."
+        )
+        yield GaugeMetricFamily(
+            "published_index_hit_ratio", "Share of lookups answered without the database."
+        )
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        stats = self._stats_factory()
+        yield GaugeMetricFamily(
+            "published_index_size", "Video ids held by the published index.", value=stats["size"]
+        )
+        yield GaugeMetricFamily(
+            "published_index_memory_bytes",
+            "Approximate memory held by the published index.",
+            value=stats["memoryBytes"],
+        )
+        # No lookups yet: report nothing rather than a misleading 0 or 1.
+        if stats["hitRate"] is not None:
+            yield GaugeMetricFamily(
+                "published_index_hit_ratio",
+                "Share of lookups answered without the database.",
+                value=stats["hitRate"],
+            )
+
+
+def observe_stage(stage: str, started: float) -> None:
+    STAGE_SECONDS.labels(stage).observe(time.monotonic() - started)
+
+
+def render_latest(registry: CollectorRegistry = REGISTRY) -> tuple[bytes, str]:
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def worker_registry() -> CollectorRegistry:
+    multiproc_dir = os.environ.get(MULTIPROC_ENV)
+    if not multiproc_dir:
+        return REGISTRY
+    from prometheus_client import multiprocess
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=multiproc_dir)
+    return registry
+
+
+def reset_multiproc_dir() -> None:
+    # Samples from a previous container run would otherwise be summed into the new one.
+    multiproc_dir = os.environ.get(MULTIPROC_ENV)
+    if not multiproc_dir:
+        return
+    os.makedirs(multiproc_dir, exist_ok=True)
+    for name in os.listdir(multiproc_dir):
+        if name.endswith(".db"):
+            os.remove(os.path.join(multiproc_dir, name))
+
+
+def start_exporter(port: int) -> None:
+    if not port:
+        return
+    start_http_server(port, registry=worker_registry())
+    logger.info("metrics_exporter_started", port=port)
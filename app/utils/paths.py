@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import os
 import re
+from collections.abc import Iterable
 from pathlib import Path
 
 
 _SAFE_CHARS_PATTERN = re.compile(r"[^A-Za-z0-9_.-]+")
+# Kept by the per-job cleanup for post-mortems; archived later by the work-dir sweeper.
+PRESERVED_SUFFIXES = frozenset({".info.json", ".json", ".log"})
 
 
 def safe_name(value: str) -> str:
@@ -18,7 +22,7 @@ def get_video_work_dir(base_dir: Path, video_id: str) -> Path:
     return path
 
 
-def cleanup_dir(path: Path, preserve_suffixes: set[str] | None = None) -> None:
+def cleanup_dir(path: Path, preserve_suffixes: Iterable[str] | None = None) -> None:
     if not path.exists() or not path.is_dir():
         return
     for item in path.iterdir():
@@ -32,3 +36,20 @@ def cleanup_dir(path: Path, preserve_suffixes: set[str] | None = None) -> None:
             if preserve_suffixes and any(item.name.endswith(suffix) for suffix in preserve_suffixes):
                 continue
             item.unlink(missing_ok=True)
+
+
+def dir_size(path: Path) -> int:
+    total = 0
+    try:
+        entries = list(os.scandir(path))
+    except OSError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                total += dir_size(Path(entry.path))
+            else:
+                total += entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            continue
+    return total
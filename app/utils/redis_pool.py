@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import threading
+
+from redis import ConnectionPool, Redis
+
+from app.config import get_settings
+
+
+_pool: ConnectionPool | None = None
+_client: Redis | None = None
+_lock = threading.Lock()
+
+
+def _create_pool() -> ConnectionPool:
+    settings = get_settings()
+    pool: ConnectionPool = ConnectionPool.from_url(
+        settings.redis_url,
+        max_connections=settings.redis_max_connections,
+        health_check_interval=settings.redis_health_check_interval,
+    )
+    return pool
+
+
+def get_redis() -> Redis:
+    # redis-py pools detect fork() by pid and reopen sockets in the child, so a single
+    # process-wide client is safe for the API, RQ work-horses and the poller.
+    global _pool, _client  # noqa: PLW0603
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _pool = _create_pool()
+                _client = Redis(connection_pool=_pool)
+    return _client
+
+
+def close_redis() -> None:
+    global _pool, _client  # noqa: PLW0603
+    with _lock:
+        if _pool is not None:
+            _pool.disconnect()
+        _pool = None
+        _client = None
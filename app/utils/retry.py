@@ -1,39 +1,136 @@
 from __future__ import annotations
 
-import random
-import time
-from collections.abc import Callable
-from typing import TypeVar
+import subprocess
+from typing import Any, Literal
 
-from app.config import get_retry_policy
+from rq.job import Job
+
+from app.config import get_retry_policy, get_stage_retry_policies
 from app.utils.logging import get_logger
+from app.utils.metrics import DEFERRALS, STAGE_FAILURES, STAGE_RETRIES
+
+
+ErrorClass = Literal["unavailable", "auth", "invalid", "transient"]
+
+ERROR_UNAVAILABLE: ErrorClass = "unavailable"
+ERROR_AUTH: ErrorClass = "auth"
+ERROR_INVALID: ErrorClass = "invalid"
+ERROR_TRANSIENT: ErrorClass = "transient"
+
+PERMANENT_ERROR_CLASSES: frozenset[str] = frozenset(
+    {ERROR_UNAVAILABLE, ERROR_AUTH, ERROR_INVALID}
+)
+
+# Substrings of yt-dlp / YouTube messages for videos that will never become downloadable.
+_UNAVAILABLE_MARKERS = (
+    "private video",
+    "video unavailable",
+    "this video has been removed",
+    "this video is no longer available",
+    "account associated with this video has been terminated",
+    "members-only",
+    "join this channel to get access",
+    "sign in to confirm your age",
+    "copyright claim",
+    "not available in your country",
+)
+
+logger = get_logger("retry")
+
+
+class PermanentError(RuntimeError):
+    error_class: ErrorClass = ERROR_INVALID
+
+
+class VideoUnavailableError(PermanentError):
+    error_class = ERROR_UNAVAILABLE
+
+
+class AuthExpiredError(PermanentError):
+    error_class = ERROR_AUTH
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, breaker: str, retry_after: float) -> None:
+        super().__init__(f"Circuit breaker {breaker} is open")
+        self.breaker = breaker
+        self.retry_after = retry_after
+
+
+def classify_error(exc: BaseException) -> ErrorClass:
+    if isinstance(exc, PermanentError):
+        return exc.error_class
+    if isinstance(exc, FileNotFoundError | subprocess.CalledProcessError):
+        return ERROR_INVALID
+    message = str(exc).lower()
+    if any(marker in message for marker in _UNAVAILABLE_MARKERS):
+        return ERROR_UNAVAILABLE
+    return ERROR_TRANSIENT
+
+
+def is_permanent(error_class: str) -> bool:
+    return error_class in PERMANENT_ERROR_CLASSES
+
+
+def total_retry_budget() -> int:
+    return sum(policy.max_attempts for policy in get_stage_retry_policies().values())
+
+
+def apply_retry_decision(job: Job | None, stage: str, exc: BaseException) -> ErrorClass:
+    """Record the failure in job meta and steer RQ's own retry: permanent errors and
+    exhausted stages end the job, transient ones are rescheduled with the stage backoff."""
+    error_class = classify_error(exc)
+    if job is None:
+        STAGE_FAILURES.labels(stage, error_class).inc()
+        return error_class
+
+    if isinstance(exc, CircuitOpenError):
+        DEFERRALS.labels(exc.breaker).inc()
+        # Waiting for a dependency to recover is not an attempt: hand back the retry RQ is
+        # about to consume and park the job until the breaker may half-open.
+        defer_seconds = max(int(exc.retry_after), 1)
+        job.retries_left = (job.retries_left or 0) + 1
+        job.retry_intervals = [defer_seconds]
+        job.meta["deferred_by"] = exc.breaker
+        job.save_meta()
+        logger.info("stage_deferred", job_id=job.id, breaker=exc.breaker, retry_in=defer_seconds)
+        return error_class
+
+    policy = get_retry_policy(stage)
+    attempts: dict[str, int] = dict(job.meta.get("attempts") or {})
+    attempts[stage] = attempts.get(stage, 0) + 1
+    stage_exhausted = attempts[stage] >= policy.max_attempts
+
+    delay_seconds: int | None = None
+    if is_permanent(error_class) or stage_exhausted:
+        job.retries_left = 0
+        STAGE_FAILURES.labels(stage, error_class).inc()
+    else:
+        delay_seconds = int(policy.delay_for(attempts[stage]))
+        job.retry_intervals = [delay_seconds]
+        STAGE_RETRIES.labels(stage, error_class).inc()
 
+    budget: dict[str, Any] = {
+        "total": job.meta.get("retry_budget", {}).get("total", total_retry_budget()),
+        # RQ takes one retry off retries_left only after this returns, when it reschedules.
+        "remaining": max((job.retries_left or 0) - 1, 0),
+        "attempts": attempts,
+        "last_stage": stage,
+        "last_error_class": error_class,
+        "next_retry_in": delay_seconds,
+    }
+    job.meta["attempts"] = attempts
+    job.meta["retry_budget"] = budget
+    job.save_meta()
 
-T = TypeVar("T")
-
-
-def retry_on_exception(func: Callable[[], T], *, operation: str) -> T:
-    policy = get_retry_policy()
-    logger = get_logger("retry").bind(operation=operation)
-
-    attempt = 0
-    delay = policy.base_delay_seconds
-
-    while True:
-        attempt += 1
-        try:
-            return func()
-        except Exception as exc:  # noqa: BLE001
-            logger.warning(
-                "operation_failed",
-                attempt=attempt,
-                max_attempts=policy.max_attempts,
-                error=str(exc),
-            )
-            if attempt >= policy.max_attempts:
-                logger.error("operation_exhausted", attempt=attempt)
-                raise
-            jitter = delay * policy.jitter_factor * random.random()
-            sleep_seconds = min(delay + jitter, policy.max_delay_seconds)
-            time.sleep(sleep_seconds)
-            delay = min(delay * 2, policy.max_delay_seconds)
+    logger.warning(
+        "stage_failed",
+        job_id=job.id,
+        stage=stage,
+        error_class=error_class,
+        attempt=attempts[stage],
+        max_attempts=policy.max_attempts,
+        retry_in=delay_seconds,
+        error=str(exc),
+    )
+    return error_class
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+import structlog
+from opentelemetry import context as otel_context, trace
+from opentelemetry.propagate import extract, inject
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SpanExporter,
+)
+from opentelemetry.trace import Span, Status, StatusCode
+
+from app.config import get_settings
+from app.utils.logging import get_logger
+
+
+logger = get_logger("tracing")
+
+TRACE_META_KEY = "trace"
+_TRACER_NAME = "youtube_to_rutube"
+
+_provider: TracerProvider | None = None
+
+
+def configure_tracing(service_name: str) -> None:
+    """Installs the SDK provider once per process; spans are always recorded so ingestion
+    can hand a real trace id to the worker, but only exported when an exporter is set."""
+    global _provider  # noqa: PLW0603
+    if _provider is not None:
+        return
+    settings = get_settings()
+    _provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    exporter: SpanExporter | None = None
+    if settings.tracing_exporter == "file":
+        exporter = _file_exporter(settings.tracing_file_path)
+    elif settings.tracing_exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        exporter = OTLPSpanExporter(endpoint=settings.tracing_otlp_endpoint)
+    if exporter is not None:
+        _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+    logger.info("tracing_configured", service=service_name, exporter=settings.tracing_exporter)
+
+
+def _file_exporter(path: Path) -> ConsoleSpanExporter:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # One OTLP-JSON-shaped span per line; line buffering keeps forked writers from interleaving.
+    out = path.open("a", encoding="utf-8", buffering=1)
+    # indent=None is what json.dumps accepts; the SDK annotation only allows ints.
+    return ConsoleSpanExporter(
+        out=out,
+        formatter=lambda span: span.to_json(indent=None) + "\n",  # type: ignore[arg-type]
+    )
+
+
+def flush_spans() -> None:
+    # RQ work-horses leave through os._exit, which skips the batch processor's shutdown hook.
+    if _provider is not None:
+        _provider.force_flush()
+
+
+def _tracer() -> trace.Tracer:
+    # Falls back to the global (no-op until configured) provider outside configure_tracing().
+    return trace.get_tracer(_TRACER_NAME, tracer_provider=_provider)
+
+
+def _bind_span_ids(span: Span) -> dict[str, str]:
+    span_context = span.get_span_context()
+    if not span_context.is_valid:
+        return {}
+    return {
+        "trace_id": format(span_context.trace_id, "032x"),
+        "span_id": format(span_context.span_id, "016x"),
+    }
+
+
+@contextmanager
+def start_span(
+    name: str,
+    parent: Mapping[str, str] | None = None,
+    attributes: Mapping[str, Any] | None = None,
+) -> Iterator[Span]:
+    tracer = _tracer()
+    parent_context = extract(dict(parent)) if parent else None
+    with tracer.start_as_current_span(
+        name, context=parent_context, attributes=dict(attributes or {})
+    ) as span:
+        with structlog.contextvars.bound_contextvars(**_bind_span_ids(span)):
+            yield span
+
+
+def current_carrier() -> dict[str, str]:
+    carrier: dict[str, str] = {}
+    inject(carrier)
+    return carrier
+
+
+class SpanSteps:
+    """Consecutive child spans for a linear sequence of steps, without nesting the code."""
+
+    def __init__(self) -> None:
+        self._span: Span | None = None
+        self._token: object | None = None
+
+    def step(self, name: str, **attributes: Any) -> None:
+        self.close()
+        self._span = _tracer().start_span(name, attributes=attributes)
+        self._token = otel_context.attach(trace.set_span_in_context(self._span))
+
+    def close(self, exc: BaseException | None = None) -> None:
+        if self._span is None:
+            return
+        if exc is not None:
+            self._span.record_exception(exc)
+            self._span.set_status(Status(StatusCode.ERROR, str(exc)))
+        if self._token is not None:
+            otel_context.detach(self._token)
+        self._span.end()
+        self._span = None
+        self._token = None
+
+    def __enter__(self) -> SpanSteps:
+        return self
+
+    def __exit__(self, exc_type: Any, exc: BaseException | None, tb: Any) -> None:
+        self.close(exc)
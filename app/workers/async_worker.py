@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import contextvars
+import signal
+import threading
+import time
+from collections.abc import Coroutine, Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from redis.client import Pipeline
+from rq import Connection, Worker
+from rq.job import Job
+from rq.queue import Queue
+from rq.timeouts import TimerDeathPenalty
+
+from app.config import AppConfig, get_settings
+from app.services.downloader import DownloadResult, download_cancel, download_youtube
+from app.services.mapper import MappedMeta
+from app.services.orchestrator import StageRunner, stage_runner
+from app.services.scheduling import worker_queue_names
+from app.services.transcoder import maybe_transcode_async
+from app.services.uploader import upload_to_rutube_async
+from app.utils.logging import configure_logging, get_logger
+from app.utils.metrics import reset_multiproc_dir, start_exporter
+from app.utils.redis_pool import get_redis
+from app.utils.tracing import configure_tracing
+
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, Playwright
+
+
+logger = get_logger("async_worker")
+
+T = TypeVar("T")
+# Short enough that a stop request or a freed slot is noticed quickly.
+DEQUEUE_TIMEOUT_SECONDS = 5
+# Upper bound on waiting for a cancelled stage to clean up before the job removes its work dir.
+CANCEL_GRACE_SECONDS = 30
+
+
+class SharedBrowser:
+    """One Chromium per process; uploads get their own context. Relaunched if it crashed."""
+
+    def __init__(self) -> None:
+        self._lock = asyncio.Lock()
+        self._playwright: Playwright | None = None
+        self._browser: Browser | None = None
+
+    async def get(self) -> Browser:
+        async with self._lock:
+            if self._browser is None or not self._browser.is_connected():
+                if self._playwright is None:
+                    from playwright.async_api import async_playwright
+
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=True)
+                logger.info("async_worker_browser_launched")
+            return self._browser
+
+    async def close(self) -> None:
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+
+
+class LoopStageRunner(StageRunner):
+    """Called from a job's thread; runs each stage on the event loop under its semaphore."""
+
+    def __init__(
+        self, loop: asyncio.AbstractEventLoop, cfg: AppConfig, browser: SharedBrowser
+    ) -> None:
+        self._loop = loop
+        self._browser = browser
+        self._downloads = asyncio.Semaphore(cfg.async_worker_downloads)
+        self._transcodes = asyncio.Semaphore(cfg.async_worker_transcodes)
+        self._uploads = asyncio.Semaphore(cfg.async_worker_uploads)
+        self._download_pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=cfg.async_worker_downloads, thread_name_prefix="yt-dlp"
+        )
+
+    def _wait(self, coro: Coroutine[Any, Any, T]) -> T:
+        # run_coroutine_threadsafe() starts the task in this thread's context, so the job's
+        # span and log bindings carry over.
+        settled = threading.Event()
+        future = asyncio.run_coroutine_threadsafe(self._settle(coro, settled), self._loop)
+        try:
+            # Short waits keep the thread interruptible: RQ's timer-based job timeout is
+            # raised here only while Python code runs.
+            while not future.done():
+                concurrent.futures.wait([future], timeout=1)
+        except BaseException:
+            # Cancelled from the loop's thread, after the task has taken its first step, so
+            # its cleanup always runs: ffmpeg is killed, the browser context closed and
+            # yt-dlp stopped before the caller deletes the work dir.
+            self._loop.call_soon_threadsafe(future.cancel)
+            settled.wait(CANCEL_GRACE_SECONDS)
+            raise
+        return future.result()
+
+    @staticmethod
+    async def _settle(coro: Coroutine[Any, Any, T], settled: threading.Event) -> T:
+        try:
+            return await coro
+        finally:
+            settled.set()
+
+    async def _download(self, video_url: str, work_dir: Path) -> DownloadResult:
+        async with self._downloads:
+            cancelled = threading.Event()
+            context = contextvars.copy_context()
+            context.run(download_cancel.set, cancelled)
+            call = self._loop.run_in_executor(
+                self._download_pool, context.run, download_youtube, video_url, work_dir
+            )
+            try:
+                return await asyncio.shield(call)
+            except asyncio.CancelledError:
+                # The thread cannot be interrupted; it stops at yt-dlp's next progress
+                # callback and keeps its slot until it has.
+                cancelled.set()
+                await asyncio.gather(call, return_exceptions=True)
+                raise
+
+    async def _transcode(self, path_in: Path, work_dir: Path, enabled: bool) -> Path:
+        async with self._transcodes:
+            return await maybe_transcode_async(path_in, work_dir, enabled)
+
+    async def _upload(self, video_path: Path, meta: MappedMeta, cookies_path: Path) -> str:
+        async with self._uploads:
+            browser = await self._browser.get()
+            return await upload_to_rutube_async(browser, video_path, meta, cookies_path)
+
+    def download(self, video_url: str, work_dir: Path) -> DownloadResult:
+        return self._wait(self._download(video_url, work_dir))
+
+    def transcode(self, path_in: Path, work_dir: Path, enabled: bool) -> Path:
+        return self._wait(self._transcode(path_in, work_dir, enabled))
+
+    def upload(self, video_path: Path, meta: MappedMeta, cookies_path: Path) -> str:
+        return self._wait(self._upload(video_path, meta, cookies_path))
+
+    def close(self) -> None:
+        self._download_pool.shutdown(wait=False, cancel_futures=True)
+
+
+class AsyncWorker(Worker):
+    """Consumes the same queues as the forking worker but runs up to ASYNC_WORKER_MAX_JOBS
+    jobs in this process. Each job keeps RQ's own bookkeeping, retries and the synchronous
+    orchestration in a thread; only its heavy stages go through LoopStageRunner."""
+
+    # SIGALRM can only interrupt the main thread; jobs here run in a pool. RQ types the
+    # attribute as its default class rather than the common base.
+    death_penalty_class = TimerDeathPenalty  # type: ignore[assignment]
+
+    def __init__(self, queues: Sequence[str], cfg: AppConfig, **kwargs: Any) -> None:
+        super().__init__(queues, **kwargs)
+        self._cfg = cfg
+        self._max_jobs = cfg.async_worker_max_jobs
+        # RQ keeps one current job per worker; here each slot's job is tracked, and the
+        # worker hash reports the longest-running one.
+        self._running: dict[str, float] = {}
+        self._running_lock = threading.Lock()
+        self._slot = threading.local()
+
+    def perform_job(self, job: Job, queue: Queue) -> bool:
+        self._slot.job_id = job.id
+        try:
+            return super().perform_job(job, queue)
+        finally:
+            with self._running_lock:
+                self._running.pop(job.id, None)
+            self._slot.job_id = None
+
+    def set_current_job_id(
+        self, job_id: str | None = None, pipeline: Pipeline | None = None
+    ) -> None:
+        # RQ sets the id when a job starts and clears it when that job ends; clearing only
+        # drops this slot's job, so the other running jobs stay visible.
+        with self._running_lock:
+            if job_id is None:
+                self._running.pop(getattr(self._slot, "job_id", None) or "", None)
+            else:
+                self._running.setdefault(job_id, time.monotonic())
+            current = next(iter(self._running), None)
+        super().set_current_job_id(current, pipeline=pipeline)
+
+    def set_current_job_working_time(
+        self, current_job_working_time: float, pipeline: Pipeline | None = None
+    ) -> None:
+        # Always reported for the job named in current_job, not the slot that asked.
+        with self._running_lock:
+            started = next(iter(self._running.values()), None)
+        working_time = time.monotonic() - started if started is not None else 0
+        super().set_current_job_working_time(working_time, pipeline=pipeline)
+
+    def _next_job(self, burst: bool) -> tuple[Job, Queue] | None:
+        self.check_for_suspension(burst)
+        timeout = None if burst else DEQUEUE_TIMEOUT_SECONDS
+        return self.dequeue_job_and_maintain_ttl(timeout, max_idle_time=DEQUEUE_TIMEOUT_SECONDS)
+
+    async def _keep_alive(self, job: Job) -> None:
+        # The forking worker does this while it waits for the work-horse; without it the
+        # job looks abandoned to StartedJobRegistry cleanup after one interval.
+        while True:
+            await asyncio.sleep(self.job_monitoring_interval)
+            await asyncio.to_thread(self.maintain_heartbeats, job)
+            await asyncio.to_thread(self.set_current_job_working_time, 0)
+
+    async def _run_job(
+        self,
+        job: Job,
+        queue: Queue,
+        runner: LoopStageRunner,
+        pool: concurrent.futures.ThreadPoolExecutor,
+    ) -> None:
+        stage_runner.set(runner)
+        context = contextvars.copy_context()
+        keep_alive = asyncio.create_task(self._keep_alive(job))
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                pool, context.run, self.perform_job, job, queue
+            )
+        finally:
+            keep_alive.cancel()
+
+    def _request_stop(self) -> None:
+        if not self._stop_requested:
+            logger.info("async_worker_stop_requested")
+        self._stop_requested = True
+
+    async def _serve(self, burst: bool) -> None:
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self._request_stop)
+        browser = SharedBrowser()
+        runner = LoopStageRunner(loop, self._cfg, browser)
+        pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self._max_jobs, thread_name_prefix="publish"
+        )
+        slots = asyncio.Semaphore(self._max_jobs)
+        inflight: set[asyncio.Task[None]] = set()
+        try:
+            while not self._stop_requested:
+                await slots.acquire()
+                if self._stop_requested:
+                    slots.release()
+                    break
+                result = await asyncio.to_thread(self._next_job, burst)
+                if result is None:
+                    slots.release()
+                    if burst:
+                        break
+                    continue
+                job, queue = result
+                task = asyncio.create_task(self._run_job(job, queue, runner, pool))
+                inflight.add(task)
+                task.add_done_callback(inflight.discard)
+                task.add_done_callback(lambda _: slots.release())
+            # Warm shutdown: jobs already taken finish; the rest stay in the queue.
+            logger.info("async_worker_draining", inflight=len(inflight))
+            await asyncio.gather(*inflight, return_exceptions=True)
+        finally:
+            await browser.close()
+            runner.close()
+            pool.shutdown(wait=False)
+
+    def work_concurrently(self, burst: bool = False, with_scheduler: bool = False) -> None:
+        self.bootstrap()
+        if with_scheduler:
+            self._start_scheduler(burst)
+        try:
+            asyncio.run(self._serve(burst))
+        finally:
+            self.teardown()
+
+
+def run() -> None:
+    settings = get_settings()
+    configure_logging(**settings.logging_options)
+    redis_conn = get_redis()
+    reset_multiproc_dir()
+    start_exporter(settings.metrics_port)
+    configure_tracing("worker")
+
+    with Connection(redis_conn):
+        queues = worker_queue_names()
+        worker = AsyncWorker(queues, settings, disable_default_exception_handler=False)
+        logger.info(
+            "async_worker_start",
+            queues=queues,
+            max_jobs=settings.async_worker_max_jobs,
+            downloads=settings.async_worker_downloads,
+            transcodes=settings.async_worker_transcodes,
+            uploads=settings.async_worker_uploads,
+        )
+        worker.work_concurrently(with_scheduler=True)
+
+
+if __name__ == "__main__":
+    run()
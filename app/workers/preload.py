@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import gc
+import importlib
+import time
+
+from app.utils.logging import get_logger
+
+
+logger = get_logger("worker_preload")
+
+# Any URL the YouTube extractor accepts: matching it walks every extractor's _VALID_URL.
+_WARMUP_URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+# What a publish job touches; RQ imports the job function by name in each work-horse.
+JOB_MODULES = (
+    "app.services.orchestrator",
+    "app.services.metadata_sync",
+    "app.db.models",
+    "yt_dlp",
+    "yt_dlp.utils",
+    "playwright.sync_api",
+)
+
+
+def _warm_extractors() -> int:
+    from yt_dlp.extractor import gen_extractor_classes
+
+    # suitable() compiles and caches each extractor's URL regex on the class; without this
+    # every forked job pays for ~1800 re.compile calls on its first extract_info().
+    classes = gen_extractor_classes()
+    for extractor in classes:
+        extractor.suitable(_WARMUP_URL)
+    return len(classes)
+
+
+def _configure_mappers() -> None:
+    from sqlalchemy.orm import configure_mappers
+
+    # Mappers only: engines and pools are created lazily in the child, since a connection
+    # opened before fork would be shared by every work-horse.
+    configure_mappers()
+
+
+def _load_config() -> None:
+    from app.config import get_retry_policy, get_settings, get_stage_retry_policies
+
+    get_settings()
+    get_retry_policy()
+    get_stage_retry_policies()
+
+
+def preload_job_modules() -> dict[str, float]:
+    timings: dict[str, float] = {}
+    started = time.perf_counter()
+    for name in JOB_MODULES:
+        step = time.perf_counter()
+        importlib.import_module(name)
+        timings[f"import:{name}"] = round(time.perf_counter() - step, 4)
+    for name, warm in (
+        ("extractors", _warm_extractors),
+        ("mappers", _configure_mappers),
+        ("config", _load_config),
+    ):
+        step = time.perf_counter()
+        warm()
+        timings[name] = round(time.perf_counter() - step, 4)
+    # Move everything loaded so far out of the collector's reach: a full collection in the
+    # child would otherwise touch (and copy-on-write) every page inherited from the parent.
+    gc.freeze()
+    timings["total"] = round(time.perf_counter() - started, 4)
+    logger.info("worker_preloaded", **timings)
+    return timings
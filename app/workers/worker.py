@@ -1,22 +1,42 @@
 from __future__ import annotations
 
-from redis import Redis
+from typing import Any
+
 from rq import Connection, Worker
 
 from app.config import get_settings
-from app.services.orchestrator import FAILED_QUEUE_NAME, PUBLISH_QUEUE_NAME
-from app.utils.logging import configure_logging, get_logger
+from app.services.scheduling import worker_queue_names
+from app.utils.logging import configure_logging, flush_logs, get_logger
+from app.utils.metrics import reset_multiproc_dir, start_exporter
+from app.utils.redis_pool import get_redis
+from app.utils.tracing import configure_tracing
+from app.workers.preload import preload_job_modules
+
+
+class FlushingWorker(Worker):
+    # perform_job runs in the forked work-horse, which leaves through os._exit: whatever is
+    # still in the log queue would be lost with it (spans are flushed by publish_video).
+    def perform_job(self, *args: Any, **kwargs: Any) -> bool:
+        try:
+            return super().perform_job(*args, **kwargs)
+        finally:
+            flush_logs()
 
 
 def run() -> None:
     settings = get_settings()
-    configure_logging(settings.log_level)
+    configure_logging(**settings.logging_options)
     logger = get_logger("worker")
-    redis_conn = Redis.from_url(settings.redis_url)
+    redis_conn = get_redis()
+    reset_multiproc_dir()
+    start_exporter(settings.metrics_port)
+    configure_tracing("worker")
+    if settings.worker_preload:
+        preload_job_modules()
 
     with Connection(redis_conn):
-        queues = [PUBLISH_QUEUE_NAME, FAILED_QUEUE_NAME]
-        worker = Worker(queues, disable_default_exception_handler=False)
+        queues = worker_queue_names()
+        worker = FlushingWorker(queues, disable_default_exception_handler=False)
         logger.info("worker_start", queues=queues)
         worker.work(with_scheduler=True)
 
@@ -0,0 +1,404 @@
+"""Offline end-to-end throughput of the real `publish_video`, at several concurrency levels.
+
+    python -m benchmarks.e2e_pipeline --levels 1 2 4 --jobs 8 --media-seconds 30
+    python -m benchmarks.e2e_pipeline --compare benchmarks/results/baseline.json
+
+Nothing leaves the machine: a local HTTP server serves an ffmpeg-generated clip as a
+direct media link (yt-dlp's generic extractor downloads it) and a static stand-in for the
+RuTube Studio upload page that Playwright fills in; the page POSTs the file back to the
+same server and then shows a rutube.ru/video link. Redis is fakeredis, the database a
+temporary SQLite file. Needs ffmpeg and `playwright install chromium`, like the worker.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+import fakeredis
+from sqlalchemy import select
+
+
+RESULTS_DIR = Path(__file__).with_name("results")
+_CHUNK = 256 * 1024
+
+STUDIO_PAGE = """<!doctype html>
+<html lang="ru"><head><meta charset="utf-8"><title>Studio stand-in</title></head>
+<body>
+<input type="file" id="video">
+<textarea name="title" placeholder="Название"></textarea>
+<textarea name="description" placeholder="Описание"></textarea>
+<input name="tags" placeholder="Теги">
+<label><input type="radio" name="visibility" value="public">Открытый доступ</label>
+<label><input type="radio" name="visibility" value="unlisted">Доступ по ссылке</label>
+<label><input type="radio" name="visibility" value="private">Частный доступ</label>
+<div id="result"></div>
+<script>
+document.getElementById("video").addEventListener("change", async (event) => {
+  const response = await fetch("/upload", {method: "POST", body: event.target.files[0]});
+  const {id} = await response.json();
+  setTimeout(() => {
+    const link = document.createElement("a");
+    link.href = "https://rutube.ru/video/" + id + "/";
+    link.textContent = "published";
+    document.getElementById("result").appendChild(link);
+  }, PROCESSING_MS);
+});
+</script>
+</body></html>
+"""
+
+
+def _generate_media(path: Path, seconds: int, resolution: str) -> None:
+    subprocess.run(
+        [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"testsrc2=size={resolution}:rate=30",
+            "-f", "lavfi", "-i", "sine=frequency=440",
+            "-t", str(seconds),
+            "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+            "-c:a", "aac", "-shortest",
+            str(path),
+        ],
+        check=True,
+    )
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    media_path: Path
+    studio_page: bytes
+    bytes_per_second: int = 0
+    uploaded_bytes = 0
+    _lock = threading.Lock()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _media_headers(self) -> bool:
+        if not re.fullmatch(r"/media/[A-Za-z0-9_-]+\.mp4", self.path):
+            self._send(404, b"not found", "text/plain")
+            return False
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(self.media_path.stat().st_size))
+        self.end_headers()
+        return True
+
+    def do_HEAD(self) -> None:
+        self._media_headers()
+
+    def do_GET(self) -> None:
+        if self.path.startswith("/video/upload"):
+            self._send(200, self.studio_page, "text/html; charset=utf-8")
+            return
+        if not self._media_headers():
+            return
+        started = time.monotonic()
+        sent = 0
+        with self.media_path.open("rb") as fh:
+            while chunk := fh.read(_CHUNK):
+                try:
+                    self.wfile.write(chunk)
+                except (BrokenPipeError, ConnectionResetError):
+                    # yt-dlp probes direct links and hangs up after the headers.
+                    return
+                sent += len(chunk)
+                if self.bytes_per_second:
+                    ahead = sent / self.bytes_per_second - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+
+    def do_POST(self) -> None:
+        remaining = int(self.headers.get("Content-Length") or 0)
+        while remaining:
+            chunk = self.rfile.read(min(_CHUNK, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            with self._lock:
+                type(self).uploaded_bytes += len(chunk)
+        self._send(200, json.dumps({"id": uuid.uuid4().hex}).encode(), "application/json")
+
+
+def _start_stand_ins(
+    media_path: Path, processing_ms: int, bytes_per_second: int
+) -> tuple[ThreadingHTTPServer, str]:
+    page = STUDIO_PAGE.replace("PROCESSING_MS", str(processing_ms)).encode()
+    handler = type(
+        "Handler",
+        (_StandInHandler,),
+        {"media_path": media_path, "studio_page": page, "bytes_per_second": bytes_per_second},
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, name="stand-ins", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _configure(tmp: Path, transcode: bool) -> None:
+    storage_state = tmp / "auth" / "bench.json"
+    storage_state.parent.mkdir(parents=True, exist_ok=True)
+    storage_state.write_text(json.dumps({"cookies": [], "origins": []}), encoding="utf-8")
+    os.environ.update(
+        {
+            "YOUTUBE_CHANNEL_ID": os.environ.get("YOUTUBE_CHANNEL_ID", "UCbenchmark"),
+            "WEB_SUB_CALLBACK_BASE": os.environ.get(
+                "WEB_SUB_CALLBACK_BASE", "http://127.0.0.1"
+            ),
+            "WEB_SUB_SECRET": os.environ.get("WEB_SUB_SECRET", "benchmark"),
+            "WORK_DIR": str(tmp / "work"),
+            "DATABASE_PATH": str(tmp / "bench.db"),
+            "COOKIES_PATH": str(storage_state),
+            "ENABLE_TRANSCODE": "true" if transcode else "false",
+            "WORK_DIR_GC_INTERVAL_SECONDS": "0",
+            "PUBLISHED_INDEX_ENABLED": "false",
+        }
+    )
+    os.environ.pop("DATABASE_URL", None)
+
+
+def _percentile(values: list[float], fraction: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(int(fraction * len(ordered)), len(ordered) - 1)], 3)
+
+
+def _stage_latencies(video_ids: list[str]) -> dict[str, dict[str, float | None]]:
+    from app.db.base import session_scope
+    from app.db.models import PublishJob
+    from app.services.job_tracking import TRACKED_STAGES
+
+    with session_scope() as session:
+        rows = session.execute(
+            select(PublishJob).where(PublishJob.video_id.in_(video_ids))
+        ).scalars().all()
+        durations: dict[str, list[float]] = {stage: [] for stage in TRACKED_STAGES}
+        for row in rows:
+            for stage in TRACKED_STAGES:
+                started = getattr(row, f"{stage}_started_at")
+                finished = getattr(row, f"{stage}_finished_at")
+                if started and finished:
+                    durations[stage].append((finished - started).total_seconds())
+    return {
+        stage: {"p50": _percentile(values, 0.5), "p95": _percentile(values, 0.95)}
+        for stage, values in durations.items()
+    }
+
+
+def _run_threads(video_ids: list[str], level: int) -> tuple[list[float], dict[str, int]]:
+    from app.services import orchestrator
+
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+
+    def publish(video_id: str) -> None:
+        started = time.perf_counter()
+        try:
+            orchestrator.publish_video(video_id)
+        except Exception as exc:  # noqa: BLE001
+            errors[type(exc).__name__] = errors.get(type(exc).__name__, 0) + 1
+            return
+        latencies.append(time.perf_counter() - started)
+
+    with ThreadPoolExecutor(max_workers=level, thread_name_prefix="publish") as pool:
+        list(pool.map(publish, video_ids))
+    return latencies, errors
+
+
+def _run_async_worker(
+    video_ids: list[str], level: int, redis_conn: fakeredis.FakeRedis
+) -> tuple[list[float], dict[str, int]]:
+    from rq import Queue
+    from rq.job import Job, JobStatus
+
+    from app.config import get_settings
+    from app.services.orchestrator import publish_video
+    from app.workers.async_worker import AsyncWorker
+
+    queue = Queue("publish", connection=redis_conn)
+    # Results are kept (unlike real publish jobs) so start and end times can be read back.
+    job_ids = [
+        queue.enqueue(publish_video, video_id, result_ttl=600).id for video_id in video_ids
+    ]
+    cfg = get_settings().model_copy(
+        update={
+            "async_worker_max_jobs": level,
+            "async_worker_downloads": level,
+            "async_worker_uploads": level,
+        }
+    )
+    AsyncWorker([queue], cfg, connection=redis_conn).work_concurrently(burst=True)
+
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+    for job in Job.fetch_many(job_ids, connection=redis_conn):
+        if job is not None and job.get_status() == JobStatus.FINISHED:
+            latencies.append((job.ended_at - job.started_at).total_seconds())
+            continue
+        # exc_info is the formatted traceback; its last line starts with the exception name.
+        last_line = (job.exc_info if job else None) or "missing"
+        name = last_line.strip().splitlines()[-1].split(":")[0]
+        errors[name] = errors.get(name, 0) + 1
+    return latencies, errors
+
+
+def run_level(
+    level: int, jobs: int, redis_conn: fakeredis.FakeRedis, runtime: str = "threads"
+) -> dict[str, Any]:
+    from app.config import get_settings
+    from app.services.session_check import SESSION_VALID, _cache_key
+
+    redis_conn.flushall()
+    for account in get_settings().accounts:
+        redis_conn.set(_cache_key(account.cookies_path), SESSION_VALID)
+
+    video_ids = [f"b{level:02d}{index:08d}" for index in range(jobs)]
+    started = time.perf_counter()
+    if runtime == "async":
+        latencies, errors = _run_async_worker(video_ids, level, redis_conn)
+    else:
+        latencies, errors = _run_threads(video_ids, level)
+    wall = time.perf_counter() - started
+
+    return {
+        "runtime": runtime,
+        "concurrency": level,
+        "jobs": jobs,
+        "succeeded": len(latencies),
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "jobs_per_hour": round(len(latencies) / wall * 3600, 1) if wall else 0.0,
+        "end_to_end": {"p50": _percentile(latencies, 0.5), "p95": _percentile(latencies, 0.95)},
+        "stages": _stage_latencies(video_ids),
+    }
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory() as raw_tmp:
+        tmp = Path(raw_tmp)
+        _configure(tmp, args.transcode)
+
+        from app.config import get_settings
+        from app.db.base import init_db
+        from app.services import orchestrator, uploader
+        from app.utils import redis_pool
+        from app.utils.logging import configure_logging
+
+        get_settings.cache_clear()
+        configure_logging(args.log_level)
+        init_db()
+        redis_conn = fakeredis.FakeRedis()
+        redis_pool._client = redis_conn
+
+        media_path = tmp / "source.mp4"
+        _generate_media(media_path, args.media_seconds, args.resolution)
+        media_bytes = media_path.stat().st_size
+        server, origin = _start_stand_ins(
+            media_path, args.processing_ms, int(args.download_mbps * 125_000)
+        )
+        orchestrator.YOUTUBE_WATCH_URL = f"{origin}/media/{{video_id}}.mp4"
+        uploader.UPLOAD_URL = f"{origin}/video/upload"
+        uploader.STUDIO_ORIGIN = origin
+        try:
+            levels = [
+                run_level(level, args.jobs, redis_conn, args.runtime) for level in args.levels
+            ]
+        finally:
+            server.shutdown()
+
+    return {
+        "benchmark": "e2e_pipeline",
+        "created_at": datetime.now(UTC).isoformat(),
+        "params": {
+            "jobs": args.jobs,
+            "media_seconds": args.media_seconds,
+            "media_bytes": media_bytes,
+            "resolution": args.resolution,
+            "transcode": args.transcode,
+            "runtime": args.runtime,
+            "processing_ms": args.processing_ms,
+            "download_mbps": args.download_mbps,
+        },
+        "levels": levels,
+    }
+
+
+def compare(report: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    previous = {item["concurrency"]: item for item in baseline.get("levels", [])}
+    regressions = []
+    for item in report["levels"]:
+        before = previous.get(item["concurrency"])
+        if not before or not before["jobs_per_hour"]:
+            continue
+        floor = before["jobs_per_hour"] * (1 - tolerance)
+        if item["jobs_per_hour"] < floor:
+            regressions.append(
+                f"concurrency {item['concurrency']}: {item['jobs_per_hour']} jobs/h "
+                f"< {floor:.1f} (baseline {before['jobs_per_hour']})"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--jobs", type=int, default=8, help="jobs per concurrency level")
+    parser.add_argument("--media-seconds", type=int, default=30)
+    parser.add_argument("--resolution", default="1280x720")
+    parser.add_argument("--transcode", action="store_true")
+    parser.add_argument(
+        "--runtime",
+        choices=["threads", "async"],
+        default="threads",
+        help="threads: publish_video per thread, each upload with its own browser; "
+        "async: queued jobs drained by the asyncio worker (app.workers.async_worker)",
+    )
+    parser.add_argument(
+        "--processing-ms", type=int, default=2000, help="stand-in RuTube processing delay"
+    )
+    parser.add_argument(
+        "--download-mbps", type=float, default=0.0, help="cap per download, 0 = unlimited"
+    )
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--out", type=Path, default=RESULTS_DIR)
+    parser.add_argument("--compare", type=Path, help="baseline report to check against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    report = run(args)
+    args.out.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S")
+    path = args.out / f"e2e_pipeline-{stamp}.json"
+    path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(json.dumps(report, indent=2))
+    print(f"saved {path}")
+
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text()), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
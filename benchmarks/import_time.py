@@ -0,0 +1,171 @@
+"""Import cost of the process entry points and job start-up in a forked work-horse.
+
+    python -m benchmarks.import_time --runs 5
+    python -m benchmarks.import_time --entry api --top 30
+
+Each entry point is imported in a fresh interpreter (`-X importtime`): the report gives the
+median wall time, the slowest top-level packages and which heavy packages got loaded at all.
+`fork` measures what RQ's work-horse does before a job runs (import the job function by
+name, match the video URL against yt-dlp's extractors) in a child forked from a plain
+parent and from one that ran `preload_job_modules()`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from typing import Any
+
+
+ENTRY_POINTS = {
+    "api": "app.main",
+    "worker": "app.workers.worker",
+    "poller": "app.services.rss",
+}
+HEAVY_MODULES = (
+    "yt_dlp",
+    "playwright",
+    "sqlalchemy",
+    "fastapi",
+    "rq",
+    "psutil",
+    "opentelemetry",
+    "prometheus_client",
+)
+
+_IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+heavy = {heavy!r}
+print(json.dumps({{
+    "seconds": elapsed,
+    "loaded": [name for name in heavy if name in sys.modules],
+    "modules": len(sys.modules),
+}}))
+"""
+
+_FORK_PROBE = """
+import json, os, time
+preload = {preload!r}
+if preload:
+    from app.workers.preload import preload_job_modules
+    preload_job_modules()
+import rq.utils
+samples = []
+for _ in range({runs}):
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        started = time.perf_counter()
+        rq.utils.import_attribute("app.services.orchestrator.publish_video")
+        from yt_dlp.extractor import gen_extractor_classes
+        [ie for ie in gen_extractor_classes() if ie.suitable("{url}")]
+        os.write(write_end, str(time.perf_counter() - started).encode())
+        os._exit(0)
+    os.close(write_end)
+    samples.append(float(os.read(read_end, 64)))
+    os.close(read_end)
+    os.waitpid(pid, 0)
+print(json.dumps(samples))
+"""
+
+
+def _env(work_dir: str) -> dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("YOUTUBE_CHANNEL_ID", "UCimporttime0000000000")
+    env.setdefault("WEB_SUB_CALLBACK_BASE", "http://127.0.0.1")
+    env.setdefault("WEB_SUB_SECRET", "import-time")
+    env["WORK_DIR"] = work_dir
+    env["DATABASE_PATH"] = os.path.join(work_dir, "import.db")
+    env["LOG_LEVEL"] = "WARNING"
+    return env
+
+
+def _run(code: str, env: dict[str, str], importtime: bool = False) -> tuple[str, str]:
+    flags = ["-X", "importtime"] if importtime else []
+    result = subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout, result.stderr
+
+
+def _top_packages(importtime_log: str, top: int) -> list[dict[str, Any]]:
+    # Lines look like "import time:  self [us] | cumulative | imported package". Self time
+    # summed per top-level package shows who pays, whichever app module pulled it in.
+    totals: dict[str, int] = defaultdict(int)
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        own, _, name = line.removeprefix("import time:").split("|", 2)
+        totals[name.strip().split(".")[0]] += int(own)
+    ordered = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{"package": name, "ms": round(us / 1000, 1)} for name, us in ordered]
+
+
+def measure_entry(module: str, runs: int, top: int, env: dict[str, str]) -> dict[str, Any]:
+    code = _IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)
+    samples = []
+    probe: dict[str, Any] = {}
+    for _ in range(runs):
+        stdout, _ = _run(code, env)
+        probe = json.loads(stdout.splitlines()[-1])
+        samples.append(probe["seconds"])
+    _, log = _run(code, env, importtime=True)
+    return {
+        "module": module,
+        "median_ms": round(statistics.median(samples) * 1000, 1),
+        "modules_loaded": probe["modules"],
+        "heavy_loaded": probe["loaded"],
+        "top_packages": _top_packages(log, top),
+    }
+
+
+def measure_fork(runs: int, env: dict[str, str]) -> dict[str, Any]:
+    report = {}
+    for preload in (False, True):
+        code = _FORK_PROBE.format(
+            preload=preload, runs=runs, url="https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+        )
+        stdout, _ = _run(code, env)
+        samples = json.loads(stdout.splitlines()[-1])
+        report["preloaded" if preload else "plain"] = {
+            "median_ms": round(statistics.median(samples) * 1000, 2),
+            "max_ms": round(max(samples) * 1000, 2),
+        }
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entry", choices=sorted(ENTRY_POINTS), action="append")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument("--skip-fork", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        env = _env(work_dir)
+        report: dict[str, Any] = {
+            name: measure_entry(ENTRY_POINTS[name], args.runs, args.top, env)
+            for name in args.entry or ENTRY_POINTS
+        }
+        if not args.skip_fork and hasattr(os, "fork"):
+            report["fork_job_start"] = measure_fork(args.runs, env)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
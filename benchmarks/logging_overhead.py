@@ -0,0 +1,107 @@
+"""Per-event cost of a structlog call on the emitting thread, old pipeline vs new.
+
+    python -m benchmarks.logging_overhead --events 50000
+
+`stdlib` is the previous setup (json.dumps + logging.StreamHandler, write under the handler
+lock); `queue` is the orjson + background-writer pipeline; `sampled_out` is a chatty event
+dropped by the sampler. Output goes to /dev/null so the disk does not dominate.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import time
+from collections.abc import Callable
+from typing import Any
+
+import structlog
+
+from app.utils.logging import LogPipeline, QueueLoggerFactory, build_processors
+
+
+def _stdlib_logger(devnull: Any) -> Any:
+    handler = logging.StreamHandler(devnull)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    std_logger = logging.getLogger("bench.stdlib")
+    std_logger.handlers = [handler]
+    std_logger.propagate = False
+    std_logger.setLevel(logging.INFO)
+    return structlog.wrap_logger(
+        std_logger,
+        processors=[
+            structlog.contextvars.merge_contextvars,
+            structlog.processors.EventRenamer("message"),
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.processors.add_log_level,
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.UnicodeDecoder(),
+            structlog.processors.dict_tracebacks,
+            structlog.processors.JSONRenderer(),
+        ],
+        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+    )
+
+
+def _queue_logger(pipeline: LogPipeline) -> Any:
+    return structlog.wrap_logger(
+        QueueLoggerFactory(pipeline)(),
+        processors=build_processors(),
+        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+    )
+
+
+def _ns_per_event(emit: Callable[[int], None], events: int) -> float:
+    started = time.perf_counter_ns()
+    for index in range(events):
+        emit(index)
+    return (time.perf_counter_ns() - started) / events
+
+
+def _measure(bound: Any, events: int, stderr_tail: str) -> dict[str, int]:
+    return {
+        "small_ns": round(
+            _ns_per_event(
+                lambda i: bound.info("publish_stage", video_id="abc", attempt=i), events
+            )
+        ),
+        "large_ns": round(
+            _ns_per_event(
+                lambda i: bound.error("transcode_failed", stderr=stderr_tail), events // 10
+            )
+        ),
+    }
+
+
+def run(events: int) -> dict[str, Any]:
+    stderr_tail = "frame=  120 fps= 30 q=28.0 size=    1024kB time=00:00:04.00 " * 200
+    with open(os.devnull, "w") as devnull, open(os.devnull, "wb") as devnull_bytes:
+        pipeline = LogPipeline(devnull_bytes, max_size=events + 1)
+        pipeline.start()
+        loggers = {"stdlib": _stdlib_logger(devnull), "queue": _queue_logger(pipeline)}
+        report: dict[str, Any] = {"events": events}
+        for name, bound in loggers.items():
+            report[name] = _measure(bound, events, stderr_tail)
+            pipeline.flush(timeout=30)
+        report["queue"]["sampled_out_ns"] = round(
+            _ns_per_event(
+                lambda i: loggers["queue"].info("download_progress", downloaded_bytes=i), events
+            )
+        )
+        report["queue"]["dropped"] = pipeline.dropped
+        pipeline.close(timeout=30)
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=50_000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.events), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
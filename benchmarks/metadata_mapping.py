@@ -0,0 +1,157 @@
+"""Metadata mapping over a generated corpus: per-video `map_metadata` vs `map_metadata_many`.
+
+    python -m benchmarks.metadata_mapping --videos 10000
+
+The corpus mixes ASCII, Cyrillic and emoji titles, descriptions of 0..5000 characters with
+control and zero-width characters, and up to 40 tags. `legacy_sanitize` is the previous
+two-regex `_sanitize_text` over the same strings; `per_video` is the worker path (description
+read from a file, one log line per video); `batch_cold` and `batch_warm` are
+`map_metadata_many` with an empty and a filled cache. Logs go to /dev/null at INFO.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import re
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+
+_LEGACY_CONTROL = re.compile(r"[\u0000-\u001F\u007F]")
+_LEGACY_INVISIBLE = re.compile(
+    "[\u200B\u200C\u200D\u200E\u200F\u202A-\u202E\u2060\uFE0F\uFEFF\U000E0000-\U000E0FFF]"
+)
+_WORDS = {
+    "ascii": "video stream update review guide music live news tutorial episode".split(),
+    "cyrillic": "видео обзор стрим новости музыка выпуск урок игра канал".split(),
+}
+_NOISE = ["\r\n", "\u200B", "\uFEFF", "\x07", "\t", " 🎉", " 🔥", "\u200D"]
+# Synthetic corpus mix: noise per word, Cyrillic videos, noisy videos.
+_NOISE_RATE = 0.05
+_CYRILLIC_SHARE = 0.4
+_NOISY_SHARE = 0.5
+
+
+def _text(rng: random.Random, words: list[str], count: int, noisy: bool) -> str:
+    parts = []
+    for _ in range(count):
+        parts.append(rng.choice(words))
+        if noisy and rng.random() < _NOISE_RATE:
+            parts.append(rng.choice(_NOISE))
+    return " ".join(parts)
+
+
+def generate_corpus(videos: int, seed: int = 7) -> list[dict[str, Any]]:
+    rng = random.Random(seed)
+    corpus = []
+    for index in range(videos):
+        words = _WORDS["cyrillic" if rng.random() < _CYRILLIC_SHARE else "ascii"]
+        noisy = rng.random() < _NOISY_SHARE
+        corpus.append(
+            {
+                "id": f"c{index:010d}",
+                "title": _text(rng, words, rng.randint(3, 15), noisy),
+                "description": _text(rng, words, rng.randint(0, 700), noisy),
+                "tags": [_text(rng, words, rng.randint(1, 3), noisy) for _ in range(40)][
+                    : rng.randint(0, 40)
+                ],
+            }
+        )
+    return corpus
+
+
+def legacy_sanitize(value: str) -> str:
+    cleaned = _LEGACY_CONTROL.sub("", value)
+    cleaned = _LEGACY_INVISIBLE.sub("", cleaned)
+    cleaned = cleaned.replace("\r\n", "\n").replace("\r", "\n")
+    return cleaned.strip()
+
+
+def _timed(call: Callable[[], Any], videos: int) -> dict[str, float]:
+    started = time.perf_counter()
+    call()
+    elapsed = time.perf_counter() - started
+    return {
+        "seconds": round(elapsed, 4),
+        "videos_per_second": round(videos / elapsed, 1),
+        "us_per_video": round(elapsed / videos * 1e6, 2),
+    }
+
+
+def run(videos: int) -> dict[str, Any]:
+    os.environ.setdefault("YOUTUBE_CHANNEL_ID", "UCbenchmark")
+    os.environ.setdefault("WEB_SUB_CALLBACK_BASE", "http://127.0.0.1")
+    os.environ.setdefault("WEB_SUB_SECRET", "benchmark")
+
+    from app.config import get_settings
+    from app.services.mapper import (
+        MetadataCache,
+        _sanitize_text,
+        map_metadata,
+        map_metadata_many,
+    )
+    from app.utils.logging import configure_logging, flush_logs
+
+    devnull = open(os.devnull, "wb")
+    configure_logging("INFO", stream=devnull)
+    cfg = get_settings()
+    corpus = generate_corpus(videos)
+    strings = [
+        value
+        for info in corpus
+        for value in (info["title"], info["description"], *info["tags"])
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        desc_paths = []
+        for info in corpus:
+            path = Path(tmp) / f"{info['id']}.description"
+            path.write_text(info["description"], encoding="utf-8", newline="")
+            desc_paths.append(path)
+
+        cache = MetadataCache(max_entries=videos)
+        batch: dict[str, Any] = {}
+        report = {
+            "videos": videos,
+            "strings": len(strings),
+            "legacy_sanitize": _timed(lambda: [legacy_sanitize(s) for s in strings], videos),
+            "sanitize": _timed(lambda: [_sanitize_text(s) for s in strings], videos),
+            "per_video": _timed(
+                lambda: [
+                    map_metadata(info, path, None, cfg)
+                    for info, path in zip(corpus, desc_paths, strict=True)
+                ],
+                videos,
+            ),
+            "batch_cold": _timed(
+                lambda: batch.update(map_metadata_many(corpus, cfg, cache=cache)), videos
+            ),
+            "batch_warm": _timed(lambda: map_metadata_many(corpus, cfg, cache=cache), videos),
+        }
+        mismatches = sum(
+            batch[info["id"]] != map_metadata(info, path, None, cfg)
+            for info, path in zip(corpus, desc_paths, strict=True)
+        )
+    flush_logs()
+    report["mismatches"] = mismatches
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--videos", type=int, default=10_000)
+    args = parser.parse_args()
+
+    report = run(args.videos)
+    print(json.dumps(report, indent=2))
+    return 1 if report["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,111 @@
+"""Concurrent writers + API readers against one SQLite file, with and without tuning.
+
+    python -m benchmarks.sqlite_concurrency --writers 4 --readers 4 --seconds 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db import repo
+from app.db.base import build_engine, init_db
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def _worker(role: str, database_url: str, tuned: bool, seconds: float, out: Any) -> None:
+    engine = build_engine(database_url, tuned=tuned)
+    factory = sessionmaker(bind=engine, class_=Session, expire_on_commit=False)
+    ok = locked = 0
+    latencies: list[float] = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        session = factory()
+        try:
+            if role == "writer":
+                video_id = uuid.uuid4().hex[:11]
+                repo.mark_published(session, video_id, f"https://rutube.ru/video/{video_id}/")
+            else:
+                repo.get_recent(session, limit=50)
+                repo.is_published(session, uuid.uuid4().hex[:11])
+            session.commit()
+            ok += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+        except OperationalError as exc:
+            session.rollback()
+            if "locked" not in str(exc):
+                raise
+            locked += 1
+        finally:
+            session.close()
+    engine.dispose()
+    out.put({"role": role, "ok": ok, "locked": locked, "latencies": latencies})
+
+
+def run(writers: int, readers: int, seconds: float, tuned: bool) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        setup_engine = build_engine(database_url, tuned=tuned)
+        init_db(setup_engine)
+        setup_engine.dispose()
+
+        ctx = mp.get_context("spawn")
+        out = ctx.Queue()
+        roles = ["writer"] * writers + ["reader"] * readers
+        procs = [
+            ctx.Process(target=_worker, args=(role, database_url, tuned, seconds, out))
+            for role in roles
+        ]
+        for proc in procs:
+            proc.start()
+        results = [out.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+
+    summary: dict[str, Any] = {"tuned": tuned, "writers": writers, "readers": readers}
+    for role in ("writer", "reader"):
+        role_results = [item for item in results if item["role"] == role]
+        latencies = [value for item in role_results for value in item["latencies"]]
+        summary[role] = {
+            "ops_per_second": round(sum(item["ok"] for item in role_results) / seconds, 1),
+            "locked_errors": sum(item["locked"] for item in role_results),
+            "p50_ms": round(_percentile(latencies, 0.5), 2),
+            "p99_ms": round(_percentile(latencies, 0.99), 2),
+        }
+    return summary
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--only-tuned", action="store_true")
+    args = parser.parse_args()
+
+    modes = [True] if args.only_tuned else [False, True]
+    reports = [run(args.writers, args.readers, args.seconds, tuned) for tuned in modes]
+    print(json.dumps(reports, indent=2))
+    tuned_report = reports[-1]
+    locked = tuned_report["writer"]["locked_errors"] + tuned_report["reader"]["locked_errors"]
+    return 1 if locked else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
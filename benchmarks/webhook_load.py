@@ -0,0 +1,264 @@
+"""Load test of the WebSub webhook and `/api/published`, in-process through ASGI.
+
+    python -m benchmarks.webhook_load --requests 2000 --concurrency 32
+    python -m benchmarks.webhook_load --budgets benchmarks/webhook_budgets.json
+
+Signed Atom notifications with 1..N entries go through the full app (middlewares, HMAC
+check, XML parsing, dedupe, published-index lookup, RQ enqueue on fakeredis); reads hit
+a temporary SQLite seeded with published rows. `_verify_signature` and
+`_extract_video_ids` are also timed on their own per payload size. Exits 1 when a budget
+(p95_ms / min_rps per scenario, max_us per micro-benchmark) is exceeded.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+
+SECRET = "load-test-secret"
+# Loose enough for a laptop or a shared CI runner; they catch step changes, not noise.
+DEFAULT_BUDGETS: dict[str, dict[str, float]] = {
+    "webhook_1": {"p95_ms": 500, "min_rps": 100},
+    "webhook_10": {"p95_ms": 1500, "min_rps": 20},
+    "webhook_100": {"p95_ms": 6000, "min_rps": 4},
+    "published": {"p95_ms": 1000, "min_rps": 50},
+    "verify_signature_1000": {"max_us": 2000},
+    "extract_video_ids_1000": {"max_us": 100_000},
+}
+
+_ENTRY = """<entry>
+<id>yt:video:{video_id}</id>
+<yt:videoId>{video_id}</yt:videoId>
+<yt:channelId>UCloadtest000000000000</yt:channelId>
+<title>Load test video {video_id}</title>
+<link rel="alternate" href="https://www.youtube.com/watch?v={video_id}"/>
+<author><name>Load test</name><uri>https://www.youtube.com/channel/UCloadtest</uri></author>
+<published>2024-01-01T00:00:00+00:00</published>
+<updated>2024-01-01T00:00:00+00:00</updated>
+</entry>"""
+
+
+def build_atom(video_ids: list[str]) -> bytes:
+    entries = "\n".join(_ENTRY.format(video_id=video_id) for video_id in video_ids)
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" '
+        'xmlns="http://www.w3.org/2005/Atom">\n'
+        "<title>YouTube video feed</title>\n"
+        f"{entries}\n</feed>"
+    ).encode()
+
+
+def sign(secret: str, body: bytes) -> dict[str, str]:
+    digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha1).hexdigest()
+    return {"X-Hub-Signature": f"sha1={digest}", "Content-Type": "application/atom+xml"}
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return round(ordered[min(int(fraction * len(ordered)), len(ordered) - 1)], 3)
+
+
+async def drive(
+    send: Callable[[int], Awaitable[httpx.Response]], total: int, concurrency: int
+) -> dict[str, Any]:
+    counter = itertools.count()
+    latencies: list[float] = []
+    statuses: Counter[str] = Counter()
+
+    async def worker() -> None:
+        while (index := next(counter)) < total:
+            started = time.perf_counter()
+            try:
+                response = await send(index)
+            except Exception as exc:  # noqa: BLE001
+                statuses[type(exc).__name__] += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[str(response.status_code)] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    if not latencies:
+        return {"requests": total, "statuses": dict(statuses), "rps": 0.0}
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "statuses": dict(statuses),
+        "rps": round(len(latencies) / wall, 1),
+        "p50_ms": _percentile(latencies, 0.5),
+        "p95_ms": _percentile(latencies, 0.95),
+        "p99_ms": _percentile(latencies, 0.99),
+        "max_ms": round(max(latencies), 3),
+    }
+
+
+def microbench(sizes: list[int], loops: int) -> dict[str, dict[str, float]]:
+    from types import SimpleNamespace
+
+    from app.routes.webhook import _extract_video_ids, _verify_signature
+
+    config: Any = SimpleNamespace(web_sub_secret=SECRET)
+    report: dict[str, dict[str, float]] = {}
+    for size in sizes:
+        body = build_atom([f"m{size:04d}{index:06d}" for index in range(size)])
+        headers = {key.lower(): value for key, value in sign(SECRET, body).items()}
+        for name, call in (
+            ("verify_signature", partial(_verify_signature, config, headers, body)),
+            ("extract_video_ids", partial(_extract_video_ids, body)),
+        ):
+            rounds = max(loops // size, 10)
+            started = time.perf_counter()
+            for _ in range(rounds):
+                call()
+            per_call_us = (time.perf_counter() - started) / rounds * 1e6
+            report[f"{name}_{size}"] = {
+                "payload_bytes": len(body),
+                "per_call_us": round(per_call_us, 1),
+                "mb_per_second": round(len(body) / per_call_us, 1),
+            }
+    return report
+
+
+async def _send_notification(
+    client: httpx.AsyncClient, bodies: list[tuple[bytes, dict[str, str]]], index: int
+) -> httpx.Response:
+    body, headers = bodies[index]
+    return await client.post("/webhook/youtube", content=body, headers=headers)
+
+
+async def run_load(
+    client: httpx.AsyncClient, sizes: list[int], requests: int, concurrency: int
+) -> dict[str, Any]:
+    report: dict[str, Any] = {}
+    ids = itertools.count()
+    for size in sizes:
+        total = max(requests // size, concurrency)
+        # Fresh ids in every request, so each notification goes all the way to the enqueue.
+        bodies = []
+        for _ in range(total):
+            body = build_atom([f"w{next(ids):010x}" for _ in range(size)])
+            bodies.append((body, sign(SECRET, body)))
+        result = await drive(partial(_send_notification, client, bodies), total, concurrency)
+        result["videos_per_second"] = round(result["rps"] * size, 1)
+        report[f"webhook_{size}"] = result
+
+    async def read_published(index: int) -> httpx.Response:
+        return await client.get("/api/published", params={"limit": 50})
+
+    report["published"] = await drive(read_published, requests, concurrency)
+    return report
+
+
+def check_budgets(report: dict[str, Any], budgets: dict[str, dict[str, float]]) -> list[str]:
+    violations = []
+    for name, budget in budgets.items():
+        result = report.get(name)
+        if result is None:
+            continue
+        if "p95_ms" in budget and result.get("p95_ms", float("inf")) > budget["p95_ms"]:
+            violations.append(f"{name}: p95 {result.get('p95_ms')} ms > {budget['p95_ms']} ms")
+        if "min_rps" in budget and result.get("rps", 0.0) < budget["min_rps"]:
+            violations.append(f"{name}: {result.get('rps')} rps < {budget['min_rps']} rps")
+        if "max_us" in budget and result.get("per_call_us", float("inf")) > budget["max_us"]:
+            violations.append(
+                f"{name}: {result.get('per_call_us')} us/call > {budget['max_us']} us"
+            )
+        statuses = result.get("statuses", {})
+        errors = {code: count for code, count in statuses.items() if code[0] not in "23"}
+        if errors:
+            violations.append(f"{name}: failed requests {errors}")
+    return violations
+
+
+def _prepare_app(tmp: Path, seed_rows: int) -> Any:
+    os.environ.update(
+        {
+            "YOUTUBE_CHANNEL_ID": "UCloadtest000000000000",
+            "WEB_SUB_CALLBACK_BASE": "http://127.0.0.1",
+            "WEB_SUB_SECRET": SECRET,
+            "WORK_DIR": str(tmp / "work"),
+            "DATABASE_PATH": str(tmp / "load.db"),
+        }
+    )
+    os.environ.pop("DATABASE_URL", None)
+
+    import fakeredis
+
+    from app.config import get_settings
+    from app.db import repo
+    from app.db.base import init_db, session_scope
+    from app.services.published_index import get_published_index
+    from app.utils import redis_pool
+
+    get_settings.cache_clear()
+    redis_pool._client = fakeredis.FakeRedis()
+    init_db()
+    with session_scope() as session:
+        for index in range(seed_rows):
+            video_id = f"seed{index:07d}"
+            repo.mark_published(session, video_id, f"https://rutube.ru/video/{video_id}/")
+    get_published_index().refresh(force=True)
+
+    from app.main import create_app
+
+    return create_app()
+
+
+async def _run(args: argparse.Namespace, app: Any) -> dict[str, Any]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test") as client:
+        return await run_load(client, args.sizes, args.requests, args.concurrency)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--micro-sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--micro-loops", type=int, default=20_000)
+    parser.add_argument("--seed-rows", type=int, default=5000)
+    parser.add_argument("--budgets", type=Path, help="JSON file overriding DEFAULT_BUDGETS")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    from app.utils.logging import configure_logging
+
+    configure_logging(args.log_level)
+    budgets = dict(DEFAULT_BUDGETS)
+    if args.budgets:
+        budgets.update(json.loads(args.budgets.read_text(encoding="utf-8")))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = _prepare_app(Path(tmp), args.seed_rows)
+        report = {
+            "load": asyncio.run(_run(args, app)),
+            "micro": microbench(args.micro_sizes, args.micro_loops),
+        }
+    print(json.dumps(report, indent=2))
+
+    violations = check_budgets({**report["load"], **report["micro"]}, budgets)
+    for line in violations:
+        print(f"BUDGET EXCEEDED {line}")
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
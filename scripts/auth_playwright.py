@@ -10,7 +10,7 @@ from app.utils.logging import configure_logging, get_logger
 
 def main() -> int:
     settings = get_settings()
-    configure_logging(settings.log_level)
+    configure_logging(**settings.logging_options)
     logger = get_logger("auth_playwright")
 
     target_path = settings.cookies_path
@@ -27,7 +27,7 @@ def build_payload(callback_url: str, topic_url: str, secret: str) -> dict[str, s
 
 def main() -> int:
     settings = get_settings()
-    configure_logging(settings.log_level)
+    configure_logging(**settings.logging_options)
     logger = get_logger("websub_init")
 
     callback_url = urljoin(
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import fakeredis
+
+from app.config import AppConfig, RutubeAccount
+from app.services import accounts
+
+
+def make_config(tmp_path: Path, strategy: str = "least_loaded") -> AppConfig:
+    return AppConfig(
+        youtube_channel_id="test",
+        web_sub_callback_base="https://example.com",
+        web_sub_secret="secret",
+        work_dir=tmp_path,
+        database_path=tmp_path / "test.db",
+        cookies_path=tmp_path / "cookies.json",
+        rutube_account_strategy=strategy,
+        rutube_accounts=[
+            RutubeAccount(name="a", cookies_path=tmp_path / "a.json", max_concurrency=1),
+            RutubeAccount(name="b", cookies_path=tmp_path / "b.json", uploads_per_hour=1),
+            RutubeAccount(name="pinned", cookies_path=tmp_path / "p.json", channels=["UCpin"]),
+        ],
+    )
+
+
+def test_pool_respects_concurrency_rate_and_pinning(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(accounts, "get_session_status", lambda path: "valid")
+    pool = accounts.AccountPool(fakeredis.FakeRedis(), make_config(tmp_path))
+
+    pinned = pool.acquire("UCpin")
+    assert pinned is not None and pinned.account.name == "pinned"
+
+    first = pool.acquire()
+    second = pool.acquire()
+    assert first is not None and second is not None
+    assert {first.account.name, second.account.name} == {"a", "b"}
+    assert pool.acquire() is None
+
+    pool.release(second, success=True)
+    pool.release(first, success=True)
+    third = pool.acquire()
+    assert third is not None and third.account.name == "a"
+
+    stats = {item["name"]: item for item in pool.snapshot()}
+    assert stats["b"]["uploadsLastHour"] == 1
+    assert stats["a"]["success"] == 1
+
+
+def test_pool_skips_accounts_with_invalid_session(tmp_path: Path, monkeypatch):
+    invalid = {str(tmp_path / "a.json")}
+    monkeypatch.setattr(
+        accounts,
+        "get_session_status",
+        lambda path: "invalid" if str(path) in invalid else "valid",
+    )
+    pool = accounts.AccountPool(fakeredis.FakeRedis(), make_config(tmp_path, "round_robin"))
+
+    lease = pool.acquire()
+
+    assert lease is not None and lease.account.name == "b"
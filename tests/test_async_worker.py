@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import fakeredis
+import pytest
+from rq import Queue
+from rq.job import JobStatus
+from rq.timeouts import JobTimeoutException, TimerDeathPenalty
+
+from app.config import AppConfig
+from app.services import downloader, transcoder
+from app.workers import async_worker
+from app.workers.async_worker import AsyncWorker, LoopStageRunner, SharedBrowser
+
+
+def make_config(tmp_path: Path, **overrides) -> AppConfig:
+    return AppConfig(
+        youtube_channel_id="test",
+        web_sub_callback_base="https://example.com",
+        web_sub_secret="secret",
+        work_dir=tmp_path / "work",
+        database_path=tmp_path / "test.db",
+        **overrides,
+    )
+
+
+def test_stage_runner_bounds_downloads_across_job_threads(tmp_path, monkeypatch):
+    cfg = make_config(tmp_path, ASYNC_WORKER_DOWNLOADS=2)
+    active = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    def fake_download(video_url: str, work_dir: Path) -> str:
+        with lock:
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        time.sleep(0.05)
+        with lock:
+            active["now"] -= 1
+        return video_url
+
+    monkeypatch.setattr(async_worker, "download_youtube", fake_download)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    runner = LoopStageRunner(loop, cfg, SharedBrowser())
+    try:
+        with ThreadPoolExecutor(max_workers=6) as jobs:
+            urls = [f"https://youtu.be/{index}" for index in range(6)]
+            results = list(jobs.map(lambda url: runner.download(url, tmp_path), urls))
+    finally:
+        runner.close()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    assert results == urls
+    assert active["max"] == 2
+
+
+def test_timed_out_download_stops_yt_dlp_before_returning(tmp_path, monkeypatch):
+    stopped = threading.Event()
+
+    def fake_download(video_url: str, work_dir: Path) -> str:
+        try:
+            for _ in range(500):
+                time.sleep(0.01)
+                downloader._log_progress({"status": "finished"})
+            return video_url
+        finally:
+            stopped.set()
+
+    monkeypatch.setattr(async_worker, "download_youtube", fake_download)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    runner = LoopStageRunner(loop, make_config(tmp_path), SharedBrowser())
+    try:
+        with pytest.raises(JobTimeoutException):
+            with TimerDeathPenalty(1, JobTimeoutException):
+                runner.download("https://youtu.be/x", tmp_path)
+        # The job removes its work dir next; yt-dlp must be gone by then.
+        assert stopped.is_set()
+    finally:
+        runner.close()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+
+def test_async_transcode_raises_like_subprocess_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(transcoder, "_ffmpeg_exists", lambda: True)
+    monkeypatch.setattr(transcoder, "FFMPEG_COMMAND", ["sh", "-c", "echo boom >&2; exit 3"])
+
+    with pytest.raises(subprocess.CalledProcessError) as info:
+        asyncio.run(transcoder.maybe_transcode_async(tmp_path / "in.mp4", tmp_path, True))
+
+    assert info.value.returncode == 3
+    assert info.value.stderr == b"boom\n"
+
+
+def test_worker_runs_queued_jobs_concurrently(tmp_path):
+    redis = fakeredis.FakeRedis()
+    queue = Queue("publish", connection=redis)
+    jobs = [queue.enqueue(time.sleep, 0.3) for _ in range(4)]
+    worker = AsyncWorker(
+        [queue], make_config(tmp_path, ASYNC_WORKER_MAX_JOBS=4), connection=redis
+    )
+
+    started = time.monotonic()
+    worker.work_concurrently(burst=True)
+    elapsed = time.monotonic() - started
+
+    assert [job.get_status() for job in jobs] == [JobStatus.FINISHED] * 4
+    assert elapsed < 1.0
+
+
+def test_finished_job_does_not_hide_the_ones_still_running(tmp_path):
+    redis = fakeredis.FakeRedis()
+    queue = Queue("publish", connection=redis)
+    slow = queue.enqueue(time.sleep, 0.6)
+    queue.enqueue(time.sleep, 0.1)
+    worker = AsyncWorker(
+        [queue], make_config(tmp_path, ASYNC_WORKER_MAX_JOBS=2), connection=redis
+    )
+
+    seen: list[str | None] = []
+    # Signal handlers need the main thread, so the worker runs here and a thread samples it.
+    sampler = threading.Timer(0.35, lambda: seen.append(worker.get_current_job_id()))
+    sampler.start()
+    worker.work_concurrently(burst=True)
+    sampler.join()
+
+    assert seen == [slow.id]
+    assert worker.get_current_job_id() is None
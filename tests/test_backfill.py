@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+import fakeredis
+from rq import Queue, SimpleWorker
+from rq.job import Job
+
+from app.config import AppConfig
+from app.services import backfill
+
+
+def make_config(tmp_path: Path) -> AppConfig:
+    return AppConfig(
+        youtube_channel_id="test",
+        web_sub_callback_base="https://example.com",
+        web_sub_secret="secret",
+        work_dir=tmp_path / "work",
+        database_path=tmp_path / "test.db",
+    )
+
+
+@contextmanager
+def dummy_session_scope():
+    yield object()
+
+
+def test_backfill_resumes_from_cursor(monkeypatch, tmp_path):
+    redis_conn = fakeredis.FakeRedis()
+    monkeypatch.setattr(backfill, "get_settings", lambda: make_config(tmp_path))
+    enqueued: list[list[str]] = []
+
+    monkeypatch.setattr(backfill, "get_redis", lambda: redis_conn)
+    monkeypatch.setattr(backfill, "session_scope", lambda: dummy_session_scope())
+    monkeypatch.setattr(backfill, "_batch_size", lambda conn: 2)
+    monkeypatch.setattr(
+        backfill,
+        "list_channel_videos",
+        lambda channel_id: [("v1", 120.0), ("v2", None), ("v3", 7200.0)],
+    )
+    monkeypatch.setattr(
+        backfill.repo,
+        "get_published_ids",
+        lambda session, video_ids: {"v2"},
+    )
+
+    def fake_enqueue(video_ids, priority, durations, channel_id):
+        assert channel_id == "chan"
+        assert priority == "backfill"
+        enqueued.append(list(video_ids))
+        return [SimpleNamespace(args=(video_id,)) for video_id in video_ids]
+
+    monkeypatch.setattr(backfill, "enqueue_publish_jobs", fake_enqueue)
+
+    started = backfill.start_backfill("chan", schedule=False)
+    assert started.total == 3
+    assert started.cursor == 0
+
+    first = backfill.backfill_tick("chan", schedule=False)
+    assert first is not None
+    assert (first.cursor, first.enqueued, first.skipped) == (2, 1, 1)
+    assert first.status == backfill.STATUS_RUNNING
+
+    resumed = backfill.start_backfill("chan", schedule=False)
+    assert resumed.cursor == 2
+
+    second = backfill.backfill_tick("chan", schedule=False)
+    assert second is not None
+    assert second.status == backfill.STATUS_DONE
+    assert second.remaining == 0
+    assert enqueued == [["v1"], ["v3"]]
+    assert backfill._load_durations(redis_conn, "chan", ["v3"]) == {"v3": 7200.0}
+
+
+def test_start_lists_channel_in_first_tick(monkeypatch, tmp_path):
+    redis_conn = fakeredis.FakeRedis()
+    monkeypatch.setattr(backfill, "get_settings", lambda: make_config(tmp_path))
+    listed: list[str] = []
+    monkeypatch.setattr(backfill, "get_redis", lambda: redis_conn)
+    monkeypatch.setattr(backfill, "session_scope", lambda: dummy_session_scope())
+    monkeypatch.setattr(backfill.repo, "get_published_ids", lambda session, video_ids: set())
+    monkeypatch.setattr(backfill, "enqueue_publish_jobs", lambda ids, **kwargs: ids)
+    monkeypatch.setattr(
+        backfill,
+        "list_channel_videos",
+        lambda channel_id: listed.append(channel_id) or [("v1", None)],
+    )
+
+    started = backfill.start_backfill("chan")
+    assert started.status == backfill.STATUS_LISTING
+    assert listed == []
+
+    ticked = backfill.backfill_tick("chan", schedule=False)
+    assert listed == ["chan"]
+    assert ticked is not None and ticked.status == backfill.STATUS_DONE
+
+
+def test_throttled_tick_keeps_its_successor_scheduled(monkeypatch, tmp_path):
+    redis_conn = fakeredis.FakeRedis()
+    monkeypatch.setattr(backfill, "get_settings", lambda: make_config(tmp_path))
+    monkeypatch.setattr(backfill, "get_redis", lambda: redis_conn)
+    monkeypatch.setattr(backfill, "list_channel_videos", lambda channel_id: [("v1", None)])
+    monkeypatch.setattr(backfill, "_batch_size", lambda conn: 0)
+    backfill.start_backfill("chan", schedule=False)
+    backfill._schedule_tick("chan", 0, delay_seconds=1, chain_id="chain")
+    queue = Queue(backfill.BACKFILL_CONTROL_QUEUE_NAME, connection=redis_conn)
+    registry = queue.scheduled_job_registry
+    (first_id,) = registry.get_job_ids()
+    registry.remove(first_id)
+    queue.enqueue_job(Job.fetch(first_id, connection=redis_conn))
+
+    SimpleWorker([queue], connection=redis_conn).work(burst=True)
+
+    scheduled = registry.get_job_ids()
+    assert len(scheduled) == 1
+    assert Job.exists(scheduled[0], connection=redis_conn)
+
+
+def test_repeated_start_keeps_one_tick_chain(monkeypatch, tmp_path):
+    redis_conn = fakeredis.FakeRedis()
+    monkeypatch.setattr(backfill, "get_settings", lambda: make_config(tmp_path))
+    monkeypatch.setattr(backfill, "get_redis", lambda: redis_conn)
+
+    first = backfill.start_backfill("chan")
+    second = backfill.start_backfill("chan")
+
+    assert second == first
+    queue = Queue(backfill.BACKFILL_CONTROL_QUEUE_NAME, connection=redis_conn)
+    (tick_id,) = queue.scheduled_job_registry.get_job_ids()
+    chain_id = Job.fetch(tick_id, connection=redis_conn).kwargs["chain_id"]
+    # A tick left over from another chain stops instead of scheduling a second successor.
+    assert backfill.backfill_tick("chan", chain_id="stale") == first
+    assert queue.scheduled_job_registry.get_job_ids() == [tick_id]
+    assert redis_conn.get(backfill._chain_key("chan")) == chain_id.encode()
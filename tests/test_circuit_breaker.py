@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import fakeredis
+
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CircuitBreaker
+
+
+def make_breaker(redis_conn: fakeredis.FakeRedis) -> CircuitBreaker:
+    return CircuitBreaker(redis_conn, "rutube", failure_threshold=3, reset_timeout_seconds=60)
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = make_breaker(fakeredis.FakeRedis())
+
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state() == circuit_breaker.STATE_CLOSED
+
+    breaker.record_failure()
+    assert breaker.state() == circuit_breaker.STATE_OPEN
+    assert breaker.allow_request() is False
+    assert 0 < breaker.retry_after() <= 60
+
+
+def test_breaker_half_open_allows_single_probe(monkeypatch):
+    redis_conn = fakeredis.FakeRedis()
+    breaker = make_breaker(redis_conn)
+    other_worker = make_breaker(redis_conn)
+    now = 1_000.0
+    monkeypatch.setattr(circuit_breaker.time, "time", lambda: now)
+
+    for _ in range(3):
+        breaker.record_failure()
+
+    now += 61
+    assert breaker.state() == circuit_breaker.STATE_HALF_OPEN
+    assert breaker.allow_request() is True
+    assert other_worker.allow_request() is False
+
+    breaker.record_failure()
+    assert breaker.state() == circuit_breaker.STATE_OPEN
+
+    now += 61
+    assert breaker.allow_request() is True
+    breaker.record_success()
+    assert other_worker.state() == circuit_breaker.STATE_CLOSED
+    assert other_worker.snapshot()["failures"] == 0
+
+
+def test_probe_is_not_spent_while_another_breaker_refuses(monkeypatch):
+    redis_conn = fakeredis.FakeRedis()
+    youtube = CircuitBreaker(redis_conn, "youtube", failure_threshold=1, reset_timeout_seconds=60)
+    rutube = make_breaker(redis_conn)
+    now = 1_000.0
+    monkeypatch.setattr(circuit_breaker.time, "time", lambda: now)
+    youtube.record_failure()
+    now += 61
+    for _ in range(3):
+        rutube.record_failure()
+
+    assert circuit_breaker.first_refusing([youtube, rutube]) is rutube
+    now += 61
+    assert rutube.allow_request() is True
+    assert circuit_breaker.first_refusing([youtube, rutube]) is rutube
+    assert youtube.allow_request() is True
+
+
+def test_release_probe_only_frees_the_holders_slot(monkeypatch):
+    redis_conn = fakeredis.FakeRedis()
+    breaker = make_breaker(redis_conn)
+    other_worker = make_breaker(redis_conn)
+    now = 1_000.0
+    monkeypatch.setattr(circuit_breaker.time, "time", lambda: now)
+    for _ in range(3):
+        breaker.record_failure()
+    now += 61
+
+    assert breaker.allow_request("job-a") is True
+    other_worker.release_probe("job-b")
+    assert other_worker.allow_request("job-b") is False
+
+    breaker.release_probe("job-a")
+    assert other_worker.allow_request("job-b") is True
+    assert breaker.allow_request("job-a") is False
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.db import async_repo, repo
+from app.db.base import Base, build_async_engine, build_engine, init_db
+from app.db.migrations import alembic_config, unversioned_revision, upgrade_to_head
+
+
+def test_sqlite_engine_is_tuned(tmp_path: Path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'app.db'}", busy_timeout_ms=1234)
+    init_db(engine)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 1234
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+
+    indexes = {index["name"] for index in inspect(engine).get_indexes("published")}
+    assert "ix_published_created_at" in indexes
+
+
+def test_mark_published_upserts(tmp_path: Path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    init_db(engine)
+
+    with Session(engine) as session:
+        repo.mark_published(session, "abc", "https://rutube.ru/video/old/")
+        repo.mark_published(session, "abc", "https://rutube.ru/video/new/")
+        session.commit()
+
+    with Session(engine) as session:
+        assert repo.get_published(session, "abc").rutube_url == "https://rutube.ru/video/new/"
+        assert len(repo.get_recent(session)) == 1
+
+
+def test_migrations_match_models(tmp_path: Path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    upgrade_to_head(engine)
+    upgrade_to_head(engine)
+
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        assert columns == set(table.columns.keys())
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        assert indexes == {index.name for index in table.indexes}
+    head = ScriptDirectory.from_config(alembic_config()).get_current_head()
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version_num FROM alembic_version")).scalar() == head
+
+
+def test_init_db_upgrades_sqlite_created_before_migrations(tmp_path: Path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    with engine.begin() as conn:
+        # The schema create_all produced before the published table grew any columns.
+        conn.execute(
+            text(
+                "CREATE TABLE published (video_id VARCHAR(64) PRIMARY KEY, "
+                "rutube_url VARCHAR(255) NOT NULL, created_at DATETIME NOT NULL)"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO published VALUES "
+                "('old', 'https://rutube.ru/video/old/', '2024-01-01 00:00:00')"
+            )
+        )
+
+    init_db(engine)
+    init_db(engine)
+
+    with Session(engine) as session:
+        assert repo.is_published(session, "old")
+        repo.mark_published(
+            session, "new", "https://rutube.ru/video/new/", account="main", metadata_hashes={}
+        )
+        session.commit()
+        assert repo.get_pushed_metadata(session, ["old", "new"])["new"][1] == "main"
+    inspector = inspect(engine)
+    assert "publish_jobs" in inspector.get_table_names()
+    indexes = {index["name"] for index in inspector.get_indexes("published")}
+    assert "ix_published_created_at" in indexes
+    head = ScriptDirectory.from_config(alembic_config()).get_current_head()
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version_num FROM alembic_version")).scalar() == head
+
+
+def test_unversioned_revision_follows_schema_markers(tmp_path: Path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    with engine.begin() as conn:
+        assert unversioned_revision(conn) is None
+        Base.metadata.create_all(conn)
+        assert unversioned_revision(conn) == "0004"
+        conn.execute(text("ALTER TABLE published DROP COLUMN rutube_account"))
+        assert unversioned_revision(conn) == "0003"
+
+
+@pytest.mark.asyncio
+async def test_async_repo_roundtrip(tmp_path: Path):
+    database_url = f"sqlite:///{tmp_path / 'app.db'}"
+    init_db(build_engine(database_url))
+    engine = build_async_engine(database_url.replace("sqlite://", "sqlite+aiosqlite://"))
+    factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    with Session(build_engine(database_url)) as session:
+        repo.mark_published(session, "abc", "https://rutube.ru/video/abc/")
+        session.commit()
+
+    async with factory() as session:
+        recent = await async_repo.get_recent(session, limit=10)
+        assert [item.video_id for item in recent] == ["abc"]
+
+    await engine.dispose()
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from app.routes.webhook import _extract_notification
+from app.services.dedupe import NotificationDeduper
+
+
+class FakeRedis:
+    def __init__(self):
+        self.keys: dict[str, object] = {}
+
+    def set(self, name: str, value: object, nx: bool = False, ex: int | None = None) -> bool | None:
+        if nx and name in self.keys:
+            return None
+        self.keys[name] = value
+        return True
+
+    def delete(self, name: str) -> int:
+        return 1 if self.keys.pop(name, None) is not None else 0
+
+
+def test_deduper_shares_state_through_redis():
+    redis_conn = FakeRedis()
+    first = NotificationDeduper(redis_conn, ttl_seconds=60, max_entries=10)
+    second = NotificationDeduper(redis_conn, ttl_seconds=60, max_entries=10)
+
+    assert first.is_duplicate("abc") is False
+    assert first.is_duplicate("abc") is True
+    assert second.is_duplicate("abc") is True
+
+    first.forget("abc")
+    assert first.is_duplicate("abc") is False
+
+
+def test_deduper_local_cache_is_bounded():
+    deduper = NotificationDeduper(None, ttl_seconds=60, max_entries=2)
+
+    for video_id in ("a", "b", "c"):
+        assert deduper.is_duplicate(video_id) is False
+
+    assert deduper.is_duplicate("a") is False
+    assert deduper.is_duplicate("c") is True
+
+
+def test_extract_notification_with_tombstone():
+    body = b"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015"
+      xmlns:at="http://purl.org/atompub/tombstones/1.0"
+      xmlns="http://www.w3.org/2005/Atom">
+  <at:deleted-entry ref="yt:video:gone123" when="2024-01-01T00:00:00+00:00"/>
+  <entry>
+    <yt:videoId>new456</yt:videoId>
+  </entry>
+</feed>"""
+
+    video_ids, deleted_ids = _extract_notification(body)
+
+    assert video_ids == ["new456"]
+    assert deleted_ids == ["gone123"]
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from pathlib import Path
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+
+from app.config import AppConfig
+from app.services import disk_budget
+from app.services.disk_budget import DiskBudget, DiskCapacityError
+from app.utils.retry import ERROR_INVALID, classify_error
+
+
+MB = 1024 * 1024
+
+
+def make_config(tmp_path: Path, **overrides) -> AppConfig:
+    return AppConfig(
+        youtube_channel_id="test",
+        web_sub_callback_base="https://example.com",
+        web_sub_secret="secret",
+        work_dir=tmp_path,
+        database_path=tmp_path / "test.db",
+        disk_headroom_bytes=10 * MB,
+        **overrides,
+    )
+
+
+def fake_disk(monkeypatch, free: int) -> None:
+    monkeypatch.setattr(
+        disk_budget.shutil, "disk_usage", lambda path: SimpleNamespace(total=1000 * MB, free=free)
+    )
+
+
+def test_estimate_uses_filesize_then_duration(tmp_path: Path):
+    budget = DiskBudget(fakeredis.FakeRedis(), make_config(tmp_path, enable_transcode=True))
+
+    assert budget.estimate({"filesize_bytes": 100 * MB}) == int(220 * MB)
+    assert budget.estimate({"duration_seconds": 10}) == int(10 * 1_000_000 * 2.2)
+    assert budget.estimate({}) == 2 * 1024**3
+    assert budget.after_download(100 * MB) == int(220 * MB)
+
+
+def test_reserve_waits_for_budget_and_counts_written_bytes(tmp_path: Path, monkeypatch):
+    fake_disk(monkeypatch, free=110 * MB)
+    budget = DiskBudget(fakeredis.FakeRedis(), make_config(tmp_path))
+
+    assert budget.reserve("first", 60 * MB)
+    assert not budget.reserve("second", 60 * MB)
+
+    # Bytes "first" already wrote are both gone from free space and from its reservation.
+    (tmp_path / "first").mkdir()
+    (tmp_path / "first" / "video.mp4").write_bytes(b"x" * (20 * MB))
+    fake_disk(monkeypatch, free=90 * MB)
+    assert not budget.reserve("second", 60 * MB)
+
+    budget.resize("first", 20 * MB, "download")
+    assert budget.reserve("second", 60 * MB)
+
+    snapshot = budget.snapshot()
+    assert [item["videoId"] for item in snapshot["reservations"]] == ["first", "second"]
+    assert snapshot["reservations"][0]["stage"] == "download"
+    assert snapshot["outstandingBytes"] == 60 * MB
+
+    budget.release("first")
+    budget.release("second")
+    assert budget.snapshot()["reservations"] == []
+
+
+def test_estimate_larger_than_the_disk_is_permanent(tmp_path: Path, monkeypatch):
+    fake_disk(monkeypatch, free=1000 * MB)
+    budget = DiskBudget(fakeredis.FakeRedis(), make_config(tmp_path))
+
+    assert budget.reserve("fits", 990 * MB)
+    budget.release("fits")
+    with pytest.raises(DiskCapacityError) as info:
+        budget.reserve("huge", 991 * MB)
+
+    assert classify_error(info.value) == ERROR_INVALID
+    assert budget.snapshot()["reservations"] == []
+
+
+def test_expired_reservations_are_dropped(tmp_path: Path, monkeypatch):
+    fake_disk(monkeypatch, free=110 * MB)
+    budget = DiskBudget(fakeredis.FakeRedis(), make_config(tmp_path))
+    monkeypatch.setattr(disk_budget, "RESERVATION_TTL_SECONDS", -1)
+    assert budget.reserve("crashed", 90 * MB)
+
+    monkeypatch.setattr(disk_budget, "RESERVATION_TTL_SECONDS", 3600)
+    assert budget.reserve("next", 90 * MB)
+
+
+def test_disabled_budget_admits_everything(tmp_path: Path, monkeypatch):
+    fake_disk(monkeypatch, free=0)
+    budget = DiskBudget(fakeredis.FakeRedis(), make_config(tmp_path, disk_admission_enabled=False))
+
+    assert budget.reserve("any", 100 * MB)
+    assert budget.snapshot()["reservations"] == []
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.db import async_repo
+from app.db.base import build_async_engine, build_engine, init_db
+from app.db.models import PublishJob
+from app.routes.admin import _decode_cursor, _encode_cursor
+from app.services import job_tracking
+from app.services.job_tracking import JobTracker
+from app.utils.retry import CircuitOpenError
+
+
+def make_tracker_factory(database_url: str):
+    engine = build_engine(database_url)
+    init_db(engine)
+
+    @contextmanager
+    def scope():
+        with Session(engine) as session:
+            yield session
+            session.commit()
+
+    return engine, lambda video_id: JobTracker(video_id, session_factory=scope)
+
+
+def test_tracker_records_attempts_and_stages(tmp_path: Path):
+    engine, tracker_for = make_tracker_factory(f"sqlite:///{tmp_path / 'app.db'}")
+    tracker = tracker_for("abc")
+
+    tracker.start(priority="websub")
+    tracker.stage_started("download")
+    tracker.stage_finished("download", channel_id="UC1", bytes_downloaded=42)
+    tracker.failed(SimpleNamespace(retries_left=2), "transient", RuntimeError("boom"))
+    tracker.start(priority="websub")
+    tracker.stage_started("download")
+    tracker.stage_finished("download", bytes_downloaded=43)
+    tracker.stage_started("upload")
+    tracker.stage_finished("upload", bytes_uploaded=43)
+    tracker.succeeded("https://rutube.ru/video/abc/")
+
+    with Session(engine) as session:
+        job = session.get(PublishJob, "abc")
+        assert job.status == job_tracking.JOB_SUCCEEDED
+        assert job.attempts == 2
+        assert job.channel_id == "UC1"
+        assert job.bytes_downloaded == 43
+        assert job.error is None
+        assert job.upload_finished_at >= job.upload_started_at
+        assert job.transcode_started_at is None
+
+
+def test_status_after_failure():
+    assert job_tracking.status_after_failure(None, RuntimeError()) == job_tracking.JOB_FAILED
+    exhausted = SimpleNamespace(retries_left=0)
+    assert job_tracking.status_after_failure(exhausted, RuntimeError()) == job_tracking.JOB_FAILED
+    deferred = job_tracking.status_after_failure(exhausted, CircuitOpenError("rutube", 60))
+    assert deferred == job_tracking.JOB_DEFERRED
+
+
+@pytest.mark.asyncio
+async def test_job_history_keyset_pagination(tmp_path: Path):
+    database_url = f"sqlite:///{tmp_path / 'app.db'}"
+    _, tracker_for = make_tracker_factory(database_url)
+    for index in range(5):
+        tracker = tracker_for(f"video{index}")
+        tracker.start()
+        if index % 2:
+            tracker.failed(None, "invalid", ValueError("bad"))
+
+    engine = build_async_engine(database_url.replace("sqlite://", "sqlite+aiosqlite://"))
+    factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    seen: list[str] = []
+    after = None
+    async with factory() as session:
+        while True:
+            page = await async_repo.get_job_history(session, limit=2, after=after)
+            if not page:
+                break
+            seen.extend(job.video_id for job in page)
+            after = _decode_cursor(_encode_cursor(page[-1].created_at, page[-1].video_id))
+        failed = await async_repo.get_job_history(session, status=job_tracking.JOB_FAILED)
+    await engine.dispose()
+
+    assert seen == [f"video{index}" for index in reversed(range(5))]
+    assert {job.video_id for job in failed} == {"video1", "video3"}
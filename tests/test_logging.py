@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import io
+import json
+
+import pytest
+import structlog
+
+from app.utils.logging import EventSampler, FieldSizeCapper, LogPipeline, QueueLogger
+
+
+def _sample(sampler: EventSampler, event: str, method: str = "info") -> dict | None:
+    try:
+        return sampler(None, method, {"event": event})
+    except structlog.DropEvent:
+        return None
+
+
+def test_sampler_keeps_one_in_n_and_marks_it():
+    sampler = EventSampler({"download_progress": 0.1})
+
+    kept = [_sample(sampler, "download_progress") for _ in range(30)]
+
+    assert [entry is not None for entry in kept].count(True) == 3
+    assert kept[0] == {"event": "download_progress", "sample_every": 10}
+
+
+def test_sampler_passes_other_events_and_errors():
+    sampler = EventSampler({"uploader_poll": 0.0})
+
+    assert _sample(sampler, "uploader_poll") is None
+    assert _sample(sampler, "uploader_poll", method="warning") == {"event": "uploader_poll"}
+    assert _sample(sampler, "publish_success") == {"event": "publish_success"}
+
+
+def test_field_capper_keeps_head_and_tail():
+    capper = FieldSizeCapper(max_length=20)
+    stderr = "start-" + "x" * 100 + "-error"
+
+    event = capper(None, "error", {"event": "transcode_failed", "stderr": stderr, "code": 1})
+
+    assert event["stderr"].startswith("start-xxxx")
+    assert event["stderr"].endswith("xxxx-error")
+    assert "[92 chars truncated]" in event["stderr"]
+    assert event["code"] == 1
+
+
+class _Stream(io.BytesIO):
+    def close(self) -> None:
+        pass
+
+
+def test_pipeline_writes_on_flush_and_counts_drops():
+    stream = _Stream()
+    pipeline = LogPipeline(stream, max_size=2)
+    logger = QueueLogger(pipeline)
+
+    for index in range(3):
+        logger.info(json.dumps({"message": "tick", "index": index}).encode())
+    pipeline.start()
+    pipeline.flush()
+    pipeline.close()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line.get("index") for line in lines[:2]] == [0, 1]
+    assert lines[2] == {"message": "log_dropped", "count": 1}
+
+
+@pytest.mark.parametrize("method", ["info", "exception", "critical"])
+def test_queue_logger_accepts_every_level(method):
+    stream = _Stream()
+    pipeline = LogPipeline(stream)
+    pipeline.start()
+
+    getattr(QueueLogger(pipeline), method)(b'{"message":"x"}')
+    pipeline.close()
+
+    assert stream.getvalue() == b'{"message":"x"}\n'
@@ -3,7 +3,7 @@ from __future__ import annotations
 from pathlib import Path
 
 from app.config import AppConfig
-from app.services.mapper import map_metadata
+from app.services.mapper import MetadataCache, map_metadata, map_metadata_many
 
 
 def make_config(tmp_path: Path) -> AppConfig:
@@ -45,3 +45,36 @@ def test_map_metadata_normalizes(tmp_path: Path):
     assert mapped.description == "Line1\nLine2"
     assert mapped.tags == ["Tag1", "Tag2", "Another Tag"]
     assert mapped.visibility == "public"
+
+
+def test_map_metadata_many_matches_single_mapping(tmp_path: Path):
+    cfg = make_config(tmp_path)
+    infos = [
+        {"id": "ascii000001", "title": "Plain\ttitle", "description": "a\r\nb\x07", "tags": ["x"]},
+        {"id": "cyrillic001", "title": "Видео 🎉", "description": "Текст\u200B\r", "tags": None},
+    ]
+
+    batch = map_metadata_many(infos, cfg, cache=MetadataCache())
+
+    for info in infos:
+        desc_file = tmp_path / f"{info['id']}.description"
+        desc_file.write_text(info["description"], encoding="utf-8", newline="")
+        assert batch[info["id"]] == map_metadata(info, desc_file, None, cfg)
+
+
+def test_map_metadata_many_caches_until_source_or_config_changes(tmp_path: Path):
+    cfg = make_config(tmp_path)
+    cache = MetadataCache(max_entries=10)
+    info = {"id": "video000001", "title": "First", "description": "", "tags": []}
+
+    first = map_metadata_many([info], cfg, cache=cache)["video000001"]
+    assert map_metadata_many([info], cfg, cache=cache)["video000001"] is first
+
+    edited = map_metadata_many([{**info, "title": "Second"}], cfg, cache=cache)
+    assert edited["video000001"].title == "[YT] Second"
+
+    other_cfg = cfg.model_copy(update={"title_prefix": ""})
+    assert map_metadata_many([{**info, "title": "Second"}], other_cfg, cache=cache)[
+        "video000001"
+    ].title == "Second"
+    assert len(cache) == 2
@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+from rq import Queue
+from sqlalchemy.orm import Session
+
+from app.config import AppConfig
+from app.db import repo
+from app.db.base import build_engine, init_db
+from app.services import metadata_sync, uploader
+from app.services.mapper import MappedMeta, field_hashes
+from app.services.scheduling import METADATA_SYNC_QUEUE_NAME
+from app.services.uploader import MetadataEdit, UploadError, _rutube_video_id
+
+
+def make_config(tmp_path: Path, **overrides) -> AppConfig:
+    return AppConfig(
+        youtube_channel_id="test",
+        web_sub_callback_base="https://example.com",
+        web_sub_secret="secret",
+        work_dir=tmp_path / "work",
+        database_path=tmp_path / "test.db",
+        **overrides,
+    )
+
+
+class DummyBreaker:
+    name = "dummy"
+
+    def state(self) -> str:
+        return "closed"
+
+    def allow_request(self, holder: str = "1") -> bool:
+        return True
+
+    def release_probe(self, holder: str = "1") -> None:
+        pass
+
+    def record_success(self) -> None:
+        pass
+
+    def record_failure(self) -> None:
+        pass
+
+
+@contextmanager
+def dummy_session_scope():
+    yield None
+
+
+def test_requests_within_a_window_share_one_batch(tmp_path, monkeypatch):
+    redis_conn = fakeredis.FakeRedis()
+    monkeypatch.setattr(metadata_sync, "get_settings", lambda: make_config(tmp_path))
+
+    metadata_sync.request_metadata_sync(["a", "b"], redis_conn)
+    metadata_sync.request_metadata_sync(["b", "c"], redis_conn)
+
+    scheduled = Queue(METADATA_SYNC_QUEUE_NAME, connection=redis_conn).scheduled_job_registry
+    assert len(scheduled.get_job_ids()) == 1
+    assert redis_conn.smembers(metadata_sync.PENDING_KEY) == {b"a", b"b", b"c"}
+
+
+def test_batch_pushes_only_changed_fields(tmp_path, monkeypatch):
+    cfg = make_config(tmp_path)
+    engine = build_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    init_db(engine)
+    pushed = MappedMeta("Old title", "Same description", ["tag"], "public", None)
+    with Session(engine) as session:
+        repo.mark_published(
+            session,
+            "edited",
+            "https://rutube.ru/video/aaa/",
+            account="default",
+            metadata_hashes=field_hashes(pushed),
+        )
+        repo.mark_published(
+            session,
+            "same",
+            "https://rutube.ru/video/bbb/",
+            account="default",
+            metadata_hashes=field_hashes(pushed),
+        )
+        repo.mark_published(session, "legacy", "https://rutube.ru/video/private/ccc/?p=x")
+        session.commit()
+
+    @contextmanager
+    def session_scope():
+        with Session(engine) as session:
+            yield session
+            session.commit()
+
+    def fake_fetch(video_urls):
+        source = {"title": "Old title", "description": "Same description", "tags": ["tag"]}
+        infos = {video_id: {**source, "id": video_id} for video_id in video_urls}
+        infos["edited"]["title"] = "New title"
+        return infos, []
+
+    pushes = []
+
+    def fake_update(edits, cookies_path):
+        pushes.extend((edit.video_id, edit.fields) for edit in edits)
+        return [edit.video_id for edit in edits]
+
+    redis_conn = fakeredis.FakeRedis()
+    redis_conn.sadd(metadata_sync.PENDING_KEY, "edited", "same", "legacy", "unknown")
+    monkeypatch.setattr(metadata_sync, "get_settings", lambda: cfg)
+    monkeypatch.setattr(metadata_sync, "get_redis", lambda: redis_conn)
+    monkeypatch.setattr(metadata_sync, "session_scope", session_scope)
+    monkeypatch.setattr(metadata_sync, "get_breaker", lambda name: DummyBreaker())
+    monkeypatch.setattr(metadata_sync, "get_session_status", lambda path: "valid")
+    monkeypatch.setattr(metadata_sync, "any_session_usable", lambda: True)
+    monkeypatch.setattr(metadata_sync, "fetch_video_infos", fake_fetch)
+    monkeypatch.setattr(metadata_sync, "update_rutube_metadata", fake_update)
+
+    summary = metadata_sync.sync_metadata_batch(schedule=False)
+
+    assert sorted(pushes) == [("edited", ["title"]), ("legacy", ["title", "description", "tags"])]
+    assert summary == {
+        "videos": 4,
+        "updated": 2,
+        "unchanged": 1,
+        "skipped": 1,
+        "failed": 0,
+        "retry": 0,
+        "parked": 0,
+        "waiting": 0,
+    }
+    with Session(engine) as session:
+        stored = repo.get_pushed_metadata(session, ["edited", "legacy"])
+    assert stored["edited"][2]["title"] != field_hashes(pushed)["title"]
+    assert stored["legacy"][1] == "default" and stored["legacy"][2] is not None
+    assert redis_conn.scard(metadata_sync.PENDING_KEY) == 0
+
+
+def test_failed_batch_is_rescheduled(tmp_path, monkeypatch):
+    redis_conn = fakeredis.FakeRedis()
+    redis_conn.sadd(metadata_sync.PENDING_KEY, "a", "b")
+    monkeypatch.setattr(metadata_sync, "get_settings", lambda: make_config(tmp_path))
+    monkeypatch.setattr(metadata_sync, "get_redis", lambda: redis_conn)
+
+    def broken_sync(video_ids, cfg, summary):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(metadata_sync, "_sync", broken_sync)
+
+    with pytest.raises(RuntimeError):
+        metadata_sync.sync_metadata_batch()
+
+    assert redis_conn.smembers(metadata_sync.PENDING_KEY) == {b"a", b"b"}
+    scheduled = Queue(METADATA_SYNC_QUEUE_NAME, connection=redis_conn).scheduled_job_registry
+    assert len(scheduled.get_job_ids()) == 1
+
+
+def test_expired_session_is_checked_before_fetching(tmp_path, monkeypatch):
+    cfg = make_config(
+        tmp_path,
+        RUTUBE_ACCOUNTS=[
+            {"name": "live", "cookies_path": str(tmp_path / "live.json")},
+            {"name": "expired", "cookies_path": str(tmp_path / "expired.json")},
+        ],
+    )
+    rows = {
+        "a": ("https://rutube.ru/video/aaa/", "live", None),
+        "b": ("https://rutube.ru/video/bbb/", "expired", None),
+    }
+    fetched: list[str] = []
+
+    def fake_fetch(video_urls):
+        fetched.extend(video_urls)
+        return {}, list(video_urls)
+
+    redis_conn = fakeredis.FakeRedis()
+    redis_conn.sadd(metadata_sync.PENDING_KEY, "a", "b")
+    monkeypatch.setattr(metadata_sync, "get_settings", lambda: cfg)
+    monkeypatch.setattr(metadata_sync, "get_redis", lambda: redis_conn)
+    monkeypatch.setattr(metadata_sync, "session_scope", dummy_session_scope)
+    monkeypatch.setattr(metadata_sync.repo, "get_pushed_metadata", lambda session, ids: rows)
+    monkeypatch.setattr(metadata_sync, "get_breaker", lambda name: DummyBreaker())
+    monkeypatch.setattr(metadata_sync, "any_session_usable", lambda: True)
+    monkeypatch.setattr(
+        metadata_sync,
+        "get_session_status",
+        lambda path: "invalid" if path.name == "expired.json" else "valid",
+    )
+    monkeypatch.setattr(metadata_sync, "fetch_video_infos", fake_fetch)
+
+    summary = metadata_sync.sync_metadata_batch(schedule=False)
+
+    assert fetched == ["a"]
+    assert summary["retry"] == 1 and summary["waiting"] == 1
+    assert redis_conn.smembers(metadata_sync.PENDING_KEY) == {b"a", b"b"}
+    # Waiting for `make auth` is not a failed attempt.
+    assert redis_conn.hgetall(metadata_sync.ATTEMPTS_KEY) == {b"a": b"1"}
+
+
+def test_repeatedly_failing_ids_are_parked(tmp_path, monkeypatch):
+    cfg = make_config(tmp_path, METADATA_SYNC_MAX_ATTEMPTS=2)
+    redis_conn = fakeredis.FakeRedis()
+    redis_conn.sadd(metadata_sync.PENDING_KEY, "a", "b")
+    monkeypatch.setattr(metadata_sync, "get_settings", lambda: cfg)
+    monkeypatch.setattr(metadata_sync, "get_redis", lambda: redis_conn)
+    outcomes = iter([(["a", "b"], []), (["a"], [])])
+    monkeypatch.setattr(metadata_sync, "_sync", lambda video_ids, cfg, summary: next(outcomes))
+
+    assert metadata_sync.sync_metadata_batch(schedule=False)["retry"] == 2
+    summary = metadata_sync.sync_metadata_batch(schedule=False)
+
+    assert summary["retry"] == 0 and summary["parked"] == 1
+    assert redis_conn.smembers(metadata_sync.PENDING_KEY) == set()
+    assert redis_conn.smembers(metadata_sync.PARKED_KEY) == {b"a"}
+    assert redis_conn.hgetall(metadata_sync.ATTEMPTS_KEY) == {}
+
+    # A new edit notification gives a parked id another round of attempts.
+    metadata_sync.request_metadata_sync(["a"], redis_conn)
+    assert redis_conn.smembers(metadata_sync.PARKED_KEY) == set()
+    assert redis_conn.smembers(metadata_sync.PENDING_KEY) == {b"a"}
+
+
+def test_ambiguous_owner_is_not_guessed(tmp_path):
+    cfg = make_config(
+        tmp_path,
+        RUTUBE_ACCOUNTS=[
+            {"name": "one", "cookies_path": str(tmp_path / "1.json")},
+            {"name": "two", "cookies_path": str(tmp_path / "2.json"), "channels": ["UCx"]},
+            {"name": "three", "cookies_path": str(tmp_path / "3.json")},
+        ],
+    )
+
+    assert metadata_sync._account_for(cfg, "three", None).name == "three"
+    assert metadata_sync._account_for(cfg, None, "UCx").name == "two"
+    assert metadata_sync._account_for(cfg, None, "UCy") is None
+    assert _rutube_video_id("https://rutube.ru/video/private/ccc/?p=x") == "ccc"
+
+
+class FakeStudio:
+    """Edit page whose form shows the stored values after every (re)load."""
+
+    def __init__(self, keeps_edits: bool, status: int = 200) -> None:
+        self.keeps_edits = keeps_edits
+        self.status = status
+        self.stored = {"title": "Old title", "description": "Old description"}
+        self.form = dict(self.stored)
+        self.url = ""
+
+    def goto(self, url: str, wait_until: str) -> None:
+        self.url = url
+        self.reload(wait_until)
+
+    def reload(self, wait_until: str) -> None:
+        self.form = dict(self.stored)
+
+    def wait_for_load_state(self, state: str) -> None:
+        pass
+
+    def locator(self, selector: str):
+        fields = {selectors[0]: name for name, selectors in uploader.FIELD_SELECTORS.items()}
+        field = fields.get(selector)
+        studio = self
+
+        class Locator:
+            first = None
+
+            def count(self) -> int:
+                return int(field is not None or selector == uploader.SAVE_SELECTORS[0])
+
+            def fill(self, value: str) -> None:
+                studio.form[field] = value
+
+            def input_value(self) -> str:
+                return studio.form[field]
+
+            def click(self) -> None:
+                if studio.keeps_edits:
+                    studio.stored.update(studio.form)
+
+        locator = Locator()
+        locator.first = locator
+        return locator
+
+    @contextmanager
+    def expect_response(self, predicate):
+        response = SimpleNamespace(
+            url="https://studio.rutube.ru/api/video/aaa/",
+            request=SimpleNamespace(method="PATCH"),
+            ok=self.status < 400,
+            status=self.status,
+        )
+        yield SimpleNamespace(value=response)
+        assert predicate(response)
+
+
+def test_edit_counts_only_once_the_new_values_are_saved():
+    meta = MappedMeta("New title", "Old description", ["tag"], "public", None)
+    edit = MetadataEdit("vid", "https://rutube.ru/video/aaa/", meta, ["title"])
+
+    studio = FakeStudio(keeps_edits=True)
+    uploader._apply_edit(studio, edit)
+    assert studio.stored["title"] == "New title"
+
+    with pytest.raises(UploadError, match="did not keep"):
+        uploader._apply_edit(FakeStudio(keeps_edits=False), edit)
+    with pytest.raises(UploadError, match="HTTP 500"):
+        uploader._apply_edit(FakeStudio(keeps_edits=True, status=500), edit)
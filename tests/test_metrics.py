@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import fakeredis
+from prometheus_client import REGISTRY, CollectorRegistry, generate_latest
+
+from app.utils.metrics import QueueDepthCollector
+from app.utils.retry import apply_retry_decision
+
+
+def test_queue_depth_collector_reads_redis():
+    redis_conn = fakeredis.FakeRedis()
+    redis_conn.rpush("rq:queue:publish", "a", "b")
+    redis_conn.zadd("rq:failed:publish", {"c": 1})
+    registry = CollectorRegistry()
+    registry.register(QueueDepthCollector(lambda: redis_conn, lambda: ["publish", "failed"]))
+
+    assert registry.get_sample_value("rq_queue_depth", {"queue": "publish"}) == 2
+    assert registry.get_sample_value("rq_queue_depth", {"queue": "failed"}) == 0
+    labels = {"queue": "publish", "registry": "failed"}
+    assert registry.get_sample_value("rq_registry_jobs", labels) == 1
+    assert b"rq_queue_depth" in generate_latest(registry)
+
+
+def test_retry_decisions_are_counted():
+    labels = {"stage": "download", "error_class": "transient"}
+    before = REGISTRY.get_sample_value("publish_retries_total", labels) or 0.0
+    job = SimpleNamespace(
+        id="j", meta={}, retries_left=3, retry_intervals=[], save_meta=lambda: None
+    )
+
+    apply_retry_decision(job, "download", ConnectionError("reset"))
+
+    assert REGISTRY.get_sample_value("publish_retries_total", labels) == before + 1
@@ -1,11 +1,20 @@
 from __future__ import annotations
 
+import time
 from contextlib import contextmanager
 from pathlib import Path
 from types import SimpleNamespace
 
+import fakeredis
+import pytest
+from rq import Queue
+from rq.job import JobStatus
+from rq.registry import FailedJobRegistry
+
 from app.config import AppConfig
-from app.services import orchestrator
+from app.services import accounts, circuit_breaker, orchestrator, profiling
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.disk_budget import DiskBudget
 from app.services.downloader import DownloadResult
 from app.services.mapper import MappedMeta
 
@@ -48,23 +57,86 @@ class DummyLock:
         self.acquired = False
 
 
+class DummyBreaker:
+    name = "dummy"
+
+    def state(self) -> str:
+        return "closed"
+
+    def allow_request(self, holder: str = "1") -> bool:
+        return True
+
+    def release_probe(self, holder: str = "1") -> None:
+        pass
+
+    def record_success(self) -> None:
+        pass
+
+    def record_failure(self) -> None:
+        pass
+
+
+class DummyAccountPool:
+    def __init__(self, cfg: AppConfig):
+        self.account = cfg.accounts[0]
+
+    def acquire(self, channel_id):
+        return SimpleNamespace(account=self.account, started_at=0.0)
+
+    def serves(self, account, channel_id) -> bool:
+        return True
+
+    def cancel(self, lease) -> None:
+        pass
+
+    def release(self, lease, success: bool, auth_failed: bool = False) -> None:
+        self.released = lease
+
+
 @contextmanager
 def dummy_session_scope():
     yield SimpleNamespace()
 
 
+class DummyTracker:
+    calls: list[str] = []
+
+    def __init__(self, video_id: str) -> None:
+        self.video_id = video_id
+
+    def __getattr__(self, name: str):
+        return lambda *args, **kwargs: self.calls.append(name)
+
+
 def test_publish_video_pipeline(monkeypatch, tmp_path: Path):
     cfg = make_config(tmp_path)
     order: list[str] = []
 
     monkeypatch.setattr(orchestrator, "get_settings", lambda: cfg)
+    monkeypatch.setattr(profiling, "get_settings", lambda: cfg)
     monkeypatch.setattr(orchestrator, "session_scope", lambda: dummy_session_scope())
+    monkeypatch.setattr(orchestrator, "get_breaker", lambda name: DummyBreaker())
+    monkeypatch.setattr(orchestrator, "any_session_usable", lambda: True)
+    pool = DummyAccountPool(cfg)
+    monkeypatch.setattr(orchestrator, "get_account_pool", lambda: pool)
+    disk_budget = DiskBudget(fakeredis.FakeRedis(), cfg)
+    monkeypatch.setattr(orchestrator, "get_disk_budget", lambda: disk_budget)
+    index = SimpleNamespace(add=lambda video_id: order.append("index"))
+    monkeypatch.setattr(orchestrator, "get_published_index", lambda: index)
+    monkeypatch.setattr(orchestrator, "JobTracker", DummyTracker)
 
     monkeypatch.setattr(orchestrator.repo, "get_published", lambda session, video_id: None)
-    monkeypatch.setattr(orchestrator.repo, "mark_published", lambda session, video_id, url: order.append("mark"))
+    monkeypatch.setattr(
+        orchestrator.repo,
+        "mark_published",
+        lambda session, video_id, url, **kwargs: order.append("mark"),
+    )
+
+    downloaded_at: list[float] = []
 
     def fake_download(url: str, work_dir: Path) -> DownloadResult:
         order.append("download")
+        downloaded_at.append(time.monotonic())
         video_path = work_dir / "video.mp4"
         video_path.parent.mkdir(parents=True, exist_ok=True)
         video_path.write_text("data")
@@ -100,5 +172,181 @@ def test_publish_video_pipeline(monkeypatch, tmp_path: Path):
     result = orchestrator.publish_video("video123")
 
     assert result == "https://rutube.ru/video/abc"
-    assert order == ["download", "transcode", "map", "upload", "mark", "cleanup"]
+    assert order == ["download", "transcode", "map", "upload", "mark", "index", "cleanup"]
     assert not dummy_lock.locked()
+    assert disk_budget.snapshot()["reservations"] == []
+    # The account's latency is measured from the upload, not from admission.
+    assert pool.released.started_at > downloaded_at[0]
+
+
+def test_forced_job_republishes_published_video(monkeypatch, tmp_path: Path):
+    cfg = make_config(tmp_path)
+    redis_conn = fakeredis.FakeRedis()
+    existing = SimpleNamespace(rutube_url="https://rutube.ru/video/old")
+    monkeypatch.setattr(orchestrator, "get_settings", lambda: cfg)
+    monkeypatch.setattr(orchestrator, "session_scope", lambda: dummy_session_scope())
+    monkeypatch.setattr(orchestrator.repo, "get_published", lambda session, video_id: existing)
+    monkeypatch.setattr(orchestrator, "_redis_connection", lambda: redis_conn)
+    monkeypatch.setattr(orchestrator, "JobTracker", DummyTracker)
+
+    def gates_reached(probe_holder: str) -> None:
+        raise RuntimeError("gates reached")
+
+    monkeypatch.setattr(orchestrator, "_check_breakers", gates_reached)
+    queue = Queue("publish", connection=redis_conn)
+    for force, expected in ((False, "https://rutube.ru/video/old"), (True, None)):
+        job = queue.enqueue(
+            orchestrator.publish_video,
+            "video123",
+            meta={orchestrator.FORCE_META_KEY: True} if force else {},
+        )
+        monkeypatch.setattr(orchestrator, "get_current_job", lambda job=job: job)
+        if expected:
+            assert orchestrator._publish_video("video123") == expected
+        else:
+            with pytest.raises(RuntimeError, match="gates reached"):
+                orchestrator._publish_video("video123")
+
+
+def test_bulk_enqueue_skips_live_jobs_and_replaces_failed_ones(monkeypatch, tmp_path: Path):
+    cfg = make_config(tmp_path)
+    redis_conn = fakeredis.FakeRedis()
+    monkeypatch.setattr(orchestrator, "get_settings", lambda: cfg)
+    monkeypatch.setattr(orchestrator, "_redis_connection", lambda: redis_conn)
+    queue = Queue("publish_rss", connection=redis_conn)
+    orchestrator.enqueue_publish_job("queued", priority="rss")
+    failed = orchestrator.enqueue_publish_job("failed", priority="rss")
+    queue.remove(failed)
+    failed.set_status(JobStatus.FAILED)
+    FailedJobRegistry(queue.name, connection=redis_conn).add(failed, ttl=3600)
+
+    jobs = orchestrator.enqueue_publish_jobs(["queued", "failed", "absent"], priority="rss")
+
+    assert [job.id for job in jobs] == ["publish:failed", "publish:absent"]
+    assert sorted(queue.job_ids) == ["publish:absent", "publish:failed", "publish:queued"]
+    assert queue.fetch_job("publish:failed").get_status() == JobStatus.QUEUED
+    assert FailedJobRegistry(queue.name, connection=redis_conn).get_job_ids() == []
+
+
+def test_default_account_lets_publishes_overlap(monkeypatch, tmp_path: Path):
+    cfg = make_config(tmp_path)
+    redis_conn = fakeredis.FakeRedis()
+    disk_budget = DiskBudget(redis_conn, cfg)
+    monkeypatch.setattr(disk_budget, "_free_bytes", lambda: 1 << 40)
+    monkeypatch.setattr(disk_budget, "_total_bytes", lambda: 1 << 41)
+    monkeypatch.setattr(orchestrator, "get_settings", lambda: cfg)
+    monkeypatch.setattr(profiling, "get_settings", lambda: cfg)
+    monkeypatch.setattr(orchestrator, "session_scope", lambda: dummy_session_scope())
+    monkeypatch.setattr(orchestrator.repo, "get_published", lambda session, video_id: None)
+    monkeypatch.setattr(orchestrator.repo, "mark_published", lambda *args, **kwargs: None)
+    monkeypatch.setattr(orchestrator, "get_breaker", lambda name: DummyBreaker())
+    monkeypatch.setattr(orchestrator, "any_session_usable", lambda: True)
+    monkeypatch.setattr(accounts, "get_session_status", lambda path: "valid")
+    monkeypatch.setattr(
+        orchestrator, "get_account_pool", lambda: accounts.AccountPool(redis_conn, cfg)
+    )
+    monkeypatch.setattr(orchestrator, "get_disk_budget", lambda: disk_budget)
+    monkeypatch.setattr(orchestrator, "get_published_index", lambda: SimpleNamespace(add=len))
+    monkeypatch.setattr(orchestrator, "JobTracker", DummyTracker)
+    monkeypatch.setattr(orchestrator, "_redis_connection", lambda: redis_conn)
+
+    def fake_download(url: str, work_dir: Path) -> DownloadResult:
+        video_path = work_dir / "video.mp4"
+        video_path.parent.mkdir(parents=True, exist_ok=True)
+        video_path.write_bytes(b"v")
+        return DownloadResult(video_path, {"id": work_dir.name, "title": "Title"}, None, None, [])
+
+    nested: list[str] = []
+
+    def fake_upload(path: Path, meta: MappedMeta, cookies_path: Path) -> str:
+        video_id = path.parent.name
+        if video_id == "first":
+            # The second publish runs while the first still holds the default account.
+            nested.append(orchestrator.publish_video("second"))
+        return f"https://rutube.ru/video/{video_id}"
+
+    monkeypatch.setattr(orchestrator, "download_youtube", fake_download)
+    monkeypatch.setattr(orchestrator, "upload_to_rutube", fake_upload)
+
+    assert orchestrator.publish_video("first") == "https://rutube.ru/video/first"
+    assert nested == ["https://rutube.ru/video/second"]
+
+
+def test_full_account_pool_defers_before_download(monkeypatch, tmp_path: Path):
+    cfg = make_config(tmp_path)
+    downloads: list[str] = []
+
+    class FullPool(DummyAccountPool):
+        def acquire(self, channel_id):
+            return None
+
+    monkeypatch.setattr(orchestrator, "get_settings", lambda: cfg)
+    monkeypatch.setattr(profiling, "get_settings", lambda: cfg)
+    monkeypatch.setattr(orchestrator, "session_scope", lambda: dummy_session_scope())
+    monkeypatch.setattr(orchestrator.repo, "get_published", lambda session, video_id: None)
+    monkeypatch.setattr(orchestrator, "get_breaker", lambda name: DummyBreaker())
+    monkeypatch.setattr(orchestrator, "any_session_usable", lambda: True)
+    monkeypatch.setattr(orchestrator, "get_account_pool", lambda: FullPool(cfg))
+    disk_budget = DiskBudget(fakeredis.FakeRedis(), cfg)
+    monkeypatch.setattr(orchestrator, "get_disk_budget", lambda: disk_budget)
+    monkeypatch.setattr(DummyTracker, "calls", [])
+    monkeypatch.setattr(orchestrator, "JobTracker", DummyTracker)
+    monkeypatch.setattr(orchestrator, "download_youtube", lambda url, path: downloads.append(url))
+    dummy_lock = DummyLock()
+    monkeypatch.setattr(
+        orchestrator,
+        "_redis_connection",
+        lambda: SimpleNamespace(lock=lambda name, timeout, blocking_timeout: dummy_lock),
+    )
+
+    with pytest.raises(orchestrator.CircuitOpenError) as info:
+        orchestrator.publish_video("video123")
+
+    assert info.value.breaker == orchestrator.ACCOUNTS_GATE_NAME
+    assert downloads == []
+    assert disk_budget.snapshot()["reservations"] == []
+    # A deferral is recorded without opening a new attempt.
+    assert "start" not in DummyTracker.calls
+    assert "failed" in DummyTracker.calls
+
+
+def test_disk_deferral_gives_back_half_open_probe(monkeypatch, tmp_path: Path):
+    cfg = make_config(tmp_path)
+    redis_conn = fakeredis.FakeRedis()
+    now = 1_000.0
+    monkeypatch.setattr(circuit_breaker.time, "time", lambda: now)
+    breakers = {
+        name: CircuitBreaker(redis_conn, name, failure_threshold=1, reset_timeout_seconds=60)
+        for name in orchestrator.BREAKER_NAMES
+    }
+    breakers[circuit_breaker.BREAKER_RUTUBE].record_failure()
+    now += 61
+
+    monkeypatch.setattr(orchestrator, "get_settings", lambda: cfg)
+    monkeypatch.setattr(profiling, "get_settings", lambda: cfg)
+    monkeypatch.setattr(orchestrator, "session_scope", lambda: dummy_session_scope())
+    monkeypatch.setattr(orchestrator.repo, "get_published", lambda session, video_id: None)
+    monkeypatch.setattr(orchestrator, "get_breaker", breakers.__getitem__)
+    monkeypatch.setattr(orchestrator, "any_session_usable", lambda: True)
+    monkeypatch.setattr(orchestrator, "get_account_pool", lambda: DummyAccountPool(cfg))
+    disk_budget = DiskBudget(redis_conn, cfg)
+    monkeypatch.setattr(disk_budget, "reserve", lambda video_id, size: False)
+    monkeypatch.setattr(orchestrator, "get_disk_budget", lambda: disk_budget)
+    monkeypatch.setattr(DummyTracker, "calls", [])
+    monkeypatch.setattr(orchestrator, "JobTracker", DummyTracker)
+    dummy_lock = DummyLock()
+    monkeypatch.setattr(
+        orchestrator,
+        "_redis_connection",
+        lambda: SimpleNamespace(lock=lambda name, timeout, blocking_timeout: dummy_lock),
+    )
+
+    with pytest.raises(orchestrator.CircuitOpenError) as info:
+        orchestrator.publish_video("video123")
+
+    assert info.value.breaker == orchestrator.DISK_GATE_NAME
+    # The next job gets to probe RuTube instead of waiting out the probe TTL.
+    other_worker = CircuitBreaker(
+        redis_conn, circuit_breaker.BREAKER_RUTUBE, failure_threshold=1, reset_timeout_seconds=60
+    )
+    assert other_worker.allow_request() is True
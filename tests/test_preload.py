@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import gc
+import json
+import os
+import subprocess
+import sys
+
+from app.workers.preload import preload_job_modules
+from benchmarks.import_time import _top_packages
+
+
+def test_api_and_worker_imports_leave_downloader_and_browser_unloaded(tmp_path):
+    code = (
+        "import json, sys; import app.main, app.workers.worker; "
+        "print(json.dumps([m for m in ('yt_dlp', 'playwright') if m in sys.modules]))"
+    )
+    env = {**os.environ, "WORK_DIR": str(tmp_path), "DATABASE_PATH": str(tmp_path / "t.db")}
+
+    result = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True
+    )
+
+    assert json.loads(result.stdout.splitlines()[-1]) == []
+
+
+def test_preload_warms_job_modules_and_freezes_gc():
+    try:
+        timings = preload_job_modules()
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+
+    assert "yt_dlp" in sys.modules and "playwright.sync_api" in sys.modules
+    assert timings["extractors"] >= 0 and timings["total"] >= timings["mappers"]
+
+
+def test_top_packages_sums_self_time_per_package():
+    log = "\n".join(
+        [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       300 |        900 | sqlalchemy",
+            "import time:       600 |        600 |   sqlalchemy.orm",
+            "import time:      1500 |       1500 | yt_dlp",
+        ]
+    )
+
+    assert _top_packages(log, 2) == [
+        {"package": "yt_dlp", "ms": 1.5},
+        {"package": "sqlalchemy", "ms": 0.9},
+    ]
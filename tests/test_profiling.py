@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+from app.services import profiling
+from app.services.profiling import ResourceMonitor, job_profiler, summarize_resources
+
+
+def test_monitor_records_child_cpu_and_disk(tmp_path: Path):
+    monitor = ResourceMonitor(tmp_path, interval_seconds=0.05)
+
+    monitor.stage("download")
+    (tmp_path / "video.mp4").write_bytes(b"x" * 4096)
+    monitor.stage("transcode")
+    burn = "import time\nend = time.process_time() + 0.2\nwhile time.process_time() < end: pass"
+    subprocess.run([sys.executable, "-c", burn], check=True)
+    (tmp_path / "video.mp4").unlink()
+    usage = monitor.stop()
+
+    assert usage["download"]["peak_disk_bytes"] >= 4096
+    assert usage["transcode"]["cpu_seconds"] >= 0.2
+    assert usage["transcode"]["peak_rss_bytes"] > 0
+    assert usage["transcode"]["wall_seconds"] >= 0.2
+
+
+def test_summarize_resources_groups_by_resolution():
+    samples = [
+        ("1080p", {"upload": {"cpu_seconds": 10.0, "peak_rss_bytes": 100}}),
+        ("1080p", {"upload": {"cpu_seconds": 30.0, "peak_rss_bytes": 300}}),
+        (None, {"upload": {"cpu_seconds": 5.0}}),
+    ]
+
+    summary = summarize_resources(samples)
+
+    assert summary["1080p"]["upload"]["cpu_seconds"] == {"count": 2, "p50": 10.0, "p95": 30.0}
+    assert summary["all"]["upload"]["cpu_seconds"]["count"] == 3
+    assert "peak_rss_bytes" not in summary["unknown"]["upload"]
+
+
+def test_job_profiler_writes_stats(monkeypatch, tmp_path: Path):
+    cfg = SimpleNamespace(
+        job_profile_dir=tmp_path, job_profiler="cprofile", job_profile_sample_rate=0
+    )
+    monkeypatch.setattr(profiling, "get_settings", lambda: cfg)
+
+    with job_profiler("abc", enabled=True):
+        sum(range(1000))
+
+    assert len(list(tmp_path.glob("abc-*.prof"))) == 1
+    assert profiling.should_profile({"profile": True})
+    assert not profiling.should_profile({})
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+import fakeredis
+from prometheus_client import REGISTRY, CollectorRegistry
+from sqlalchemy.orm import Session
+
+from app.db import repo
+from app.db.base import build_engine, init_db
+from app.services.published_index import PublishedIndex
+from app.utils.metrics import PublishedIndexCollector
+
+
+def make_scope(tmp_path: Path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    init_db(engine)
+    queries: list[str] = []
+
+    @contextmanager
+    def scope():
+        queries.append("session")
+        with Session(engine) as session:
+            yield session
+            session.commit()
+
+    return scope, queries
+
+
+def test_negative_lookups_skip_database(tmp_path: Path):
+    scope, queries = make_scope(tmp_path)
+    with scope() as session:
+        repo.mark_published(session, "old", "https://rutube.ru/video/old/")
+    redis_conn = fakeredis.FakeRedis()
+    index = PublishedIndex(redis_conn, refresh_seconds=3600, session_factory=scope)
+
+    index.refresh(force=True)
+    queries.clear()
+
+    assert index.published_ids(["old", "new1", "new2"]) == {"old"}
+    assert queries == []
+
+    other = PublishedIndex(redis_conn, refresh_seconds=3600, session_factory=scope)
+    other.refresh(force=True)
+    index.add("fresh")
+    queries.clear()
+    assert other.is_published("fresh")
+    assert queries == []
+
+    stats = other.stats()
+    assert stats["sharedHits"] == 1
+    assert stats["dbLookups"] == 0
+    assert stats["memoryBytes"] > 0
+
+
+def test_refresh_is_incremental_and_falls_back_without_shared_tier(tmp_path: Path):
+    scope, queries = make_scope(tmp_path)
+    index = PublishedIndex(None, refresh_seconds=0, session_factory=scope)
+    index.refresh(force=True)
+
+    with scope() as session:
+        repo.mark_published(session, "late", "https://rutube.ru/video/late/")
+    assert index.published_ids(["late"]) == {"late"}
+    assert index.stats()["localHits"] == 1
+
+    assert index.published_ids(["missing"]) == set()
+    assert index.stats()["dbLookups"] == 1
+
+
+def test_index_is_exported_to_prometheus(tmp_path: Path):
+    scope, _ = make_scope(tmp_path)
+    with scope() as session:
+        repo.mark_published(session, "a", "https://rutube.ru/video/a/")
+    index = PublishedIndex(None, refresh_seconds=3600, session_factory=scope)
+    registry = CollectorRegistry()
+    registry.register(PublishedIndexCollector(index.stats))
+    before = REGISTRY.get_sample_value("published_index_lookups_total", {"tier": "db"}) or 0.0
+
+    assert registry.get_sample_value("published_index_hit_ratio") is None
+    index.published_ids(["a", "b"])
+
+    assert REGISTRY.get_sample_value("published_index_lookups_total", {"tier": "db"}) == before + 1
+    assert registry.get_sample_value("published_index_size") == 1
+    assert registry.get_sample_value("published_index_memory_bytes") > 0
+    assert registry.get_sample_value("published_index_hit_ratio") == 0.5
+
+
+def test_get_published_since_is_inclusive(tmp_path: Path):
+    scope, _ = make_scope(tmp_path)
+    with scope() as session:
+        repo.mark_published(session, "a", "https://rutube.ru/video/a/")
+    with scope() as session:
+        (_, created_at), = repo.get_published_since(session)
+        later = created_at + timedelta(seconds=1)
+        assert [row[0] for row in repo.get_published_since(session, created_at)] == ["a"]
+        assert repo.get_published_since(session, later) == []
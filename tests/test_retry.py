@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+from yt_dlp.utils import DownloadError
+
+from app.utils import retry
+
+
+class FakeJob(SimpleNamespace):
+    def save_meta(self) -> None:
+        self.saved = True
+
+
+def make_job(retries_left: int = 10) -> FakeJob:
+    return FakeJob(id="publish:abc", meta={}, retries_left=retries_left, retry_intervals=None)
+
+
+def test_classify_error():
+    private = DownloadError("ERROR: [youtube] abc: Private video")
+    assert retry.classify_error(private) == "unavailable"
+    assert retry.classify_error(retry.AuthExpiredError("expired")) == "auth"
+    assert retry.classify_error(ConnectionResetError("reset by peer")) == "transient"
+    assert retry.classify_error(FileNotFoundError("video.mp4")) == "invalid"
+
+
+def test_transient_error_is_rescheduled_with_stage_backoff():
+    job = make_job()
+
+    error_class = retry.apply_retry_decision(job, "download", TimeoutError("read timed out"))
+
+    assert error_class == "transient"
+    assert job.retries_left == 10
+    assert len(job.retry_intervals) == 1
+    assert job.meta["attempts"] == {"download": 1}
+    assert job.meta["retry_budget"]["last_error_class"] == "transient"
+    assert job.meta["retry_budget"]["remaining"] == 9
+    assert job.saved
+
+
+def test_permanent_error_stops_retries():
+    job = make_job()
+
+    retry.apply_retry_decision(job, "download", retry.VideoUnavailableError("removed"))
+
+    assert job.retries_left == 0
+    assert job.meta["retry_budget"]["remaining"] == 0
+
+
+def test_stage_budget_is_enforced():
+    job = make_job()
+    max_attempts = retry.get_retry_policy("upload").max_attempts
+
+    for _ in range(max_attempts):
+        retry.apply_retry_decision(job, "upload", TimeoutError("timeout"))
+
+    assert job.retries_left == 0
+    assert job.meta["attempts"]["upload"] == max_attempts
+
+
+def test_lock_waits_count_against_the_budget():
+    assert retry.total_retry_budget() == sum(
+        retry.get_retry_policy(stage).max_attempts
+        for stage in ("lock", "download", "transcode", "upload")
+    )
@@ -1,16 +1,10 @@
 from __future__ import annotations
 
-from contextlib import contextmanager
 from types import SimpleNamespace
 
 from app.services import rss
 
 
-@contextmanager
-def dummy_session_scope():
-    yield object()
-
-
 def test_poll_once_enqueues(monkeypatch):
     fake_feed = SimpleNamespace(
         entries=[
@@ -22,13 +16,15 @@ def test_poll_once_enqueues(monkeypatch):
 
     calls: list[str] = []
 
-    monkeypatch.setattr(rss, "session_scope", lambda: dummy_session_scope())
-    monkeypatch.setattr(
-        rss.repo,
-        "is_published",
-        lambda session, video_id: video_id == "existing_video",
+    index = SimpleNamespace(
+        published_ids=lambda video_ids: {v for v in video_ids if v == "existing_video"}
     )
-    monkeypatch.setattr(rss, "enqueue_publish_job", lambda video_id: calls.append(video_id))
+    monkeypatch.setattr(rss, "get_published_index", lambda: index)
+    def fake_enqueue_many(video_ids, priority, channel_id):
+        calls.extend(video_ids)
+        return [SimpleNamespace(args=(video_id,)) for video_id in video_ids]
+
+    monkeypatch.setattr(rss, "enqueue_publish_jobs", fake_enqueue_many)
     monkeypatch.setattr(rss.feedparser, "parse", lambda url: fake_feed)
 
     result = rss.poll_once()
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from app.config import AppConfig
+from app.services import scheduling
+
+
+def make_config(tmp_path: Path, policy: str) -> AppConfig:
+    return AppConfig(
+        youtube_channel_id="test",
+        web_sub_callback_base="https://example.com",
+        web_sub_secret="secret",
+        work_dir=tmp_path,
+        database_path=tmp_path / "test.db",
+        cookies_path=tmp_path / "cookies.json",
+        job_scheduling_policy=policy,
+        sjf_short_max_seconds=600,
+        sjf_long_min_seconds=3600,
+    )
+
+
+def test_size_bucket_only_applies_to_sjf(tmp_path: Path):
+    fifo = make_config(tmp_path, "fifo")
+    sjf = make_config(tmp_path, "sjf")
+
+    assert scheduling.size_bucket(fifo, 60, None) is None
+    assert scheduling.size_bucket(sjf, 60, None) == scheduling.SIZE_SHORT
+    assert scheduling.size_bucket(sjf, 1800, None) is None
+    assert scheduling.size_bucket(sjf, 4 * 3600, None) == scheduling.SIZE_LONG
+    assert scheduling.size_bucket(sjf, None, None) is None
+
+
+def test_worker_queues_follow_priority_order():
+    queues = scheduling.worker_queue_names()
+
+    assert queues[:3] == ["publish:short", "publish", "publish:long"]
+    assert queues.index("publish_rss") < queues.index("backfill")
+    assert queues.index("backfill") < queues.index("publish_backfill:short")
+    assert queues.index("publish_rss:long") < queues.index("metadata_sync")
+    assert queues.index("metadata_sync") < queues.index("backfill")
+    assert queues.index("publish_backfill:long") < queues.index("publish_retrigger:short")
+    assert queues[-1] == scheduling.FAILED_QUEUE_NAME
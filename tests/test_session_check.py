@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+from app.services import session_check
+
+
+def test_probe_rejects_missing_or_expired_state(tmp_path: Path, monkeypatch):
+    def fail_client(*args, **kwargs):
+        raise AssertionError("no network request expected")
+
+    monkeypatch.setattr(session_check.httpx, "Client", fail_client)
+    cookies_path = tmp_path / "cookies.json"
+
+    assert session_check.probe_session(cookies_path) == session_check.SESSION_INVALID
+
+    cookies_path.write_text(
+        json.dumps(
+            {"cookies": [{"name": "sid", "value": "x", "domain": ".rutube.ru", "expires": 1}]}
+        ),
+        encoding="utf-8",
+    )
+    assert session_check.probe_session(cookies_path) == session_check.SESSION_INVALID
+
+
+def test_cache_key_changes_when_state_is_rewritten(tmp_path: Path):
+    cookies_path = tmp_path / "cookies.json"
+    cookies_path.write_text("{}", encoding="utf-8")
+    before = session_check._cache_key(cookies_path)
+
+    stat = cookies_path.stat()
+    os.utime(cookies_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert session_check._cache_key(cookies_path) != before
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import pytest
+import structlog
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from app.services import orchestrator
+from app.services.scheduling import PRIORITY_RSS
+from app.utils import tracing
+from app.utils.tracing import TRACE_META_KEY, SpanSteps, start_span
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    # Scoped to the module's provider, so the process-wide one stays untouched for other tests.
+    span_exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(span_exporter))
+    monkeypatch.setattr(tracing, "_provider", provider)
+    return span_exporter
+
+
+def test_trace_flows_from_ingestion_to_worker_spans(exporter):
+    with start_span("POST /webhook/youtube") as ingest:
+        bound = structlog.contextvars.get_contextvars()
+        meta = orchestrator._publish_job_options("abc", PRIORITY_RSS)["meta"]
+    trace_id = format(ingest.get_span_context().trace_id, "032x")
+    assert bound["trace_id"] == trace_id
+    assert "trace_id" not in structlog.contextvars.get_contextvars()
+
+    with start_span("publish_video", parent=meta[TRACE_META_KEY]):
+        with SpanSteps() as steps:
+            steps.step("download")
+            steps.step("upload")
+            with SpanSteps() as sub_steps:
+                sub_steps.step("page_load")
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    assert {format(span.context.trace_id, "032x") for span in spans.values()} == {trace_id}
+    assert spans["publish_video"].parent.span_id == ingest.get_span_context().span_id
+    assert spans["download"].parent.span_id == spans["publish_video"].context.span_id
+    assert spans["page_load"].parent.span_id == spans["upload"].context.span_id
+
+
+def test_span_steps_record_failures(exporter):
+    with pytest.raises(RuntimeError):
+        with SpanSteps() as steps:
+            steps.step("transcode")
+            raise RuntimeError("ffmpeg died")
+
+    (span,) = exporter.get_finished_spans()
+    assert span.status.status_code == trace.StatusCode.ERROR
+    assert span.events[0].name == "exception"
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+from fastapi import FastAPI, Response
+
+from app.routes.webhook import _extract_video_ids, _verify_signature
+from benchmarks.webhook_load import build_atom, check_budgets, drive, sign
+
+
+def test_signed_atom_payload_is_accepted_by_webhook_helpers():
+    body = build_atom(["aaaaaaaaaaa", "bbbbbbbbbbb"])
+    headers = {key.lower(): value for key, value in sign("secret", body).items()}
+
+    assert _verify_signature(SimpleNamespace(web_sub_secret="secret"), headers, body)
+    assert _extract_video_ids(body) == ["aaaaaaaaaaa", "bbbbbbbbbbb"]
+
+
+def test_drive_respects_total_and_counts_statuses():
+    app = FastAPI()
+    inflight = {"now": 0, "max": 0}
+
+    @app.post("/hook")
+    async def hook() -> Response:
+        inflight["now"] += 1
+        inflight["max"] = max(inflight["max"], inflight["now"])
+        await asyncio.sleep(0.001)
+        inflight["now"] -= 1
+        return Response(status_code=202)
+
+    async def scenario() -> dict:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await drive(lambda index: client.post("/hook"), total=40, concurrency=4)
+
+    result = asyncio.run(scenario())
+
+    assert result["statuses"] == {"202": 40}
+    assert inflight["max"] <= 4
+    assert result["rps"] > 0 and result["p95_ms"] >= result["p50_ms"]
+
+
+def test_check_budgets_reports_every_violation():
+    report = {
+        "webhook_1": {"p95_ms": 80.0, "rps": 50.0, "statuses": {"202": 9, "500": 1}},
+        "verify_signature_1000": {"per_call_us": 10.0},
+    }
+    budgets = {
+        "webhook_1": {"p95_ms": 50, "min_rps": 100},
+        "verify_signature_1000": {"max_us": 2000},
+        "published": {"p95_ms": 50},
+    }
+
+    violations = check_budgets(report, budgets)
+
+    assert len(violations) == 3
+    assert all(line.startswith("webhook_1:") for line in violations)
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import os
+import time
+import zipfile
+from pathlib import Path
+
+import fakeredis
+from rq import Queue
+
+from app.config import AppConfig
+from app.services.disk_budget import RESERVATIONS_KEY
+from app.services.workdir_gc import WorkDirSweeper
+
+
+def make_config(tmp_path: Path) -> AppConfig:
+    return AppConfig(
+        youtube_channel_id="test",
+        web_sub_callback_base="https://example.com",
+        web_sub_secret="secret",
+        work_dir=tmp_path / "work",
+        database_path=tmp_path / "test.db",
+        work_dir_gc_min_age_seconds=3600,
+        work_dir_gc_io_bytes_per_second=1024**3,
+        work_dir_gc_archive_path=tmp_path / "archive.zip",
+    )
+
+
+def make_video_dir(cfg: AppConfig, video_id: str, age_seconds: float) -> Path:
+    path = cfg.work_dir / video_id
+    path.mkdir(parents=True)
+    (path / f"{video_id}.mp4").write_bytes(b"v" * 1000)
+    (path / f"{video_id}.info.json").write_text(f'{{"id": "{video_id}"}}')
+    stamp = time.time() - age_seconds
+    for item in path.iterdir():
+        os.utime(item, (stamp, stamp))
+    return path
+
+
+def test_sweeper_reclaims_orphans_and_archives_metadata(tmp_path: Path):
+    cfg = make_config(tmp_path)
+    redis = fakeredis.FakeRedis()
+    orphan = make_video_dir(cfg, "orphan00001", age_seconds=7200)
+    young = make_video_dir(cfg, "young000001", age_seconds=60)
+    locked = make_video_dir(cfg, "locked00001", age_seconds=7200)
+    reserved = make_video_dir(cfg, "reserved001", age_seconds=7200)
+    pending = make_video_dir(cfg, "pending0001", age_seconds=7200)
+    (cfg.work_dir / "profiles").mkdir()
+    (cfg.work_dir / "app.db").write_bytes(b"db")
+    redis.set("lock:publish:locked00001", "token")
+    redis.hset(RESERVATIONS_KEY, "reserved001", "{}")
+    Queue("publish", connection=redis).enqueue(
+        "app.services.orchestrator.publish_video", "pending0001", job_id="publish:pending0001"
+    )
+
+    report = WorkDirSweeper(redis, cfg).sweep()
+
+    assert report.scanned_dirs == 5
+    assert report.active_dirs == 2
+    assert report.young_dirs == 1
+    assert report.removed_dirs == 1
+    assert not orphan.exists()
+    assert young.exists() and locked.exists() and reserved.exists()
+    assert sorted(item.name for item in pending.iterdir()) == ["pending0001.info.json"]
+    assert (cfg.work_dir / "profiles").exists() and (cfg.work_dir / "app.db").exists()
+    assert report.reclaimed_bytes >= 2000
+
+    with zipfile.ZipFile(cfg.work_dir_gc_archive_path) as archive:
+        names = archive.namelist()
+    assert len(names) == 1 and names[0].startswith("orphan00001/")
+    assert names[0].endswith("/orphan00001.info.json")
+    assert WorkDirSweeper(redis, cfg).last_report()["removed_dirs"] == 1
+
+
+def test_dry_run_only_reports(tmp_path: Path):
+    cfg = make_config(tmp_path)
+    orphan = make_video_dir(cfg, "orphan00001", age_seconds=7200)
+
+    report = WorkDirSweeper(fakeredis.FakeRedis(), cfg).sweep(dry_run=True)
+
+    assert report.reclaimed_bytes == 1000
+    assert (orphan / "orphan00001.mp4").exists()
+    assert not cfg.work_dir_gc_archive_path.exists()